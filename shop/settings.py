@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
+
+import django
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
@@ -25,9 +28,9 @@ BASE_DIR = Path(__file__).resolve(strict=True).parent.parent
 SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY', 'apvhwi4*lylspmr9j&c(g3jgt7@=k7_7v&rj0v#a6eerteox#5') 
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = bool(int(os.environ.get('DJANGO_DEBUG', 1)))
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -43,9 +46,19 @@ INSTALLED_APPS = [
     'shop_app',   
 ]
 
+# Stock SecurityMiddleware of Django 3.1.0 breaks async middleware below it
+# under ASGI, shop_app.middleware.SecurityMiddleware fixes it there. Deploy
+# checks (security.W001 and the ones depending on it) look for the stock
+# path, which requirements.txt pins a fixed Django for.
+SECURITY_MIDDLEWARE = ('django.middleware.security.SecurityMiddleware' if django.VERSION >= (3, 1, 1)
+                       else 'shop_app.middleware.SecurityMiddleware')
+
 MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
+    'shop_app.middleware.PerformanceMiddleware',
+    'shop_app.middleware.ReplicaRoutingMiddleware',
+    SECURITY_MIDDLEWARE,
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'shop_app.middleware.CartMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -55,19 +68,29 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'shop.urls'
 
+# Compiled templates are kept in memory, unless templates are being edited
+SHOP_CACHE_TEMPLATES = bool(int(os.environ.get('SHOP_CACHE_TEMPLATES', not DEBUG)))
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'shop_app.perf.TimedDjangoTemplates',
         'DIRS': [
             BASE_DIR / 'templates'
         ],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                       if SHOP_CACHE_TEMPLATES else TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'shop_app.context_processors.cart',
+                'shop_app.context_processors.catalog',
             ],
         },
     },
@@ -79,13 +102,71 @@ WSGI_APPLICATION = 'shop.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# Profile is picked by SHOP_DB_PROFILE environment variable:
+# sqlite - plain SQLite for development, connection per request
+# sqlite-wal - SQLite in WAL mode with tuned pragmas and persistent connections
+# postgres - PostgreSQL with persistent connections, configured by DB_*
+#   variables. Point DB_HOST/DB_PORT at PgBouncer to pool connections
+#   between processes.
+SHOP_DB_PROFILE = os.environ.get('SHOP_DB_PROFILE', 'sqlite')
+
+# Applied by shop_app.db on every new connection. With WAL readers don't
+# block writer, synchronous=normal syncs on checkpoint only, which is
+# still safe with WAL. Writers wait busy_timeout ms for lock.
+SQLITE_WAL_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
+}
+
+DATABASE_PROFILES = {
+    'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    'sqlite-wal': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'PRAGMAS': SQLITE_WAL_PRAGMAS,
+    },
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('DB_NAME', 'shop'),
+        'USER': os.environ.get('DB_USER', 'shop'),
+        'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+        'HOST': os.environ.get('DB_HOST', 'localhost'),
+        'PORT': os.environ.get('DB_PORT', '5432'),
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'OPTIONS': {'connect_timeout': 5},
+    },
 }
 
+DATABASES = {
+    'default': DATABASE_PROFILES[SHOP_DB_PROFILE],
+}
+
+# Read replicas, see shop_app.routers. With SQLite, SHOP_SQLITE_REPLICAS=n
+# adds n database files standing in for replicas, copied from primary by
+# sync_replicas command. Otherwise DB_REPLICA_HOSTS lists replica servers.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    replicas = [{'NAME': BASE_DIR / f'db.replica{i}.sqlite3'}
+                for i in range(1, int(os.environ.get('SHOP_SQLITE_REPLICAS', 0)) + 1)]
+else:
+    replicas = [{'HOST': host} for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',') if host]
+SHOP_DB_REPLICAS = []
+for i, replica in enumerate(replicas, 1):
+    DATABASES[f'replica{i}'] = {**DATABASES['default'], **replica, 'TEST': {'MIRROR': 'default'}}
+    SHOP_DB_REPLICAS.append(f'replica{i}')
+DATABASE_ROUTERS = ['shop_app.routers.PrimaryReplicaRouter']
+# Models requests read from replicas
+SHOP_REPLICA_MODELS = ['shop_app.product', 'shop_app.category']
+# Client that changed replicated models reads from primary for this long
+SHOP_REPLICA_PIN_SECONDS = 5
+SHOP_REPLICA_PIN_COOKIE_NAME = 'primary_pin'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -127,10 +208,111 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     BASE_DIR / 'static'
 ]
+STATIC_ROOT = os.environ.get('DJANGO_STATIC_ROOT', BASE_DIR / 'staticfiles')
+# collectstatic writes hashed names plus .gz and .br copies, web server is
+# to serve them precompressed with far-future expiry, for nginx:
+#   location /static/ { gzip_static on; brotli_static on; expires max; }
+if not DEBUG:
+    STATICFILES_STORAGE = 'shop_app.storage.CompressedManifestStaticFilesStorage'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
+# Threads generating image derivatives after upload, 0 makes it synchronous
+SHOP_IMAGE_WORKERS = int(os.environ.get('SHOP_IMAGE_WORKERS', 2))
+
 
 # Email backend 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+
+
+# Catalog pagination: 'keyset' (cursor based, no COUNT query) or 'offset'
+SHOP_PAGINATION_MODE = os.environ.get('SHOP_PAGINATION_MODE', 'keyset')
+
+# Catalog page cache, entries are invalidated on any catalog change.
+# Catalog version is kept there, so cache must be shared by all worker
+# processes, see 'pages' in CACHES.
+SHOP_PAGE_CACHE_ALIAS = 'pages'
+SHOP_PAGE_CACHE_TIMEOUT = int(os.environ.get('SHOP_PAGE_CACHE_TIMEOUT', 600))
+# Rendered product cards and header widget, reused across cached page variants
+SHOP_FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('SHOP_FRAGMENT_CACHE_TIMEOUT', 600))
+
+# JSON catalog API: default and largest product page, slugs per batch request
+SHOP_API_PAGE_SIZE = 24
+SHOP_API_MAX_PAGE_SIZE = 100
+SHOP_API_BATCH_LIMIT = 100
+
+# Admin changelists of large tables: rows counted exactly, beyond that
+# whole table count comes from database statistics; days of orders
+# searched by customer name
+SHOP_ADMIN_COUNT_LIMIT = 10000
+SHOP_ADMIN_SEARCH_DAYS = 90
+
+# Function process_orders command calls with every claimed order, order
+# is marked done when it returns, e.g. 'myshop.fulfilment.ship'
+SHOP_FULFILMENT_HANDLER = os.environ.get('SHOP_FULFILMENT_HANDLER')
+# Orders claimed by worker this many seconds ago and not done yet are
+# claimed again, must be longer than handling of a batch takes
+SHOP_FULFILMENT_LEASE = int(os.environ.get('SHOP_FULFILMENT_LEASE', 600))
+
+# Closed orders older than this many days are moved to archive tables
+# by archive_orders command, see shop_app.archive
+SHOP_ARCHIVE_DAYS = int(os.environ.get('SHOP_ARCHIVE_DAYS', 365))
+
+# Cart storage: SessionCartStore, SignedCookieCartStore or CacheCartStore
+SHOP_CART_BACKEND = os.environ.get('SHOP_CART_BACKEND', 'shop_app.cart.SessionCartStore')
+SHOP_CART_CACHE_ALIAS = 'default'
+SHOP_CART_COOKIE_NAME = 'cart'
+SHOP_CART_COOKIE_AGE = 60 * 60 * 24 * 14
+SHOP_CART_TOKEN_COOKIE_NAME = 'cart_token'
+
+# Seconds units put in cart are held for it, 0 takes stock only at checkout.
+# Expired reservations are returned by release_reservations command.
+SHOP_RESERVATION_TIMEOUT = int(os.environ.get('SHOP_RESERVATION_TIMEOUT', 0))
+
+# Request instrumentation, see shop_app.perf. Histograms are flushed to
+# cache every SHOP_PERF_FLUSH_INTERVAL seconds, file cache keeps them
+# readable by perf_stats command.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'perf': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'shop-perf'),
+        'TIMEOUT': None,
+    },
+    # Catalog pages and version, shared by processes of one host; set
+    # SHOP_PAGE_CACHE_MEMCACHED=host:port to share it between hosts.
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'shop-pages'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+if os.environ.get('SHOP_PAGE_CACHE_MEMCACHED'):
+    CACHES['pages'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ['SHOP_PAGE_CACHE_MEMCACHED'],
+    }
+SHOP_PERF_CACHE_ALIAS = 'perf'
+SHOP_PERF_FLUSH_INTERVAL = 10
+# Same query repeated this many times in request is logged as likely N+1
+SHOP_PERF_REPEAT_THRESHOLD = 5
+# Query budgets of views that can't declare them, by URL name
+SHOP_QUERY_BUDGETS = {
+    'admin:shop_app_product_changelist': 10,
+    'admin:shop_app_order_changelist': 10,
+    'admin:shop_app_order_change': 10,
+    'admin:shop_app_archivedorder_changelist': 10,
+}
+# Holding units for cart costs reservation lookup and writes
+RESERVATION_QUERY_BUDGETS = {'shop:detail': 12, 'shop:delete': 10, 'shop:order': 15}
+if SHOP_RESERVATION_TIMEOUT:
+    SHOP_QUERY_BUDGETS.update(RESERVATION_QUERY_BUDGETS)
+# Raise QueryBudgetExceeded instead of logging, set by test runner
+SHOP_QUERY_BUDGET_STRICT = False
+TEST_RUNNER = 'shop_app.tests.runner.QueryBudgetTestRunner'
+
+# Route storefront to async views, for ASGI deployment
+SHOP_ASYNC_VIEWS = bool(int(os.environ.get('SHOP_ASYNC_VIEWS', 0)))
@@ -1,5 +1,21 @@
-from django.contrib import admin
-from . import models
+import datetime
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import ForeignKeyRawIdWidget
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.urls import NoReverseMatch, path, reverse
+from django.utils import timezone
+from django.utils.text import Truncator
+
+from . import fulfilment, models, reports
+from .forms import OrderReportForm
+from .pagination import EstimatedCountPaginator
+from .search import search_products
 
 
 @admin.register(models.Category)
@@ -13,22 +29,92 @@ class ProductAdmin(admin.ModelAdmin):
     '''
     Item model representation on admin site.
     '''
-    list_display = ('name','category','price','image_preview')
+    list_display = ('name','category','price','stock','available','image_preview')
     list_editable = ('price',)
     list_filter = ('category',)
+    list_select_related = ('category',)
     search_fields = ('name',)
     prepopulated_fields = {'slug': ('name',)}
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        '''
+        Use full-text index instead of LIKE scan.
+        '''
+        if not search_term:
+            return queryset, False
+        return search_products(queryset, search_term), False
+
+
+class PreloadedRawIdWidget(ForeignKeyRawIdWidget):
+    '''
+    Raw id widget labelled with related object form instance already
+    holds, instead of fetching it by value.
+    '''
+    obj = None
+
+    def label_and_url_for_value(self, value):
+        obj = self.obj
+        if obj is None or str(obj.pk) != str(value):
+            return super().label_and_url_for_value(value)
+        try:
+            url = reverse(f'{self.admin_site.name}:{obj._meta.app_label}_{obj._meta.model_name}_change',
+                          args=(obj.pk,))
+        except NoReverseMatch:
+            url = ''
+        return Truncator(obj).words(14), url
+
+
+class OrderItemForm(forms.ModelForm):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.item_id is not None:
+            self.fields['item'].widget.obj = self.instance.item
+
+
+def search_orders(queryset, search_term, since=None):
+    '''
+    Filter orders by number, email or words of customer name. Names are
+    matched only among orders created since date when it's given.
+    '''
+    term = search_term.strip()
+    if not term:
+        return queryset
+    if term.isdigit():
+        return queryset.filter(pk=int(term))
+    if '@' in term:
+        return queryset.filter(Q(email=term) | Q(email=term.lower()))
+    condition = Q()
+    for word in term.split():
+        condition &= Q(first_name__icontains=word) | Q(last_name__icontains=word)
+    if since is not None:
+        condition &= Q(created_date__gte=since)
+    return queryset.filter(condition)
 
 
 class OrderItemInline(admin.StackedInline):
     '''
-    Items in order inline representation.
+    Items in order inline representation. Products are selected with
+    items and picked by id, select of whole catalog in every row would
+    cost a query per row and megabytes of HTML.
     '''
     model = models.OrderItems
-    fields = ('item','item_quantity','image_preview')
-    readonly_fields = ('image_preview',)
+    form = OrderItemForm
+    fields = ('item','item_quantity','unit_price','line_total','image_preview')
+    readonly_fields = ('unit_price','line_total','image_preview')
+    raw_id_fields = ('item',)
     extra = 0
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('item')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'item':
+            kwargs['widget'] = PreloadedRawIdWidget(db_field.remote_field, self.admin_site, using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
 
 @admin.register(models.Order)
 class OrderAdmin(admin.ModelAdmin):
@@ -40,22 +126,156 @@ class OrderAdmin(admin.ModelAdmin):
     actions = ('close_order', 'process_order', 'cancel_order')
     inlines = (OrderItemInline,)
     date_hierarchy = 'created_date'
+    change_list_template = 'admin/shop_app/order/change_list.html'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # Lines may have changed, stored total follows them.
+        order = form.instance
+        order.price = order.calc_price()
+        order.save(update_fields=['price', 'updated_at'])
+
+    def get_search_results(self, request, queryset, search_term):
+        '''
+        Search that never scans the whole table: order number and email
+        are looked up by index, names only among orders of last
+        SHOP_ADMIN_SEARCH_DAYS days.
+        '''
+        since = timezone.now() - datetime.timedelta(days=settings.SHOP_ADMIN_SEARCH_DAYS)
+        return search_orders(queryset, search_term, since), False
+
+    def get_urls(self):
+        return [
+            path('report/', self.admin_site.admin_view(self.report_view), name='shop_app_order_report'),
+            path('export/', self.admin_site.admin_view(self.export_view), name='shop_app_order_export'),
+        ] + super().get_urls()
+
+    def get_report_orders(self, request):
+        '''
+        Return report form bound to GET and live and archived orders it
+        selects.
+        '''
+        form = OrderReportForm(request.GET or None)
+        orders = self.get_queryset(request)
+        if not form.is_bound:
+            return form, reports.filter_orders(orders), reports.archived_orders()
+        if not form.is_valid():
+            return form, orders.none(), models.ArchivedOrder.objects.none()
+        selection = form.cleaned_data['date_from'], form.cleaned_data['date_to'], form.cleaned_data['status']
+        return form, reports.filter_orders(orders, *selection), reports.archived_orders(*selection)
+
+    def report_view(self, request):
+        '''
+        Revenue by day, category and product computed by the database.
+        '''
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        form, orders, archived = self.get_report_orders(request)
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Orders report',
+            'form': form,
+            'summary': reports.summary(orders, archived),
+            'by_day': reports.revenue_by_day(orders, archived),
+            'by_category': reports.revenue_by_category(orders, archived),
+            'by_product': reports.revenue_by_product(orders, archived=archived),
+            'export_query': request.GET.urlencode(),
+        }
+        return TemplateResponse(request, 'admin/shop_app/order/report.html', context)
+
+    def export_view(self, request):
+        '''
+        Stream selected orders as CSV without loading them in memory.
+        '''
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        form, orders, archived = self.get_report_orders(request)
+        response = StreamingHttpResponse(reports.export_csv(orders, archived=archived), content_type='text/csv')
+        filename = f'orders-{timezone.now():%Y%m%d-%H%M%S}.csv'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def change_status(self, request, queryset, status, **fields):
+        '''
+        Move selected orders to status where transition is allowed and
+        report the ones left as they are.
+        '''
+        selected = queryset.count()
+        moved = fulfilment.transition(queryset, status, **fields)
+        label = models.Order.Status(status).label
+        self.message_user(request, f'{moved} orders moved to {label}.', messages.SUCCESS)
+        if moved < selected:
+            self.message_user(request, f'{selected - moved} orders can\'t move to {label} from their status.',
+                              messages.WARNING)
 
     def close_order(self, request, queryset):
         '''
         Action to set order status to DONE
         '''
-        queryset.update(status=models.Order.Status.DONE)
+        self.change_status(request, queryset, models.Order.Status.DONE, fulfilled_date=timezone.now())
 
     def process_order(self, request, queryset):
         '''
-        Action to set order status to PROCESSING 
+        Action to set order status to PROCESSING, orders are claimed by
+        the user, so fulfilment workers leave them alone.
         '''
-        queryset.update(status=models.Order.Status.PROCESSING)
+        self.change_status(request, queryset, models.Order.Status.PROCESSING,
+                           claimed_by=request.user.get_username(), claimed_date=timezone.now())
 
     def cancel_order(self, request, queryset):
         '''
         Action to set order status to CANCELED 
         '''
-        queryset.update(status=models.Order.Status.CANCELED)
+        self.change_status(request, queryset, models.Order.Status.CANCELED)
+
+
+class ArchivedOrderItemInline(admin.TabularInline):
+    model = models.ArchivedOrderItem
+    fields = ('item_name','item_quantity','unit_price','line_total')
+    readonly_fields = fields
+    can_delete = False
+    extra = 0
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
+
+@admin.register(models.ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    '''
+    Read-only archive of closed orders. Nothing is listed until searched
+    for, so archive is read only when staff asks for it.
+    '''
+    list_display = ('id','email','first_name','last_name','status','price','created_date','archived_date')
+    search_fields = ('email','first_name','last_name')
+    inlines = (ArchivedOrderItemInline,)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset.none(), False
+        return search_orders(queryset, search_term), False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+
+@admin.register(models.OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    '''
+    Outbox representation on admin site.
+    '''
+    list_display = ('subject','recipients','status','attempts','created_date','sent_date')
+    list_filter = ('status',)
+    readonly_fields = ('attempts','last_error','created_date','sent_date')
@@ -0,0 +1,219 @@
+'''
+Read-only JSON catalog API.
+
+Rows are read with values() and serialized as they come, no model
+instances are built. Clients pick fields with ?fields=name,price and only
+those columns are selected. Product list takes ProductFilter parameters
+and is paged by cursor; search results, ordered by relevance, get cursor
+holding offset instead. Batch endpoint resolves up to
+SHOP_API_BATCH_LIMIT slugs with one query.
+'''
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from . import cache
+from .conditional import conditional_page, list_validators
+from .filters import ProductFilter
+from .models import Category, Product
+from .pagination import KeysetPaginator, InvalidCursor, decode_cursor, encode_cursor
+from .perf import query_budget
+
+
+# Output name: lookup passed to values()
+PRODUCT_FIELDS = {
+    'id': 'id',
+    'slug': 'slug',
+    'name': 'name',
+    'price': 'price',
+    'description': 'description',
+    'image': 'image',
+    'category': 'category__slug',
+    'available': 'available',
+    'updated_at': 'updated_at',
+}
+PRODUCT_LIST_FIELDS = ('id', 'slug', 'name', 'price', 'image', 'category', 'available')
+CATEGORY_FIELDS = {
+    'id': 'id',
+    'slug': 'slug',
+    'name': 'name',
+    'product_count': 'product_count',
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def error(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def api_view(view):
+    '''
+    Turn BadRequest raised by view into 400 response.
+    '''
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except BadRequest as e:
+            return error(e.args[0])
+    return wrapper
+
+
+def selected_fields(request, fields, default):
+    '''
+    Return output names requested in fields parameter or default ones.
+    '''
+    value = request.GET.get('fields')
+    if not value:
+        return list(default)
+    names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in names if name not in fields]
+    if unknown or not names:
+        raise BadRequest(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(fields)}.")
+    return names
+
+
+def serializer(fields, names):
+    '''
+    Return values() lookups for names and function turning a row into
+    dict of requested fields.
+    '''
+    lookups = [fields[name] for name in names]
+    pairs = list(zip(names, lookups))
+
+    def serialize(row):
+        item = {name: row[lookup] for name, lookup in pairs}
+        if 'image' in item:
+            item['image'] = default_storage.url(item['image']) if item['image'] else None
+        return item
+    return lookups, serialize
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.SHOP_API_PAGE_SIZE))
+    except ValueError:
+        raise BadRequest('limit must be a number.')
+    return max(1, min(size, settings.SHOP_API_MAX_PAGE_SIZE))
+
+
+def offset_page(queryset, cursor, size):
+    '''
+    Page of queryset that can't be seeked by key, cursor holds offset.
+    '''
+    offset = 0
+    if cursor:
+        values, _ = decode_cursor(cursor)
+        if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+            raise InvalidCursor('Invalid cursor.')
+        offset = values[0]
+    rows = list(queryset[offset:offset + size + 1])
+    next_cursor = encode_cursor([offset + size]) if len(rows) > size else None
+    return rows[:size], next_cursor
+
+
+def filtered_products(filterset):
+    if not filterset.is_valid():
+        raise BadRequest(filterset.errors.get_json_data())
+    return filterset.qs
+
+
+@api_view
+def product_list_response(request, filterset):
+    names = selected_fields(request, PRODUCT_FIELDS, PRODUCT_LIST_FIELDS)
+    lookups, serialize = serializer(PRODUCT_FIELDS, names)
+    queryset = filtered_products(filterset)
+    size, cursor = page_size(request), request.GET.get('cursor')
+    try:
+        if request.GET.get('q'):
+            rows, next_cursor = offset_page(queryset.values(*lookups), cursor, size)
+        else:
+            # Ordering values are selected too, cursor is made of them.
+            ordering = filterset.get_ordering()
+            queryset = queryset.values(*dict.fromkeys([*lookups, *(f.lstrip('-') for f in ordering)]))
+            page = KeysetPaginator(queryset, size, ordering=ordering).page(cursor)
+            rows, next_cursor = page.object_list, page.next_cursor
+    except InvalidCursor as e:
+        raise BadRequest(str(e))
+    return JsonResponse({'results': [serialize(row) for row in rows], 'next': next_cursor})
+
+
+def get_list_validators(request, filterset):
+    '''
+    Validators of product list, cached for current catalog version.
+    '''
+    def compute():
+        try:
+            return list_validators(filtered_products(filterset))
+        except BadRequest:
+            return None
+    return cache.get_or_set(cache.page_cache_key(request, 'api-list-validators'), compute)
+
+
+@require_GET
+@query_budget(3)
+def product_list(request):
+    '''
+    Products matching ProductFilter parameters, in order it sorts by, with
+    cursor of next page. Responses are cached and validated like HTML
+    product list.
+    '''
+    # Shared by validators and response, validation queries categories.
+    filterset = ProductFilter(request.GET, queryset=Product.objects.all(), request=request)
+    render = partial(cache.cached_page, request, 'api-list', partial(product_list_response, request, filterset))
+    return conditional_page(request, partial(get_list_validators, request, filterset), render, 0)
+
+
+@require_GET
+@query_budget(1)
+@api_view
+def product_detail(request, slug):
+    names = selected_fields(request, PRODUCT_FIELDS, PRODUCT_FIELDS)
+    lookups, serialize = serializer(PRODUCT_FIELDS, names)
+    row = Product.objects.filter(slug=slug).values(*lookups).first()
+    if row is None:
+        return error('Product not found.', status=404)
+    return JsonResponse(serialize(row))
+
+
+@require_GET
+@query_budget(1)
+@api_view
+def product_batch(request):
+    '''
+    Products by slugs given as repeated slug parameter or comma separated
+    slugs, in given order, with one query. Slugs not found are listed in
+    missing.
+    '''
+    slugs = [*request.GET.getlist('slug'), *request.GET.get('slugs', '').split(',')]
+    slugs = list(dict.fromkeys(slug.strip() for slug in slugs if slug.strip()))
+    if not slugs:
+        raise BadRequest('No slugs given.')
+    if len(slugs) > settings.SHOP_API_BATCH_LIMIT:
+        raise BadRequest(f'At most {settings.SHOP_API_BATCH_LIMIT} slugs per request.')
+    names = selected_fields(request, PRODUCT_FIELDS, PRODUCT_LIST_FIELDS)
+    lookups, serialize = serializer(PRODUCT_FIELDS, names)
+    rows = Product.objects.filter(slug__in=slugs).order_by().values(*dict.fromkeys([*lookups, 'slug']))
+    found = {row['slug']: row for row in rows}
+    return JsonResponse({
+        'results': [serialize(found[slug]) for slug in slugs if slug in found],
+        'missing': [slug for slug in slugs if slug not in found],
+    })
+
+
+@require_GET
+@query_budget(1)
+@api_view
+def category_list(request):
+    '''
+    All categories, there are few of them, so no paging.
+    '''
+    names = selected_fields(request, CATEGORY_FIELDS, CATEGORY_FIELDS)
+    lookups, serialize = serializer(CATEGORY_FIELDS, names)
+    return JsonResponse({'results': [serialize(row) for row in Category.objects.values(*lookups)]})
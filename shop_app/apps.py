@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ShopAppConfig(AppConfig):
     name = 'shop_app'
+
+    def ready(self):
+        from . import cache, counters, images, search  # noqa: F401 connect catalog receivers
+        from . import db, perf  # noqa: F401 tune and instrument database connections
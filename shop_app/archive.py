@@ -0,0 +1,97 @@
+'''
+Archive of closed orders.
+
+Orders that are DONE or CANCELED and older than SHOP_ARCHIVE_DAYS are
+moved, with their lines, from Order and OrderItems to ArchivedOrder and
+ArchivedOrderItem, so tables staff work with every day hold only recent
+and open orders. Orders are moved in batches picked by (status,
+created_date) index, oldest first. Each batch is copied and deleted in
+one transaction, so interrupted run leaves every order in exactly one
+of the tables and next run continues where it stopped. Pause between
+batches leaves database to other writers.
+'''
+import datetime
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItems
+
+
+CLOSED = (Order.Status.DONE, Order.Status.CANCELED)
+
+ORDER_FIELDS = ('id', 'first_name', 'last_name', 'email', 'phone', 'price', 'status', 'comment',
+                'created_date', 'updated_at', 'claimed_by', 'claimed_date', 'fulfilled_date')
+
+
+def cutoff(days=None):
+    '''
+    Return date orders created before are archived.
+    '''
+    if days is None:
+        days = settings.SHOP_ARCHIVE_DAYS
+    return timezone.now() - datetime.timedelta(days=days)
+
+
+def oldest_closed(before, batch_size, using='default'):
+    '''
+    Return values of up to batch_size oldest closed orders created before
+    date. Statuses are read one by one, each is ordered range of the
+    (status, created_date) index, while IN over both would sort them all.
+    '''
+    orders = []
+    for status in CLOSED:
+        if len(orders) >= batch_size:
+            break
+        closed = Order.objects.using(using).filter(status=status, created_date__lt=before)
+        orders += closed.order_by('created_date', 'pk').values(*ORDER_FIELDS)[:batch_size - len(orders)]
+    return orders
+
+
+def archive_batch(before, batch_size, using='default'):
+    '''
+    Move up to batch_size oldest closed orders created before date to
+    archive, return number of orders moved.
+    '''
+    with transaction.atomic(using=using):
+        orders = oldest_closed(before, batch_size, using)
+        if not orders:
+            return 0
+        pks = [order['id'] for order in orders]
+        now = timezone.now()
+        ArchivedOrder.objects.using(using).bulk_create(
+            ArchivedOrder(archived_date=now, **order) for order in orders
+        )
+        lines = OrderItems.objects.using(using).filter(order_id__in=pks).values(
+            'order_id', 'item_id', 'item_quantity', 'unit_price', 'line_total', item_name=F('item__name'),
+        )
+        ArchivedOrderItem.objects.using(using).bulk_create(ArchivedOrderItem(**line) for line in lines.iterator())
+        # Lines go with orders by cascade.
+        Order.objects.using(using).filter(pk__in=pks).delete()
+    return len(pks)
+
+
+def archive_orders(before=None, batch_size=500, pause=0, limit=None, using='default', progress=None):
+    '''
+    Move closed orders created before date to archive in batches,
+    sleeping pause seconds between them, until none is left or limit
+    orders are moved. progress is called with total after every batch.
+    Return number of orders moved.
+    '''
+    if before is None:
+        before = cutoff()
+    moved = 0
+    while limit is None or moved < limit:
+        size = batch_size if limit is None else min(batch_size, limit - moved)
+        rows = archive_batch(before, size, using)
+        moved += rows
+        if rows and progress is not None:
+            progress(moved)
+        if rows < size:
+            break
+        if pause:
+            time.sleep(pause)
+    return moved
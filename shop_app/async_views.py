@@ -0,0 +1,39 @@
+'''
+Async variants of storefront views, routed instead of sync ones when
+SHOP_ASYNC_VIEWS is on, for ASGI deployment.
+
+Under ASGI Django runs sync views in one thread shared by all requests.
+ORM and templates are synchronous, so these variants run the view in
+thread pool through database_sync_to_async: requests waiting for database
+don't queue behind each other and event loop is never blocked. Response
+is rendered in the worker too, as templates may evaluate lazy querysets.
+Mail and image derivatives are not made in request at all: checkout only
+queues mail in outbox and derivatives are built by image worker threads.
+'''
+import functools
+
+from .db import database_sync_to_async
+from . import views
+
+
+def async_variant(view):
+    '''
+    Return async view running sync view in worker thread.
+    '''
+    @database_sync_to_async
+    def run(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+        return response
+
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        return await run(request, *args, **kwargs)
+    return async_view
+
+
+product_list_view = async_variant(views.ProductListView.as_view())
+product_detail_view = async_variant(views.product_detail_view)
+cart_view = async_variant(views.cart_view)
+order_view = async_variant(views.order_view)
@@ -0,0 +1,192 @@
+'''
+Helpers shared by benchmark management commands.
+'''
+import contextlib
+import datetime
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import OperationalError, connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .checkout import place_order
+from .forms import OrderForm
+from .inventory import OutOfStock
+from .models import Category, Order, OrderItems, Product
+
+
+WORDS = (
+    'amber', 'bold', 'cotton', 'denim', 'elegant', 'fresh', 'golden', 'handmade', 'indigo', 'jade',
+    'knitted', 'leather', 'matte', 'navy', 'organic', 'polished', 'quilted', 'rustic', 'silk', 'teak',
+    'urban', 'velvet', 'woolen', 'xenon', 'yellow', 'zesty', 'lamp', 'chair', 'table', 'shirt',
+    'jacket', 'bottle', 'basket', 'candle', 'mirror', 'rug', 'scarf', 'blanket', 'vase', 'clock',
+)
+
+
+@contextlib.contextmanager
+def bench_database():
+    '''
+    Run block against throwaway database file, so benchmarks never
+    touch real data. Yields path of the database.
+    '''
+    fd, path = tempfile.mkstemp(prefix='shop-bench-', suffix='.sqlite3')
+    os.close(fd)
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    test_settings['NAME'] = path
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield path
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def describe(i):
+    '''
+    Deterministic description made of few words from WORDS.
+    '''
+    return ' '.join(WORDS[(i * step + step) % len(WORDS)] for step in (7, 11, 17, 29))
+
+
+def seed_catalog(products, categories=10, batch_size=5000):
+    '''
+    Bulk create categories and products with predictable names.
+    '''
+    Category.objects.bulk_create(
+        Category(name=f'Category {i:03}', slug=f'category-{i:03}') for i in range(categories)
+    )
+    # bulk_create doesn't set primary keys on every backend
+    cats = list(Category.objects.order_by('pk'))
+    batch = []
+    for i in range(products):
+        batch.append(Product(
+            name=f'Product {i:07}', slug=f'product-{i:07}',
+            price=1 + i % 1000, description=describe(i),
+            image=f'images/product-{i:07}.png', category=cats[i % len(cats)],
+        ))
+        if len(batch) >= batch_size:
+            Product.objects.bulk_create(batch)
+            batch = []
+    Product.objects.bulk_create(batch)
+    return cats
+
+
+def seed_orders(orders, items_per_order=2, days=365, batch_size=5000):
+    '''
+    Bulk create orders spread evenly over last days, each with
+    items_per_order lines of seeded products.
+    '''
+    products = list(Product.objects.values_list('pk', 'price'))
+    start_pk = (Order.objects.order_by('-pk').values_list('pk', flat=True).first() or 0) + 1
+    now = timezone.now()
+    for start in range(0, orders, batch_size):
+        batch, items = [], []
+        for i in range(start, min(start + batch_size, orders)):
+            lines = [products[(i * 7 + n) % len(products)] for n in range(items_per_order)] if products else []
+            batch.append(Order(
+                pk=start_pk + i, first_name='Bob', last_name='Bobston', email=f'bob{i}@mail.com',
+                phone='380959484855', status=i % 4, price=sum(price for pk, price in lines),
+            ))
+            items += [OrderItems(order_id=start_pk + i, item_id=pk, item_quantity=1, unit_price=price, line_total=price)
+                      for pk, price in lines]
+        Order.objects.bulk_create(batch)
+        OrderItems.objects.bulk_create(items)
+        # created_date is auto_now_add, bulk_update is the way to set it.
+        for order in batch:
+            order.created_date = now - datetime.timedelta(days=days * (order.pk - start_pk) / orders)
+        Order.objects.bulk_update(batch, ['created_date'])
+
+
+def percentiles(values, points=(50, 95, 99)):
+    '''
+    Return {'p50': ...} of values, ms rounded to microseconds.
+    '''
+    if len(values) < 2:
+        values = values * 2 or [0, 0]
+    quantiles = statistics.quantiles(values, n=100, method='inclusive')
+    return {f'p{point}': round(quantiles[point - 1], 3) for point in points}
+
+
+def measure(func, repeat=5):
+    '''
+    Call func repeat times, return median and best time in ms
+    and number of queries made by single call.
+    '''
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'best_ms': round(min(timings), 3),
+        'queries': len(queries),
+    }
+
+
+def bench_client(**defaults):
+    '''
+    Test client that passes ALLOWED_HOSTS check of development settings.
+    '''
+    return Client(SERVER_NAME='localhost', **defaults)
+
+
+def throughput(func, requests):
+    '''
+    Call func requests times, return calls per second.
+    '''
+    start = time.perf_counter()
+    for _ in range(requests):
+        func()
+    return round(requests / (time.perf_counter() - start), 1)
+
+
+CHECKOUT_DATA = {'first_name': 'Bob', 'last_name': 'Bobston', 'email': 'bob@mail.com', 'phone': '380959484855'}
+
+
+def checkout_stress(slug, threads, quantity=1):
+    '''
+    Check out quantity units of one product from concurrent threads until
+    it sells out. Checkout failed on locked database is retried. Return
+    number of orders, rejected checkouts, retries and seconds.
+    '''
+    counts = {'orders': 0, 'rejected': 0, 'retries': 0}
+    lock = threading.Lock()
+
+    def count(name):
+        with lock:
+            counts[name] += 1
+
+    def buyer(_):
+        try:
+            while True:
+                form = OrderForm(data=CHECKOUT_DATA)
+                form.is_valid()
+                try:
+                    place_order(form, {slug: quantity})
+                except OutOfStock:
+                    count('rejected')
+                    return
+                except OperationalError:
+                    count('retries')
+                    time.sleep(0.001)
+                else:
+                    count('orders')
+        finally:
+            connections.close_all()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(buyer, range(threads)))
+    counts['seconds'] = time.perf_counter() - start
+    return counts
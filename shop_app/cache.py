@@ -0,0 +1,189 @@
+'''
+Catalog page cache.
+
+Every cached entry remembers catalog version it was built for. Version is
+bumped on any Product or Category change, so entry built for older version
+is dropped on lookup and never served. Entries built from read replica
+are not stored for SHOP_REPLICA_PIN_SECONDS after change, replica may
+still miss it and entry would be served for the new version.
+'''
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib import messages
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from .routers import current_routing
+from .signals import catalog_changed
+
+
+VERSION_KEY = 'shop:catalog-version'
+CHANGED_KEY = 'shop:catalog-changed-at'
+STATS = ('hits', 'misses', 'evictions')
+
+
+def get_cache():
+    return caches[getattr(settings, 'SHOP_PAGE_CACHE_ALIAS', 'default')]
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    '''
+    Catalog version in memory of one process is bumped only there, other
+    processes would keep serving pages of old catalog.
+    '''
+    if settings.DEBUG or not isinstance(get_cache(), LocMemCache):
+        return []
+    return [checks.Warning(
+        'Catalog page cache is local memory cache, pages may be served stale with more than one process.',
+        hint='Point SHOP_PAGE_CACHE_ALIAS to cache shared by all processes.',
+        id='shop_app.W001',
+    )]
+
+
+def get_catalog_version():
+    '''
+    Return current catalog version.
+    '''
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from current time, so version lost from cache never goes
+        # back to value some stale entry was stored with.
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _incr_version():
+    cache = get_cache()
+    # Set before version, whoever sees new version sees the time too.
+    cache.set(CHANGED_KEY, time.time(), None)
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def bump_catalog_version(using=None):
+    '''
+    Invalidate all cached catalog entries. Inside transaction version is
+    bumped again on commit, so page rendered from uncommitted snapshot by
+    concurrent request can't outlive the change.
+    '''
+    _incr_version()
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(_incr_version, using=using)
+
+
+def _count(stat):
+    cache = get_cache()
+    key = f'shop:page-cache:{stat}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def get_stats():
+    '''
+    Return hit, miss and eviction counters of catalog cache.
+    '''
+    values = get_cache().get_many([f'shop:page-cache:{stat}' for stat in STATS])
+    return {stat: values.get(f'shop:page-cache:{stat}', 0) for stat in STATS}
+
+
+def reset_stats():
+    get_cache().delete_many([f'shop:page-cache:{stat}' for stat in STATS])
+
+
+def _lookup(key, version):
+    cache = get_cache()
+    entry = cache.get(key)
+    if entry is not None:
+        if entry[0] == version:
+            _count('hits')
+            return entry[1]
+        cache.delete(key)
+        _count('evictions')
+    _count('misses')
+    return None
+
+
+def replica_may_lag():
+    '''
+    Return True if current request read from replica within replication
+    lag after last catalog change.
+    '''
+    routing = current_routing.get()
+    if routing is None or not routing.read_replica:
+        return False
+    changed = get_cache().get(CHANGED_KEY)
+    return changed is not None and time.time() - changed < settings.SHOP_REPLICA_PIN_SECONDS
+
+
+def _store(key, version, value):
+    if replica_may_lag():
+        return
+    get_cache().set(key, (version, value), settings.SHOP_PAGE_CACHE_TIMEOUT)
+
+
+def get_or_set(key, compute):
+    '''
+    Return value cached for current catalog version or compute and cache it.
+    None returned by compute is not cached.
+    '''
+    if not settings.SHOP_PAGE_CACHE_TIMEOUT:
+        return compute()
+    version = get_catalog_version()
+    value = _lookup(key, version)
+    if value is None:
+        value = compute()
+        if value is not None:
+            _store(key, version, value)
+    return value
+
+
+def page_cache_key(request, name, *vary_on):
+    query = '&'.join(f'{k}={v}' for k, values in sorted(request.GET.lists()) for v in sorted(values))
+    raw = ':'.join([request.path, query, *map(str, vary_on)])
+    return f'shop:page:{name}:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def cached_page(request, name, render, *vary_on):
+    '''
+    Return cached page response or call render to build it. Cache key is
+    made of request path, querystring and vary_on values (e.g. cart count).
+    Requests with pending flash messages bypass the cache.
+    '''
+    if (not settings.SHOP_PAGE_CACHE_TIMEOUT or request.method not in ('GET', 'HEAD')
+            or len(messages.get_messages(request))):
+        return render()
+
+    version = get_catalog_version()
+    key = page_cache_key(request, name, *vary_on)
+    entry = _lookup(key, version)
+    if entry is not None:
+        content, content_type = entry
+        return HttpResponse(content, content_type=content_type)
+
+    response = render()
+    if hasattr(response, 'render'):
+        response = response.render()
+    if response.status_code == 200 and not response.streaming and not response.cookies:
+        _store(key, version, (response.content, response['Content-Type']))
+    return response
+
+
+@receiver([post_save, post_delete], sender='shop_app.Product')
+@receiver([post_save, post_delete], sender='shop_app.Category')
+@receiver(catalog_changed)
+def invalidate_catalog(sender, using=None, **kwargs):
+    bump_catalog_version(using)
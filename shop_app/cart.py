@@ -0,0 +1,229 @@
+'''
+Shopping cart with pluggable storage.
+
+Cart is attached to request by CartMiddleware, loaded lazily on first
+access and written back once, when response leaves the middleware, no
+matter how many times it was changed during the request.
+'''
+import secrets
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+
+class BaseCartStore:
+    '''
+    Storage backend of cart. Works with plain dict of product slug
+    to quantity.
+    '''
+
+    def __init__(self, request):
+        self.request = request
+
+    def load(self):
+        raise NotImplementedError
+
+    def save(self, items, response):
+        raise NotImplementedError
+
+
+class SessionCartStore(BaseCartStore):
+    '''
+    Keep cart in session, costs session read and write with database
+    session engine.
+    '''
+    session_key = 'cart'
+
+    def load(self):
+        return dict(self.request.session.get(self.session_key, {}))
+
+    def save(self, items, response):
+        if items:
+            self.request.session[self.session_key] = items
+        else:
+            self.request.session.pop(self.session_key, None)
+
+
+class SignedCookieCartStore(BaseCartStore):
+    '''
+    Keep cart in signed cookie as compact "slug:quantity,..." string.
+    Doesn't touch database at all, but cart size is limited by cookie size.
+    '''
+    salt = 'shop_app.cart'
+
+    @staticmethod
+    def encode(items):
+        return ','.join(f'{slug}:{quantity}' for slug, quantity in items.items())
+
+    @staticmethod
+    def decode(value):
+        items = {}
+        for pair in filter(None, value.split(',')):
+            slug, _, quantity = pair.rpartition(':')
+            if slug and quantity.isdigit():
+                items[slug] = int(quantity)
+        return items
+
+    def load(self):
+        value = self.request.get_signed_cookie(settings.SHOP_CART_COOKIE_NAME, default=None,
+                                               salt=self.salt, max_age=settings.SHOP_CART_COOKIE_AGE)
+        return self.decode(value) if value else {}
+
+    def save(self, items, response):
+        if items:
+            response.set_signed_cookie(settings.SHOP_CART_COOKIE_NAME, self.encode(items), salt=self.salt,
+                                       max_age=settings.SHOP_CART_COOKIE_AGE, httponly=True, samesite='Lax')
+        else:
+            response.delete_cookie(settings.SHOP_CART_COOKIE_NAME, samesite='Lax')
+
+
+class CacheCartStore(BaseCartStore):
+    '''
+    Keep cart in cache under random id stored in cookie.
+    '''
+
+    @property
+    def cache(self):
+        return caches[settings.SHOP_CART_CACHE_ALIAS]
+
+    def get_key(self, cart_id):
+        return f'shop:cart:{cart_id}'
+
+    def load(self):
+        cart_id = self.request.COOKIES.get(settings.SHOP_CART_COOKIE_NAME)
+        return dict(self.cache.get(self.get_key(cart_id), {})) if cart_id else {}
+
+    def save(self, items, response):
+        cart_id = self.request.COOKIES.get(settings.SHOP_CART_COOKIE_NAME)
+        if not items:
+            if cart_id:
+                self.cache.delete(self.get_key(cart_id))
+                response.delete_cookie(settings.SHOP_CART_COOKIE_NAME, samesite='Lax')
+            return
+        if not cart_id:
+            cart_id = secrets.token_urlsafe(24)
+            response.set_cookie(settings.SHOP_CART_COOKIE_NAME, cart_id,
+                                max_age=settings.SHOP_CART_COOKIE_AGE, httponly=True, samesite='Lax')
+        self.cache.set(self.get_key(cart_id), items, settings.SHOP_CART_COOKIE_AGE)
+
+
+def resolve_cart(items, lock=False):
+    '''
+    Fetch products for mapping of slug to quantity with one query.
+    Return list of products with item_count and line_total set,
+    and total price.
+    '''
+    if not items:
+        return [], 0
+    queryset = Product.objects.filter(slug__in=list(items)).only(
+        'slug', 'name', 'price', 'image', 'image_fingerprint', 'category_id', 'stock')
+    if lock:
+        queryset = queryset.select_for_update()
+    products = list(queryset)
+    total = 0
+    for product in products:
+        product.item_count = items[product.slug]
+        product.line_total = product.price * product.item_count
+        total += product.line_total
+    return products, total
+
+
+class Cart:
+    '''
+    Mapping of product slug to quantity. Changes are kept in memory
+    until save is called.
+    '''
+
+    def __init__(self, store):
+        self.store = store
+        self.modified = False
+        self._items = None
+        self._resolved = None
+        self._token = None
+        self._new_token = False
+
+    @property
+    def items(self):
+        if self._items is None:
+            self._items = self.store.load()
+        return self._items
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __contains__(self, slug):
+        return slug in self.items
+
+    def __getitem__(self, slug):
+        return self.items[slug]
+
+    def resolve(self):
+        '''
+        Return products in cart and total price, see resolve_cart.
+        Result is reused until cart is changed.
+        '''
+        if self._resolved is None:
+            self._resolved = resolve_cart(self.items)
+        return self._resolved
+
+    def _changed(self):
+        self.modified = True
+        self._resolved = None
+
+    def add(self, slug, quantity):
+        '''
+        Add product to cart or change its quantity.
+        '''
+        self.items[slug] = quantity
+        self._changed()
+
+    def update(self, items):
+        '''
+        Set quantities of several products at once.
+        '''
+        self.items.update(items)
+        self._changed()
+
+    def remove(self, slug):
+        '''
+        Remove product from cart, raise KeyError if it is not there.
+        '''
+        del self.items[slug]
+        self._changed()
+
+    def clear(self):
+        self._items = {}
+        self._changed()
+
+    @property
+    def token(self):
+        '''
+        Random id of cart kept in its own cookie, stock reservations
+        are held for it.
+        '''
+        if self._token is None:
+            self._token = self.store.request.COOKIES.get(settings.SHOP_CART_TOKEN_COOKIE_NAME)
+            if not self._token:
+                self._token = secrets.token_urlsafe(24)
+                self._new_token = self.modified = True
+        return self._token
+
+    def save(self, response):
+        if self.modified:
+            self.store.save(self.items, response)
+            self.modified = False
+        if self._new_token:
+            response.set_cookie(settings.SHOP_CART_TOKEN_COOKIE_NAME, self._token,
+                                max_age=settings.SHOP_CART_COOKIE_AGE, httponly=True, samesite='Lax')
+            self._new_token = False
+
+
+def get_cart(request):
+    store_class = import_string(settings.SHOP_CART_BACKEND)
+    return Cart(store_class(request))
@@ -0,0 +1,153 @@
+'''
+Streaming catalog import and export in CSV or JSON lines.
+
+Import reads rows lazily and upserts products by slug in batches: one
+query to fetch existing rows, one bulk_create and one bulk_update per
+set of changed columns in batch. Categories are resolved by slug through in-memory map.
+'''
+import csv
+import json
+import time
+from decimal import Decimal
+from itertools import islice
+
+from django.db import transaction
+
+from .models import Category, Product
+
+
+FIELDS = ('slug', 'name', 'price', 'description', 'image', 'category', 'available', 'stock')
+STORED_FIELDS = ('name', 'price', 'description', 'image', 'category_id', 'available', 'stock')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on'}
+
+
+def read_rows(file, fmt):
+    '''
+    Yield product rows as dicts from CSV or JSON lines file.
+    '''
+    if fmt == 'csv':
+        yield from csv.DictReader(file)
+    else:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def to_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+class CatalogImporter:
+    '''
+    Upsert products from rows. Columns missing in row are left untouched
+    on existing products.
+    '''
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.categories = dict(Category.objects.values_list('slug', 'pk'))
+        self.created = self.updated = self.unchanged = 0
+
+    def resolve_categories(self, rows):
+        missing = {row['category'] for row in rows if row.get('category')} - set(self.categories)
+        if missing:
+            Category.objects.bulk_create(
+                [Category(name=slug.replace('-', ' ').capitalize(), slug=slug) for slug in missing],
+                ignore_conflicts=True,
+            )
+            self.categories.update(Category.objects.filter(slug__in=missing).values_list('slug', 'pk'))
+
+    def product_values(self, row):
+        values = {}
+        for field in FIELDS[1:]:
+            if field not in row:
+                continue
+            value = row[field]
+            if field == 'price':
+                value = Decimal(str(value))
+            elif field == 'available':
+                value = to_bool(value)
+            elif field == 'stock':
+                value = int(value) if value not in ('', None) else None
+            elif field == 'category':
+                field, value = 'category_id', self.categories.get(value) if value else None
+            elif value == '' and Product._meta.get_field(field).null:
+                # CSV has no NULL, exported NULL comes back empty.
+                value = None
+            values[field] = value
+        # Bulk writes skip Product.save, which derives it.
+        if values.get('stock') is not None:
+            values['available'] = values['stock'] > 0
+        return values
+
+    def import_batch(self, rows):
+        self.resolve_categories(rows)
+        rows = {row['slug']: row for row in rows}
+        existing = {
+            values['slug']: values
+            for values in Product.objects.filter(slug__in=rows).values('pk', 'slug', *STORED_FIELDS)
+        }
+        to_create, to_update = [], {}
+        for slug, row in rows.items():
+            values = self.product_values(row)
+            if slug not in existing:
+                to_create.append(Product(slug=slug, **values))
+                continue
+            stored = existing[slug]
+            # Write only changed columns, so unchanged rows don't trigger
+            # search reindex and category recount.
+            values = {field: value for field, value in values.items() if stored[field] != value}
+            if not values:
+                self.unchanged += 1
+                continue
+            if 'image' in values:
+                values['image_fingerprint'] = ''
+            # Rows with same changed columns are updated together.
+            to_update.setdefault(tuple(sorted(values)), []).append(Product(pk=stored['pk'], slug=slug, **values))
+
+        with transaction.atomic():
+            if to_create:
+                Product.objects.bulk_create(to_create)
+            for fields, products in to_update.items():
+                Product.objects.bulk_update(products, fields)
+        self.created += len(to_create)
+        self.updated += sum(map(len, to_update.values()))
+
+    def run(self, rows, progress=None):
+        '''
+        Import all rows, call progress(done_rows, seconds) after each batch.
+        '''
+        start = time.perf_counter()
+        rows = iter(rows)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(batch)
+            if progress:
+                progress(self.created + self.updated + self.unchanged, time.perf_counter() - start)
+        return time.perf_counter() - start
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    '''
+    Yield product rows without loading whole catalog in memory.
+    '''
+    queryset = queryset if queryset is not None else Product.objects.all()
+    values = queryset.order_by('pk').values_list(
+        'slug', 'name', 'price', 'description', 'image', 'category__slug', 'available', 'stock')
+    for row in values.iterator(chunk_size=chunk_size):
+        yield dict(zip(FIELDS, row))
+
+
+def write_rows(rows, file, fmt):
+    if fmt == 'csv':
+        writer = csv.DictWriter(file, FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+    else:
+        for row in rows:
+            file.write(json.dumps(row, default=str) + '\n')
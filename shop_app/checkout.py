@@ -0,0 +1,54 @@
+from django.db import transaction
+
+from . import inventory
+from .cart import resolve_cart
+from .mail import queue_mail
+from .models import OrderItems
+
+
+class MissingProducts(Exception):
+
+    def __init__(self, slugs):
+        super().__init__(f'Products not in catalog: {", ".join(sorted(slugs))}')
+        self.slugs = slugs
+
+
+def place_order(order_form, cart):
+    '''
+    Create order from valid order form and cart (mapping of product slug
+    to quantity). Products are locked for the time of checkout, order items
+    are written with prices of products at checkout in one bulk insert and
+    their sum is stored as order price. Notification for admin is queued in the same transaction.
+
+    Stock is taken for units not held by cart reservations, raises
+    inventory.OutOfStock and nothing is saved if there is not enough.
+    Raises MissingProducts and nothing is saved if some products of cart
+    are gone from catalog.
+    '''
+    with transaction.atomic():
+        # Write comes first, so SQLite takes write lock at once and waits
+        # for it, instead of failing to upgrade read lock under contention.
+        order = order_form.save()
+        products, _ = resolve_cart(cart, lock=True)
+        if len(products) < len(cart) or not products:
+            raise MissingProducts(set(cart) - {product.slug for product in products})
+        held = inventory.claim(cart.token) if inventory.reservations_enabled() else {}
+        lines = []
+        for product in products:
+            reservation = held.pop(product.pk, None)
+            needed = product.item_count - (reservation.quantity if reservation else 0)
+            if needed >= 0:
+                lines.append((product, needed))
+            else:
+                inventory.return_stock(product, -needed)
+        inventory.take_stock_of(lines)
+        for reservation in held.values():
+            inventory.return_stock(reservation.product, reservation.quantity)
+        items = OrderItems.objects.bulk_create(
+            OrderItems.for_product(order, product, product.item_count) for product in products
+        )
+        order.price = sum(item.line_total for item in items)
+        order.save(update_fields=['price', 'updated_at'])
+        queue_mail('New order', f'There is new order, order_id:{order.id}',
+                   'admin@example.com', ['admin@example.com'])
+    return order
@@ -0,0 +1,78 @@
+'''
+Conditional GET for catalog pages.
+
+Validators come from updated_at of the data page shows, so repeat visit
+costs one aggregate query, or none, and 304 instead of rendering the page.
+Header cart widget depends on cart, so cart count is part of ETag, while
+Last-Modified, which can't express it, is sent only with empty cart.
+'''
+import hashlib
+
+from django.contrib import messages
+from django.db.models import Count, Max, Subquery
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Category
+
+
+class Validators:
+    '''
+    Last modification time of page data and other values the page
+    depends on, which are hashed into ETag.
+    '''
+
+    def __init__(self, last_modified, *parts):
+        self.last_modified = last_modified
+        self.parts = parts
+
+    def etag(self, *vary_on):
+        changed = self.last_modified.isoformat() if self.last_modified else ''
+        raw = ':'.join(map(str, (changed, *self.parts, *vary_on)))
+        # Weak, CSRF token in forms differs from render to render.
+        return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def list_validators(queryset):
+    '''
+    Validators of product list: last change and number of products in
+    queryset, so deletions change them too, and last change of categories
+    shown in filter sidebar, with one query.
+    '''
+    latest_category = Category.objects.order_by('-updated_at').values('updated_at')[:1]
+    values = queryset.order_by().aggregate(
+        products=Max('updated_at'), count=Count('pk'), categories=Max(Subquery(latest_category)),
+    )
+    changes = [v for v in (values['products'], values['categories']) if v is not None]
+    return Validators(max(changes, default=None), values['count'])
+
+
+def product_validators(product):
+    return Validators(product.updated_at, product.pk)
+
+
+def conditional_page(request, get_validators, render, cart_count):
+    '''
+    Return 304 if client's copy of page is current, otherwise call render
+    and add ETag and Last-Modified to response. get_validators returns
+    Validators or None if page can't be validated. Requests with pending
+    flash messages are always rendered.
+    '''
+    if request.method not in ('GET', 'HEAD') or len(messages.get_messages(request)):
+        return render()
+    validators = get_validators()
+    if validators is None:
+        return render()
+    etag = validators.etag(cart_count)
+    last_modified = None
+    if not cart_count and validators.last_modified is not None:
+        last_modified = int(validators.last_modified.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+    response = render()
+    if response.status_code == 200:
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .cache import get_catalog_version
+
+
+def cart(request):
+    '''
+    Number of unique products in cart for header widget.
+    '''
+    cart = getattr(request, 'cart', None)
+    return {'cart_items': len(cart) if cart is not None else 0}
+
+
+def catalog(request):
+    '''
+    Catalog version and timeout for {% cache %} fragments of catalog
+    data. Version is looked up only when fragment is rendered.
+    '''
+    return {
+        'catalog_version': SimpleLazyObject(get_catalog_version),
+        'fragment_cache_timeout': settings.SHOP_FRAGMENT_CACHE_TIMEOUT,
+    }
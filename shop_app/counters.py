@@ -0,0 +1,82 @@
+'''
+Denormalized Category.product_count, number of available products
+in category. Single saves and deletes adjust counters with atomic
+increments, bulk changes recount categories in one statement.
+'''
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Category, Product
+from .signals import catalog_changed
+
+
+def counted_category(product):
+    '''
+    Return id of category whose counter includes product.
+    '''
+    return product.category_id if product.available else None
+
+
+def adjust_count(category_id, delta, using=None):
+    if category_id is not None:
+        Category.objects.using(using).filter(pk=category_id).update(product_count=F('product_count') + delta)
+
+
+def recount_categories(using=None, pks=None):
+    '''
+    Recalculate counters of all categories, or of categories with
+    given primary keys, with one UPDATE.
+    '''
+    available = (
+        Product.objects.filter(category=OuterRef('pk'), available=True)
+        .order_by().values('category').annotate(count=Count('pk')).values('count')
+    )
+    categories = Category.objects.using(using)
+    if pks is not None:
+        categories = categories.filter(pk__in=pks)
+    categories.update(product_count=Coalesce(Subquery(available), 0))
+
+
+@receiver(pre_save, sender=Product)
+def remember_counted_category(sender, instance, raw=False, using=None, **kwargs):
+    # Read stored state under lock, instance may be loaded long ago.
+    # Product.save() runs this in its transaction.
+    instance._counted_category = None
+    if instance.pk is not None and not raw:
+        row = (sender._base_manager.using(using).select_for_update()
+               .filter(pk=instance.pk).values_list('category_id', 'available').first())
+        if row and row[1]:
+            instance._counted_category = row[0]
+
+
+@receiver(post_save, sender=Product)
+def update_counts_on_save(sender, instance, created, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    before = instance.__dict__.pop('_counted_category', None)
+    if {'category_id', 'available'} & instance.get_deferred_fields():
+        return
+    after = counted_category(instance)
+    if before != after:
+        adjust_count(before, -1, using)
+        adjust_count(after, 1, using)
+
+
+@receiver(post_delete, sender=Product)
+def update_counts_on_delete(sender, instance, using=None, **kwargs):
+    if {'category_id', 'available'} & instance.get_deferred_fields():
+        # Row is gone, so its category can't be fetched anymore.
+        recount_categories(using)
+    else:
+        adjust_count(counted_category(instance), -1, using)
+
+
+@receiver(catalog_changed, sender=Product)
+def update_counts_on_bulk_change(sender, using=None, fields=None, objs=None, created=False, **kwargs):
+    if created:
+        # New rows can only change counters of their own categories.
+        recount_categories(using, {obj.category_id for obj in objs})
+    elif fields is None or {'category', 'category_id', 'available'} & fields:
+        recount_categories(using)
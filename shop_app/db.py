@@ -0,0 +1,38 @@
+'''
+Database helpers.
+'''
+from asgiref.sync import SyncToAsync
+from django.db import close_old_connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    '''
+    Run PRAGMAS of SQLite database settings on new connection.
+    '''
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if connection.vendor == 'sqlite' and pragmas:
+        for name, value in pragmas.items():
+            connection.connection.execute(f'PRAGMA {name} = {value}')
+
+
+class DatabaseSyncToAsync(SyncToAsync):
+    '''
+    sync_to_async running function in thread pool, for code using ORM
+    from async views. Connections of pool threads are not closed at the
+    end of request like usual ones, so old connections are closed
+    before and after every call, which also honours CONN_MAX_AGE.
+    '''
+
+    def thread_handler(self, loop, *args, **kwargs):
+        close_old_connections()
+        try:
+            return super().thread_handler(loop, *args, **kwargs)
+        finally:
+            close_old_connections()
+
+
+def database_sync_to_async(func):
+    return DatabaseSyncToAsync(func, thread_sensitive=False)
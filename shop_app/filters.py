@@ -1,13 +1,154 @@
 import django_filters
+from django_filters.fields import ModelMultipleChoiceField
+from django.db.models import Count
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
 from . import models
+from .search import search_products
 from django.forms import CheckboxSelectMultiple
 
+
+# Sort choice: ordering, last field unique, so pages can be seeked by key.
+# Each has an index to be read in order from, see Product.Meta.indexes.
+SORTS = {
+    'name': ('name', 'id'),
+    'price': ('price', 'id'),
+    '-price': ('-price', '-id'),
+    'newest': ('-id',),
+}
+DEFAULT_SORT = 'name'
+
+
+class CategoryFacetField(ModelMultipleChoiceField):
+    # Callable returning {category id: count} for current selection, or
+    # None when maintained counters count it, set by ProductFilter.
+    counts = None
+
+    def label_from_instance(self, obj):
+        counts = self.counts() if self.counts is not None else None
+        count = obj.product_count if counts is None else counts.get(obj.pk, 0)
+        return f'{obj.name} ({count})'
+
+
+class CategoryFacetFilter(django_filters.ModelMultipleChoiceFilter):
+    '''
+    Category filter that shows only categories with available products
+    along with number of their products in current selection.
+    '''
+    field_class = CategoryFacetField
+
+
 class ProductFilter(django_filters.FilterSet):
-    category = django_filters.ModelMultipleChoiceFilter(
+    '''
+    Storefront product filter. Products out of stock are left out unless
+    asked for. Every combination of filters and sort seeks one of
+    Product indexes instead of scanning the table.
+    '''
+    q = django_filters.CharFilter(label=_('Search'), method='search')
+    category = CategoryFacetFilter(
     widget=CheckboxSelectMultiple,
-    queryset=models.Category.objects.all()
+    queryset=models.Category.objects.filter(product_count__gt=0)
+    )
+    availability = django_filters.ChoiceFilter(
+        label=_('Availability'), method='filter_availability', empty_label=None,
+        choices=(('in_stock', _('In stock')), ('all', _('All products'))),
+    )
+    min_price = django_filters.NumberFilter(label=_('Price from'), field_name='price', lookup_expr='gte')
+    max_price = django_filters.NumberFilter(label=_('Price to'), field_name='price', lookup_expr='lte')
+    sort = django_filters.ChoiceFilter(
+        label=_('Sort by'), method='sort_products', empty_label=None,
+        choices=(('name', _('Name')), ('price', _('Price: low to high')), ('-price', _('Price: high to low')),
+                 ('newest', _('Newest'))),
     )
 
     class Meta:
         model = models.Product
-        fields = ['category']
\ No newline at end of file
+        fields = ['q', 'category', 'availability', 'min_price', 'max_price', 'sort']
+
+    def __init__(self, data=None, *args, **kwargs):
+        # Products in stock are listed when availability is not given.
+        data = data.copy() if data is not None else {}
+        if not data.get('availability'):
+            data['availability'] = 'in_stock'
+        super().__init__(data, *args, **kwargs)
+
+    @property
+    def form(self):
+        if not hasattr(self, '_form'):
+            super().form.fields['category'].counts = self.facet_counts
+        return self._form
+
+    def filter_availability(self, queryset, name, value):
+        if value == 'in_stock':
+            # available=True compiles to bare WHERE available, which can't
+            # seek indexes leading with available, IN (true) can.
+            return queryset.filter(available__in=[True])
+        return queryset
+
+    def sort_products(self, queryset, name, value):
+        '''
+        Explicit sort replaces relevance order of search results.
+        '''
+        return queryset.order_by(*SORTS[value])
+
+    def get_ordering(self):
+        '''
+        Return ordering of filtered products, for keyset pagination.
+        '''
+        sort = self.form.cleaned_data.get('sort') if self.is_valid() else None
+        return SORTS[sort or DEFAULT_SORT]
+
+    def search(self, queryset, name, value):
+        '''
+        Full-text search, results are ordered by relevance.
+        '''
+        return search_products(queryset, value)
+
+    def uses_counters(self):
+        '''
+        Whether Category.product_count counts current selection: products
+        in stock, not narrowed by search or price.
+        '''
+        data = self.form.cleaned_data
+        return (data.get('availability') == 'in_stock' and not data.get('q') and
+                data.get('min_price') is None and data.get('max_price') is None)
+
+    @cached_property
+    def _facets(self):
+        if not self.is_valid():
+            return []
+        if self.uses_counters():
+            rows = models.Category.objects.filter(product_count__gt=0).values_list(
+                'id', 'name', 'slug', 'product_count')
+        else:
+            # Counts don't depend on categories chosen, like counters.
+            queryset = self.queryset.all()
+            for name, value in self.form.cleaned_data.items():
+                if name not in ('category', 'sort'):
+                    queryset = self.filters[name].filter(queryset, value)
+            rows = (
+                queryset.filter(category__isnull=False).order_by()
+                .values_list('category', 'category__name', 'category__slug')
+                .annotate(count=Count('pk')).order_by('category__name')
+            )
+        selected = {category.pk for category in self.form.cleaned_data.get('category') or ()}
+        return [{'id': pk, 'name': name, 'slug': slug, 'count': count, 'selected': pk in selected}
+                for pk, name, slug, count in rows]
+
+    def category_facets(self):
+        '''
+        Return categories with products in current selection as dicts
+        with id, name, slug, count and selected flag. Maintained
+        Category.product_count is read when it counts the selection,
+        products are counted by one grouped query otherwise.
+        '''
+        return self._facets
+
+    def facet_counts(self):
+        '''
+        Return {category id: count} of current selection, or None when
+        counters of categories count it.
+        '''
+        if not self.is_valid() or self.uses_counters():
+            return None
+        return {facet['id']: facet['count'] for facet in self._facets}
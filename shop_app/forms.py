@@ -13,3 +13,17 @@ class OrderForm(forms.ModelForm):
 class AddToCartForm(forms.Form):
     quantity = forms.fields.IntegerField(min_value=1, max_value=999, label=_('Quantity'), initial=1)
 
+
+
+class OrderReportForm(forms.Form):
+    date_from = forms.DateField(label=_('From'), required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(label=_('To'), required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    status = forms.TypedMultipleChoiceField(label=_('Status'), choices=Order.Status.choices, coerce=int,
+                                            required=False, widget=forms.CheckboxSelectMultiple)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError(_('Start date is after end date.'))
+        return cleaned_data
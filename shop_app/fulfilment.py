@@ -0,0 +1,241 @@
+'''
+Order fulfilment engine.
+
+Workers claim batches of waiting orders, handle them and mark them done.
+Claim moves order to PROCESSING and stamps it with worker name, so every
+order is handled by exactly one worker. On databases supporting it,
+claiming worker locks waiting rows with SELECT ... FOR UPDATE SKIP LOCKED,
+so concurrent workers pass over each other's rows instead of queueing.
+SQLite has no row locks and allows one writer at a time: there claim is
+single UPDATE that picks and stamps rows under database write lock, and
+workers take turns. Every status change goes through transition(), which
+applies only moves allowed by TRANSITIONS.
+
+Orders of worker that died or whose handler failed stay in PROCESSING.
+Once claimed longer than SHOP_FULFILMENT_LEASE seconds ago, they are
+claimed again by next worker, so every order is eventually handled, but
+order handled for longer than lease may be handled twice. Orders claimed
+by staff in admin are not workers' and are never reclaimed.
+'''
+import datetime
+import multiprocessing
+import os
+import queue
+import socket
+import time
+import traceback
+
+from django.conf import settings
+from django.db import OperationalError, connections, transaction
+from django.utils import timezone
+
+from .bench import percentiles
+from .models import Order
+
+
+Status = Order.Status
+
+TRANSITIONS = {
+    Status.WAITING: (Status.PROCESSING, Status.CANCELED),
+    Status.PROCESSING: (Status.DONE, Status.CANCELED),
+    Status.DONE: (),
+    Status.CANCELED: (),
+}
+
+
+def sources(status):
+    '''
+    Return statuses order may move to status from.
+    '''
+    return [source for source, targets in TRANSITIONS.items() if status in targets]
+
+
+def transition(queryset, status, **fields):
+    '''
+    Move orders of queryset to status, orders that can't move there are
+    left as they are. Return number of orders moved.
+    '''
+    fields.setdefault('updated_at', timezone.now())
+    return queryset.filter(status__in=sources(status)).update(status=status, **fields)
+
+
+def single_writer(using='default'):
+    return not connections[using].features.has_select_for_update_skip_locked
+
+
+def claim_orders(worker, batch_size, using='default', lease=None):
+    '''
+    Claim up to batch_size orders for worker and return them: orders
+    other workers claimed more than lease seconds ago first, then oldest
+    waiting orders, which move to PROCESSING.
+    '''
+    if lease is None:
+        lease = settings.SHOP_FULFILMENT_LEASE
+    now = timezone.now()
+    orders = Order.objects.using(using)
+    expired = orders.filter(
+        status=Status.PROCESSING, claimed_by__startswith=WORKER_PREFIX,
+        claimed_date__lt=now - datetime.timedelta(seconds=lease),
+    ).order_by('claimed_date', 'pk')
+    waiting = orders.filter(status=Status.WAITING).order_by('created_date', 'pk')
+    if single_writer(using):
+        # Picked and stamped by one statement, no other writer runs meanwhile.
+        reclaimed = orders.filter(pk__in=expired.values('pk')[:batch_size]).update(
+            claimed_by=worker, claimed_date=now, updated_at=now)
+        if reclaimed < batch_size:
+            claimed = orders.filter(pk__in=waiting.values('pk')[:batch_size - reclaimed])
+            transition(claimed, Status.PROCESSING, claimed_by=worker, claimed_date=now)
+    else:
+        with transaction.atomic(using=using):
+            pks = list(expired.select_for_update(skip_locked=True).values_list('pk', flat=True)[:batch_size])
+            orders.filter(pk__in=pks).update(claimed_by=worker, claimed_date=now, updated_at=now)
+            pks = list(waiting.select_for_update(skip_locked=True).values_list('pk', flat=True)[:batch_size - len(pks)])
+            transition(orders.filter(pk__in=pks), Status.PROCESSING, claimed_by=worker, claimed_date=now)
+    return list(Order.objects.using(using).filter(status=Status.PROCESSING, claimed_by=worker, claimed_date=now))
+
+
+def complete_orders(worker, orders, using='default'):
+    '''
+    Mark orders claimed by worker as done, return number marked.
+    '''
+    claimed = Order.objects.using(using).filter(pk__in=[order.pk for order in orders], claimed_by=worker)
+    return transition(claimed, Status.DONE, fulfilled_date=timezone.now())
+
+
+# SQLite file, SQLite shared cache and PostgreSQL NOWAIT lock conflicts.
+LOCK_ERRORS = ('database is locked', 'database table is locked', 'could not obtain lock')
+RETRY_LIMIT = 200
+
+
+def retry_locked(func, stats, limit=RETRY_LIMIT):
+    '''
+    Call func until database is not locked by another writer, at most
+    limit more times. Other errors are raised at once.
+    '''
+    for attempt in range(limit + 1):
+        try:
+            return func()
+        except OperationalError as e:
+            if attempt == limit or not any(message in str(e) for message in LOCK_ERRORS):
+                raise
+            stats['retries'] += 1
+            time.sleep(0.005)
+
+
+def run_worker(worker, batch_size=50, handle=None, loop=False, interval=5, using='default', lease=None):
+    '''
+    Claim, handle and complete batches of orders until none is waiting,
+    or forever with loop. handle is called with every claimed order, when
+    it raises, orders handled before are completed and the rest are left
+    to be reclaimed after lease.
+    Return pks of completed orders and timings in ms.
+    '''
+    stats = {'worker': worker, 'pks': [], 'retries': 0, 'claim_ms': [], 'handle_ms': [], 'complete_ms': []}
+    start = time.perf_counter()
+    try:
+        while True:
+            mark = time.perf_counter()
+            orders = retry_locked(lambda: claim_orders(worker, batch_size, using, lease), stats)
+            stats['claim_ms'].append((time.perf_counter() - mark) * 1000)
+            if not orders:
+                if not loop:
+                    break
+                time.sleep(interval)
+                continue
+            mark = time.perf_counter()
+            handled = []
+            try:
+                for order in orders:
+                    if handle is not None:
+                        handle(order)
+                    handled.append(order)
+            except BaseException:
+                if handled:
+                    retry_locked(lambda: complete_orders(worker, handled, using), stats)
+                raise
+            stats['handle_ms'].append((time.perf_counter() - mark) * 1000)
+            mark = time.perf_counter()
+            retry_locked(lambda: complete_orders(worker, orders, using), stats)
+            stats['complete_ms'].append((time.perf_counter() - mark) * 1000)
+            stats['pks'] += [order.pk for order in orders]
+    finally:
+        connections.close_all()
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+# Colon is not allowed in usernames, so worker claims are told apart
+# from claims of staff.
+WORKER_PREFIX = 'worker:'
+
+
+def worker_name(number):
+    return f'{WORKER_PREFIX}{socket.gethostname()[:40]}-{os.getpid()}-{number}'
+
+
+class WorkerFailed(Exception):
+    pass
+
+
+def _worker_process(number, options, results):
+    worker = worker_name(number)
+    try:
+        results.put(run_worker(worker, **options))
+    except BaseException:
+        results.put({'worker': worker, 'error': traceback.format_exc()})
+        raise
+
+
+def run_pool(workers, **options):
+    '''
+    Run run_worker in workers forked processes, return their stats.
+    Raise WorkerFailed when any worker fails or dies without result,
+    other workers are stopped then.
+    '''
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    # Children must open connections of their own.
+    connections.close_all()
+    processes = [context.Process(target=_worker_process, args=(n, options, results)) for n in range(workers)]
+    for process in processes:
+        process.start()
+    stats, error = [], None
+    try:
+        while len(stats) < len(processes):
+            try:
+                result = results.get(timeout=1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    error = f'{len(processes) - len(stats)} workers exited without result'
+                    break
+                continue
+            if 'error' in result:
+                error = f"worker {result['worker']} failed:\n{result['error']}"
+                break
+            stats.append(result)
+    finally:
+        for process in processes:
+            if len(stats) < len(processes) and process.is_alive():
+                process.terminate()
+            process.join()
+    if error is not None:
+        raise WorkerFailed(error)
+    return stats
+
+
+def summary(stats):
+    '''
+    Totals of worker stats: orders, orders processed more than once,
+    throughput and claim latency percentiles.
+    '''
+    pks = [pk for worker in stats for pk in worker['pks']]
+    seconds = max((worker['seconds'] for worker in stats), default=0)
+    claim_ms = [ms for worker in stats for ms in worker['claim_ms']]
+    return {
+        'orders': len(pks),
+        'duplicates': len(pks) - len(set(pks)),
+        'retries': sum(worker['retries'] for worker in stats),
+        'seconds': round(seconds, 3),
+        'rate': round(len(pks) / seconds, 1) if seconds else 0,
+        **{f'claim_{k}': v for k, v in percentiles(claim_ms).items()},
+    }
@@ -0,0 +1,156 @@
+'''
+Resized product image derivatives.
+
+For every size derivatives are made for 1x and 2x screens in JPEG and,
+if Pillow supports it, WebP. File names carry fingerprint of source
+content, so they can be served with far-future cache headers. Product
+remembers fingerprint of generated set in image_fingerprint, until it is
+filled templates fall back to original image.
+'''
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models.signals import pre_save, post_save
+from django.dispatch import receiver
+from PIL import Image
+
+
+logger = logging.getLogger(__name__)
+
+SIZES = {'thumb': 50, 'card': 286, 'detail': 600}
+DENSITIES = (1, 2)
+
+
+def image_formats():
+    Image.init()
+    return ('webp', 'jpeg') if 'WEBP' in Image.SAVE else ('jpeg',)
+
+
+def image_stem(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def derivative_name(stem, size, density, fingerprint, fmt):
+    return f'thumbs/{stem}/{size}-{density}x.{fingerprint}.{fmt}'
+
+
+def build_derivatives(source_path, media_root, stem, formats=None):
+    '''
+    Write all derivatives of source image under media_root and return
+    fingerprint of source. Doesn't touch Django, so can run in any process.
+    '''
+    with open(source_path, 'rb') as f:
+        fingerprint = hashlib.sha1(f.read()).hexdigest()[:12]
+    with Image.open(source_path) as source:
+        source.load()
+        if source.mode not in ('RGB', 'RGBA'):
+            source = source.convert('RGBA')
+        for size, box in SIZES.items():
+            for density in DENSITIES:
+                image = source.copy()
+                image.thumbnail((box * density, box * density), Image.LANCZOS)
+                for fmt in formats or image_formats():
+                    path = os.path.join(media_root, derivative_name(stem, size, density, fingerprint, fmt))
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    if fmt == 'jpeg' and image.mode == 'RGBA':
+                        flat = Image.new('RGB', image.size, 'white')
+                        flat.paste(image, mask=image.split()[3])
+                        flat.save(path, 'JPEG', quality=85, optimize=True, progressive=True)
+                    else:
+                        image.save(path, fmt.upper(), quality=80)
+    return fingerprint
+
+
+def derivative_url(product, size, fmt='jpeg', density=1):
+    '''
+    Return url of product image derivative or of original image
+    if derivatives are not generated yet.
+    '''
+    if not product.image:
+        return ''
+    if not product.image_fingerprint:
+        return product.image.url
+    name = derivative_name(image_stem(product.image.name), size, density, product.image_fingerprint, fmt)
+    return default_storage.url(name)
+
+
+def srcset(product, size, fmt='jpeg'):
+    if not product.image_fingerprint:
+        return ''
+    return ', '.join(f'{derivative_url(product, size, fmt, d)} {d}x' for d in DENSITIES)
+
+
+def generate_derivatives(product):
+    '''
+    Build derivatives of product image and store fingerprint. Fingerprint
+    is stored only if image was not replaced in the meantime.
+    '''
+    name = product.image.name
+    fingerprint = build_derivatives(product.image.path, settings.MEDIA_ROOT, image_stem(name))
+    type(product)._default_manager.filter(pk=product.pk, image=name).update(image_fingerprint=fingerprint)
+    product.image_fingerprint = fingerprint
+    return fingerprint
+
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _generate_in_background(product):
+    try:
+        generate_derivatives(product)
+    except Exception:
+        logger.exception('Failed to generate derivatives of %s', product.image.name)
+    finally:
+        with _lock:
+            _pending.discard(product.pk)
+        close_old_connections()
+
+
+def source_exists(product):
+    try:
+        return bool(product.image) and default_storage.exists(product.image.name)
+    except SuspiciousFileOperation:
+        return False
+
+
+def schedule_derivatives(product):
+    '''
+    Generate derivatives in background thread, off the request path.
+    With SHOP_IMAGE_WORKERS = 0 they are generated right away.
+    '''
+    global _executor
+    if not source_exists(product):
+        return
+    if not settings.SHOP_IMAGE_WORKERS:
+        generate_derivatives(product)
+        return
+    with _lock:
+        if product.pk in _pending:
+            return
+        _pending.add(product.pk)
+        if _executor is None:
+            _executor = ThreadPoolExecutor(settings.SHOP_IMAGE_WORKERS, thread_name_prefix='thumbnails')
+    _executor.submit(_generate_in_background, product)
+
+
+@receiver(pre_save, sender='shop_app.Product')
+def forget_old_derivatives(sender, instance, raw=False, **kwargs):
+    # Uncommitted file is new upload, stored later by ImageField.pre_save.
+    instance._new_image = bool(instance.image) and not instance.image._committed and not raw
+    if instance._new_image:
+        instance.image_fingerprint = ''
+
+
+@receiver(post_save, sender='shop_app.Product')
+def derive_new_image(sender, instance, using=None, **kwargs):
+    if instance.__dict__.pop('_new_image', False):
+        transaction.on_commit(lambda: schedule_derivatives(instance), using=using)
@@ -0,0 +1,188 @@
+'''
+Product stock and cart reservations.
+
+Stock is taken with conditional UPDATE ... SET stock = stock - n WHERE
+stock >= n, so concurrent checkouts of the same product can't oversell,
+whole cart costs one statement and available is cleared by the same
+statement that takes last units. Category counters, catalog cache and
+updated_at are touched only when product sells out or comes back, not on
+every sale. Products with stock None are not tracked.
+
+With SHOP_RESERVATION_TIMEOUT set, units put in cart are held for it for
+that many seconds, expired reservations are returned to stock by
+release_reservations command.
+'''
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from .cache import bump_catalog_version
+from .counters import adjust_count
+from .models import Product, StockReservation
+
+
+class OutOfStock(Exception):
+
+    def __init__(self, product, quantity):
+        super().__init__(f'Not enough stock of {product} for {quantity} units')
+        self.product = product
+        self.quantity = quantity
+
+
+def availability_changed(product, available, using=None):
+    product.available = available
+    adjust_count(product.category_id, 1 if available else -1, using)
+    bump_catalog_version(using)
+
+
+def take_stock(product, quantity, using=None):
+    '''
+    Take quantity units of product, raise OutOfStock if there are not
+    enough. Doesn't need product locked: last units are taken by separate
+    UPDATE ... WHERE stock = n, which tells product sold out.
+    '''
+    if product.stock is None or quantity <= 0:
+        return
+    # Base manager sends no catalog_changed, sales don't invalidate catalog.
+    products = Product._base_manager.db_manager(using).filter(pk=product.pk)
+    if products.filter(stock__gt=quantity).update(stock=F('stock') - quantity):
+        return
+    if products.filter(stock=quantity).update(stock=0, available=False, updated_at=Now()):
+        availability_changed(product, False, using)
+        return
+    raise OutOfStock(product, quantity)
+
+
+def take_stock_of(lines, using=None):
+    '''
+    Take stock for (product, quantity) lines of checkout with one UPDATE.
+    Products must be read under lock in the same transaction, their
+    stock then tells which ones sell out. Raise OutOfStock if any has
+    not enough, transaction is to be rolled back then.
+    '''
+    lines = [(product, quantity) for product, quantity in lines if product.stock is not None and quantity > 0]
+    for product, quantity in lines:
+        if product.stock < quantity:
+            raise OutOfStock(product, quantity)
+    if not lines:
+        return
+    needed = Case(*(When(pk=product.pk, then=Value(quantity)) for product, quantity in lines),
+                  output_field=PositiveIntegerField())
+    rows = Product._base_manager.db_manager(using).filter(
+        pk__in=[product.pk for product, _ in lines], stock__gte=needed,
+    ).update(
+        stock=F('stock') - needed,
+        available=Case(When(stock__gt=needed, then=Value(True)), default=Value(False)),
+        updated_at=Case(When(stock=needed, then=Now()), default=F('updated_at')),
+    )
+    if rows < len(lines):
+        # Stock changed since it was read, products were not locked.
+        raise OutOfStock(*lines[0])
+    for product, quantity in lines:
+        product.stock -= quantity
+        if not product.stock:
+            availability_changed(product, False, using)
+
+
+def return_stock(product, quantity, using=None):
+    '''
+    Put quantity units of product back to stock.
+    '''
+    if quantity <= 0:
+        return
+    products = Product._base_manager.db_manager(using).filter(pk=product.pk)
+    while True:
+        if products.filter(stock__gt=0).update(stock=F('stock') + quantity):
+            return
+        if products.filter(stock=0).update(stock=quantity, available=True, updated_at=Now()):
+            availability_changed(product, True, using)
+            return
+        # Stock went from 0 to positive in between, unless product
+        # is not tracked or gone.
+        if not products.filter(stock__isnull=False).exists():
+            return
+
+
+def reservations_enabled():
+    return bool(getattr(settings, 'SHOP_RESERVATION_TIMEOUT', 0))
+
+
+def reserve(token, product, quantity, using=None):
+    '''
+    Hold quantity units of product for cart token, taking from stock or
+    returning difference with units held already. Renews expiry of all
+    reservations of the cart. Raise OutOfStock if there are not enough.
+    '''
+    if product.stock is None:
+        return
+    expires_at = timezone.now() + timedelta(seconds=settings.SHOP_RESERVATION_TIMEOUT)
+    reservations = StockReservation.objects.using(using)
+    with transaction.atomic(using=using):
+        held = (reservations.select_for_update().filter(token=token, product=product)
+                .values_list('quantity', flat=True).first()) or 0
+        if quantity > held:
+            take_stock(product, quantity - held, using)
+        else:
+            return_stock(product, held - quantity, using)
+        if not held:
+            reservations.create(token=token, product=product, quantity=quantity, expires_at=expires_at)
+        reservations.filter(token=token).update(
+            expires_at=expires_at,
+            quantity=Case(When(product=product, then=Value(quantity)), default=F('quantity')),
+        )
+
+
+def release(token, product, using=None):
+    '''
+    Return units held for cart token to stock.
+    '''
+    with transaction.atomic(using=using):
+        reservation = (StockReservation.objects.using(using).select_for_update()
+                       .filter(token=token, product=product).first())
+        if reservation is not None:
+            reservation.delete()
+            return_stock(product, reservation.quantity, using)
+
+
+def claim(token, using=None):
+    '''
+    Remove reservations of cart token at checkout, return mapping of
+    product id to reservation. Call inside checkout transaction.
+    '''
+    reservations = {
+        reservation.product_id: reservation
+        for reservation in StockReservation.objects.using(using).select_for_update().filter(token=token)
+    }
+    if reservations:
+        StockReservation.objects.using(using).filter(pk__in=[r.pk for r in reservations.values()]).delete()
+    return reservations
+
+
+def release_expired(batch_size=500, using=None):
+    '''
+    Return units of one batch of expired reservations to stock.
+    Reservations locked by checkout in progress are skipped.
+    Return number of released reservations.
+    '''
+    with transaction.atomic(using=using):
+        batch = list(
+            StockReservation.objects.using(using)
+            .select_for_update(skip_locked=True, of=('self',)).select_related('product')
+            .filter(expires_at__lte=timezone.now()).order_by('expires_at')[:batch_size]
+        )
+        if not batch:
+            return 0
+        StockReservation.objects.using(using).filter(pk__in=[r.pk for r in batch]).delete()
+        held, products = defaultdict(int), {}
+        for reservation in batch:
+            held[reservation.product_id] += reservation.quantity
+            products[reservation.product_id] = reservation.product
+        # Same order everywhere, so concurrent sweeps don't deadlock.
+        for pk in sorted(held):
+            return_stock(products[pk], held[pk], using)
+    return len(batch)
@@ -0,0 +1,329 @@
+'''
+Load test of shop flows: browse, filter, detail, add to cart, cart and
+checkout.
+
+Flows drive real URL routes through Django test client, in process and
+sequentially, over HTTP against threaded WSGI server with concurrent
+shoppers, or by calling WSGI and ASGI application directly, which
+compares the two without network in the way. Queries per request are read from Server-Timing
+header set by PerformanceMiddleware, so both ways report them alike.
+'''
+import asyncio
+import collections
+import http.cookiejar
+import http.cookies
+import io
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer
+from django.db import connections
+from django.test.testcases import QuietWSGIRequestHandler
+from django.urls import reverse
+
+from .bench import CHECKOUT_DATA, bench_client, percentiles
+from .models import Category
+
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries')
+
+Flow = collections.namedtuple('Flow', 'prepare request')
+
+
+def product_url(i, products):
+    return reverse('shop:detail', args=[f'product-{i % products:07}'])
+
+
+def cart_requests(i, products, size=3):
+    return [('POST', product_url(i * size + n, products), {'quantity': 1}) for n in range(size)]
+
+
+def get_flows(products):
+    '''
+    Return mapping of flow name to Flow. prepare(i, first) returns
+    requests made untimed before i-th request, first is set for first
+    request of shopper. request(i) returns method, path and data of i-th
+    request.
+    '''
+    categories = list(Category.objects.values_list('pk', flat=True))
+    return {
+        'list': Flow(None, lambda i: ('GET', reverse('shop:list'), None)),
+        'filter': Flow(None, lambda i: (
+            'GET', f"{reverse('shop:list')}?category={categories[i % len(categories)]}", None)),
+        'detail': Flow(None, lambda i: ('GET', product_url(i * 7919, products), None)),
+        'add_to_cart': Flow(None, lambda i: ('POST', product_url(i * 7919, products), {'quantity': i % 9 + 1})),
+        'cart': Flow(lambda i, first: cart_requests(i, products) if first else [],
+                     lambda i: ('GET', reverse('shop:cart'), None)),
+        'checkout': Flow(lambda i, first: cart_requests(i, products),
+                         lambda i: ('POST', reverse('shop:order'), CHECKOUT_DATA)),
+    }
+
+
+class ClientSession:
+    '''
+    Shopper using Django test client.
+    '''
+
+    def __init__(self):
+        self.client = bench_client()
+
+    def request(self, method, path, data=None):
+        '''
+        Make request, return status code and Server-Timing header.
+        '''
+        if method == 'POST':
+            response = self.client.post(path, data)
+        else:
+            response = self.client.get(path)
+        return response.status_code, response.get('Server-Timing', '')
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPSession:
+    '''
+    Shopper talking HTTP to server, keeps cookies and sends CSRF token.
+    '''
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect)
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == 'csrftoken'), None)
+
+    def request(self, method, path, data=None):
+        headers, body = {}, None
+        if method == 'POST':
+            if self.csrf_token() is None:
+                self.request('GET', path)
+            headers['X-CSRFToken'] = self.csrf_token()
+            body = urllib.parse.urlencode(data or {}).encode()
+        req = urllib.request.Request(self.base_url + path, body, headers, method=method)
+        try:
+            with self.opener.open(req) as response:
+                response.read()
+                return response.status, response.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code, e.headers.get('Server-Timing', '')
+
+
+class FlowResult:
+    '''
+    Latencies, queries and errors of flow requests.
+    '''
+
+    def __init__(self):
+        self.latencies, self.queries, self.errors = [], [], 0
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+
+    def add(self, elapsed, status, timing):
+        match = QUERIES_RE.search(timing)
+        with self.lock:
+            self.latencies.append(elapsed)
+            if match:
+                self.queries.append(int(match.group(1)))
+            if status >= 400:
+                self.errors += 1
+
+    def summary(self, shoppers):
+        # Untimed prepare requests are included in wall time, so throughput
+        # is computed from time spent in measured requests per shopper.
+        busy = sum(self.latencies) / 1000 / shoppers
+        return {
+            'requests': len(self.latencies),
+            'errors': self.errors,
+            'rps': round(len(self.latencies) / busy, 1) if busy else 0,
+            **percentiles(self.latencies),
+            'queries': round(sum(self.queries) / len(self.queries), 2) if self.queries else None,
+            'seconds': round(time.perf_counter() - self.start, 3),
+        }
+
+
+def shopper_requests(flow, number, per_session):
+    '''
+    Yield requests of shopper with untimed flag.
+    '''
+    for i in range(number * per_session, (number + 1) * per_session):
+        if flow.prepare:
+            for request in flow.prepare(i, i == number * per_session):
+                yield False, request
+        yield True, flow.request(i)
+
+
+def run_flow(flow, sessions, requests):
+    '''
+    Run requests of flow spread over sessions, one thread per session.
+    Return throughput, latency percentiles and queries per request.
+    '''
+    result = FlowResult()
+    per_session = max(1, requests // len(sessions))
+
+    def shopper(args):
+        number, session = args
+        try:
+            for timed, request in shopper_requests(flow, number, per_session):
+                start = time.perf_counter()
+                status, timing = session.request(*request)
+                if timed:
+                    result.add((time.perf_counter() - start) * 1000, status, timing)
+        finally:
+            connections.close_all()
+
+    if len(sessions) == 1:
+        shopper((0, sessions[0]))
+    else:
+        with ThreadPoolExecutor(len(sessions)) as pool:
+            list(pool.map(shopper, enumerate(sessions)))
+    return result.summary(len(sessions))
+
+
+async def run_flow_async(flow, sessions, requests):
+    '''
+    Like run_flow, with sessions making requests concurrently on event loop.
+    '''
+    result = FlowResult()
+    per_session = max(1, requests // len(sessions))
+
+    async def shopper(number, session):
+        for timed, request in shopper_requests(flow, number, per_session):
+            start = time.perf_counter()
+            status, timing = await session.request(*request)
+            if timed:
+                result.add((time.perf_counter() - start) * 1000, status, timing)
+
+    await asyncio.gather(*(shopper(number, session) for number, session in enumerate(sessions)))
+    return result.summary(len(sessions))
+
+
+class AppSession:
+    '''
+    Shopper calling WSGI or ASGI application in process, without network.
+    Keeps cookies and sends CSRF token like browser.
+    '''
+
+    def __init__(self, application):
+        self.application = application
+        self.cookies = http.cookies.SimpleCookie()
+
+    def headers(self, method, path, data):
+        headers = {'host': 'localhost'}
+        if self.cookies:
+            headers['cookie'] = '; '.join(f'{name}={morsel.value}' for name, morsel in self.cookies.items())
+        if method == 'POST':
+            headers['content-type'] = 'application/x-www-form-urlencoded'
+            headers['x-csrftoken'] = self.cookies['csrftoken'].value if 'csrftoken' in self.cookies else ''
+        return headers
+
+    def update_cookies(self, headers):
+        for name, value in headers:
+            if name.lower() == 'set-cookie':
+                self.cookies.load(value)
+        for name, morsel in list(self.cookies.items()):
+            if not morsel.value:
+                del self.cookies[name]
+
+    def needs_csrf(self, method):
+        return method == 'POST' and 'csrftoken' not in self.cookies
+
+
+class WSGIAppSession(AppSession):
+
+    def call(self, method, path, data):
+        body = urllib.parse.urlencode(data or {}).encode()
+        path, _, query = path.partition('?')
+        environ = {
+            'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+            'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1', 'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in self.headers(method, path, data).items():
+            key = name.upper().replace('-', '_')
+            environ[key if key in ('CONTENT_TYPE',) else f'HTTP_{key}'] = value
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'], started['headers'] = int(status.split()[0]), headers
+
+        response = self.application(environ, start_response)
+        try:
+            for chunk in response:
+                pass
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        self.update_cookies(started['headers'])
+        return started['status'], dict(started['headers']).get('Server-Timing', '')
+
+    def request(self, method, path, data=None):
+        if self.needs_csrf(method):
+            self.call('GET', path, None)
+        return self.call(method, path, data)
+
+
+class ASGIAppSession(AppSession):
+
+    async def call(self, method, path, data):
+        body = urllib.parse.urlencode(data or {}).encode()
+        path, _, query = path.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+            'root_path': '', 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            'headers': [(name.encode(), value.encode()) for name, value in self.headers(method, path, data).items()],
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        started = {}
+
+        async def receive():
+            return messages.pop() if messages else {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                started['status'] = message['status']
+                started['headers'] = [(name.decode(), value.decode()) for name, value in message['headers']]
+
+        await self.application(scope, receive, send)
+        self.update_cookies(started['headers'])
+        return started['status'], dict(started['headers']).get('Server-Timing', '')
+
+    async def request(self, method, path, data=None):
+        if self.needs_csrf(method):
+            await self.call('GET', path, None)
+        return await self.call(method, path, data)
+
+
+class WSGIServer:
+    '''
+    Threaded WSGI server with the project application on free local port.
+    '''
+
+    def __enter__(self):
+        self.httpd = ThreadedWSGIServer(('localhost', 0), QuietWSGIRequestHandler, allow_reuse_address=False)
+        self.httpd.set_app(WSGIHandler())
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return f'http://localhost:{self.httpd.server_port}'
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
@@ -0,0 +1,81 @@
+'''
+Outbox for shop notifications. Requests only queue emails, they are sent
+by send_queued_mail management command.
+'''
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    '''
+    Put email to outbox. Call it inside transaction that creates the thing
+    email is about, so they are committed together.
+    '''
+    return OutgoingEmail.objects.create(subject=subject, body=message,
+                from_email=from_email, recipients=','.join(recipient_list))
+
+
+def queue_depth():
+    return OutgoingEmail.objects.filter(status=OutgoingEmail.Status.QUEUED).count()
+
+
+def claim_batch(batch_size, lease, now):
+    '''
+    Pick up to batch_size due emails and push their next_attempt lease
+    seconds ahead, so other senders skip them while they are being sent.
+    Email of sender that died is sent again after lease.
+    '''
+    with transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.Status.QUEUED, next_attempt__lte=now)
+            .order_by('next_attempt')[:batch_size]
+        )
+        if batch:
+            OutgoingEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt=now + timedelta(seconds=lease))
+    return batch
+
+
+def send_queued_mail(batch_size=100, max_attempts=5, backoff=30, connection=None, lease=600):
+    '''
+    Send one batch of due emails over given (or default) connection.
+    Failed email is retried after backoff seconds doubled on every attempt
+    and marked as failed after max_attempts.
+    Batch is claimed and results are stored in short transactions of their
+    own, no transaction is open while mail server is talked to, so slow
+    server doesn't keep checkout from committing.
+    Return lists of sent and failed emails.
+    '''
+    connection = connection or get_connection()
+    batch = claim_batch(batch_size, lease, timezone.now())
+    sent, failed = [], []
+    for email in batch:
+        message = EmailMessage(email.subject, email.body, email.from_email,
+                               email.recipient_list, connection=connection)
+        try:
+            message.send()
+        except Exception as e:
+            email.attempts += 1
+            email.last_error = repr(e)
+            if email.attempts >= max_attempts:
+                email.status = OutgoingEmail.Status.FAILED
+            else:
+                email.next_attempt = timezone.now() + timedelta(seconds=backoff * 2 ** (email.attempts - 1))
+            failed.append(email)
+        else:
+            email.attempts += 1
+            email.status = OutgoingEmail.Status.SENT
+            email.sent_date = timezone.now()
+            sent.append(email)
+    with transaction.atomic():
+        if sent:
+            OutgoingEmail.objects.bulk_update(sent, ['status', 'attempts', 'sent_date'])
+        if failed:
+            OutgoingEmail.objects.bulk_update(failed, ['status', 'attempts', 'last_error', 'next_attempt'])
+    return sent, failed
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from shop_app import archive
+
+
+class Command(BaseCommand):
+    help = ('Move done and canceled orders older than SHOP_ARCHIVE_DAYS, with their items, to archive '
+            'tables. Orders are moved in batches, each in its own transaction, so the command can be '
+            'stopped any time and run again.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Archive orders older than this, default SHOP_ARCHIVE_DAYS.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches.')
+        parser.add_argument('--limit', type=int, help='Stop after this many orders.')
+
+    def handle(self, *args, **options):
+        before = archive.cutoff(options['days'])
+        self.stdout.write(f'archiving orders closed and created before {before:%Y-%m-%d %H:%M}')
+
+        def progress(moved):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'{moved} orders archived')
+
+        moved = archive.archive_orders(before, options['batch_size'], options['pause'], options['limit'],
+                                       progress=progress)
+        self.stdout.write(f'{moved} orders archived')
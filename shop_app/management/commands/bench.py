@@ -0,0 +1,119 @@
+import datetime
+import json
+import logging
+import platform
+import subprocess
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from shop_app import cache
+from shop_app.bench import bench_database, seed_catalog, seed_orders
+from shop_app.loadtest import ClientSession, HTTPSession, WSGIServer, get_flows, run_flow
+
+
+FLOWS = ('list', 'filter', 'detail', 'add_to_cart', 'cart', 'checkout')
+MODES = ('client', 'wsgi')
+BENCH_OPTIONS = ('products', 'categories', 'orders', 'requests', 'concurrency')
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark shop flows through test client and concurrent WSGI server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--orders', type=int, default=10000, help='Historical orders seeded.')
+        parser.add_argument('--requests', type=int, default=300, help='Requests per flow.')
+        parser.add_argument('--concurrency', type=int, default=8, help='Shoppers talking to WSGI server.')
+        parser.add_argument('--flows', nargs='+', choices=FLOWS, default=list(FLOWS))
+        parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+        parser.add_argument('--output', help='Save results as JSON.')
+        parser.add_argument('--compare', help='JSON results to compare with, fail on regression.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Relative change of p95 or throughput counted as regression.')
+
+    def handle(self, *args, **options):
+        results = {
+            'meta': {
+                'commit': git_commit(),
+                'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                **{key: options[key] for key in BENCH_OPTIONS},
+            },
+            'results': {},
+        }
+        # Failed requests are counted as errors, their tracebacks are noise.
+        logging.getLogger('django.request').disabled = True
+        with bench_database(), override_settings(SHOP_QUERY_BUDGET_STRICT=False):
+            seed_catalog(options['products'], options['categories'])
+            seed_orders(options['orders'])
+            flows = get_flows(options['products'])
+            self.stdout.write(f"{'mode':<7} {'flow':<12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                              f"{'p99 ms':>8} {'queries':>8} {'errors':>7}")
+            for mode in options['modes']:
+                results['results'][mode] = {}
+                for name in options['flows']:
+                    cache.get_cache().clear()
+                    if mode == 'client':
+                        result = run_flow(flows[name], [ClientSession()], options['requests'])
+                    else:
+                        with WSGIServer() as url:
+                            sessions = [HTTPSession(url) for _ in range(options['concurrency'])]
+                            result = run_flow(flows[name], sessions, options['requests'])
+                    results['results'][mode][name] = result
+                    self.stdout.write(
+                        f"{mode:<7} {name:<12} {result['rps']:>8} {result['p50']:>8} {result['p95']:>8} "
+                        f"{result['p99']:>8} {result['queries']!s:>8} {result['errors']:>7}"
+                    )
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            differs = [key for key, value in baseline['meta'].items()
+                       if key in BENCH_OPTIONS and results['meta'].get(key) != value]
+            if differs:
+                self.stderr.write(f"Baseline was run with different {', '.join(differs)}.")
+            regressions = self.compare(baseline['results'], results['results'], options['threshold'])
+            if regressions:
+                raise CommandError(f'{regressions} regressions against {options["compare"]}')
+
+    def compare(self, baseline, current, threshold):
+        '''
+        Print changes against baseline, return number of regressions.
+        '''
+        regressions = 0
+        self.stdout.write(f"\n{'mode':<7} {'flow':<12} {'metric':<8} {'before':>9} {'after':>9} {'change':>8}")
+        for mode, flows in current.items():
+            for name, result in flows.items():
+                before = baseline.get(mode, {}).get(name)
+                if not before:
+                    continue
+                for metric, worse in (('rps', lambda old, new: new < old * (1 - threshold)),
+                                      ('p95', lambda old, new: new > old * (1 + threshold)),
+                                      # Cache hits make average fractional, one
+                                      # more query per request is a regression.
+                                      ('queries', lambda old, new: new >= old + 1)):
+                    old, new = before.get(metric), result.get(metric)
+                    if old is None or new is None:
+                        continue
+                    change = f'{(new - old) / old:+.0%}' if old else '-'
+                    flag = ''
+                    if worse(old, new):
+                        regressions += 1
+                        flag = ' REGRESSION'
+                    self.stdout.write(f'{mode:<7} {name:<12} {metric:<8} {old:>9} {new:>9} {change:>8}{flag}')
+        return regressions
@@ -0,0 +1,69 @@
+import logging
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from shop_app import cache
+from shop_app.bench import bench_database, seed_catalog
+from shop_app.loadtest import Flow, WSGIAppSession, product_url, run_flow
+from shop_app.models import Category
+
+
+def slug(i, products):
+    return f'product-{i % products:07}'
+
+
+def get_flows(products, batch):
+    '''
+    Return mapping of flow name to (Flow, products per response), HTML
+    views paired with API endpoints serving the same data.
+    '''
+    categories = list(Category.objects.values_list('pk', flat=True))
+    list_url, api_list_url = reverse('shop:list'), reverse('shop:api-products')
+    batch_url = reverse('shop:api-product-batch')
+
+    def category(i):
+        return categories[i % len(categories)]
+
+    return {
+        'html-list': (Flow(None, lambda i: ('GET', f'{list_url}?category={category(i)}', None)), 6),
+        'api-list': (Flow(None, lambda i: ('GET', f'{api_list_url}?category={category(i)}&limit=6', None)), 6),
+        'html-detail': (Flow(None, lambda i: ('GET', product_url(i * 7919, products), None)), 1),
+        'api-detail': (Flow(None, lambda i: (
+            'GET', reverse('shop:api-product', args=[slug(i * 7919, products)]), None)), 1),
+        'api-batch': (Flow(None, lambda i: (
+            'GET', f"{batch_url}?slugs={','.join(slug(i * 7919 + n, products) for n in range(batch))}", None)),
+            batch),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Compare throughput of HTML catalog views and JSON API serving the same products. '
+            'Page cache is off unless --page-cache is given, so every request renders.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=400, help='Requests per flow.')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--batch', type=int, default=20, help='Slugs per batch request.')
+        parser.add_argument('--page-cache', action='store_true')
+
+    def handle(self, *args, **options):
+        logging.getLogger('django.request').disabled = True
+        timeout = 600 if options['page_cache'] else 0
+        with bench_database(), override_settings(SHOP_PAGE_CACHE_TIMEOUT=timeout, SHOP_QUERY_BUDGET_STRICT=False):
+            seed_catalog(options['products'])
+            flows = get_flows(options['products'], options['batch'])
+            application = WSGIHandler()
+            self.stdout.write(f"{'flow':<12} {'req/s':>8} {'products/s':>11} {'p50 ms':>8} {'p95 ms':>8} "
+                              f"{'queries':>8} {'errors':>7}")
+            for name, (flow, per_response) in flows.items():
+                cache.get_cache().clear()
+                sessions = [WSGIAppSession(application) for _ in range(options['concurrency'])]
+                result = run_flow(flow, sessions, options['requests'])
+                self.stdout.write(
+                    f"{name:<12} {result['rps']:>8} {result['rps'] * per_response:>11.0f} {result['p50']:>8} "
+                    f"{result['p95']:>8} {result['queries']:>8} {result['errors']:>7}"
+                )
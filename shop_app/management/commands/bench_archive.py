@@ -0,0 +1,61 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.urls import reverse
+
+from shop_app import archive
+from shop_app.bench import bench_client, bench_database, measure, seed_catalog, seed_orders
+from shop_app.models import ArchivedOrder, Order, OrderItems
+
+
+class Command(BaseCommand):
+    help = ('Measure order admin before and after closed orders older than SHOP_ARCHIVE_DAYS are moved '
+            'to archive, and archiving throughput.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200000)
+        parser.add_argument('--history-days', type=int, default=1460, help='Days seeded orders are spread over.')
+        parser.add_argument('--days', type=int, default=365, help='Archive orders older than this.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def analyze(self):
+        # Admin paginator reads table size from statistics.
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def report(self, client, label):
+        self.stdout.write(f'{label}: {Order.objects.count()} orders, {OrderItems.objects.count()} items, '
+                          f'{ArchivedOrder.objects.count()} archived')
+        changelist = reverse('admin:shop_app_order_changelist')
+        archived = reverse('admin:shop_app_archivedorder_changelist')
+        requests = (
+            ('order list', changelist, {}),
+            ('email search', changelist, {'q': 'bob7@mail.com'}),
+            ('name search', changelist, {'q': 'bobston'}),
+            ('archive email', archived, {'q': 'bob7@mail.com'}),
+            ('archive name', archived, {'q': 'bobston'}),
+        )
+        for name, url, params in requests:
+            result = measure(lambda: client.get(url, params), self.options['repeat'])
+            self.stdout.write(f"  {name:<14} {result['median_ms']:>10} ms {result['queries']:>4} queries")
+
+    def handle(self, *args, **options):
+        self.options = options
+        with bench_database():
+            seed_catalog(1000)
+            seed_orders(options['orders'], days=options['history_days'])
+            client = bench_client()
+            client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+            self.analyze()
+            self.report(client, 'before')
+
+            start = time.perf_counter()
+            moved = archive.archive_orders(archive.cutoff(options['days']), options['batch_size'])
+            seconds = time.perf_counter() - start
+            self.stdout.write(f'archived {moved} orders in {seconds:.2f}s, {moved / seconds:.0f} orders/s')
+
+            self.analyze()
+            self.report(client, 'after')
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+from django.urls import include, path
+
+from shop_app import cache
+from shop_app.bench import bench_database, seed_catalog
+from shop_app.loadtest import ASGIAppSession, WSGIAppSession, get_flows, run_flow, run_flow_async
+from shop_app.urls import get_urlpatterns
+
+
+FLOWS = ('list', 'filter', 'detail', 'add_to_cart', 'cart', 'checkout')
+# Deployment: handler, async storefront views
+DEPLOYMENTS = {
+    'wsgi': (WSGIHandler, False),
+    'asgi-sync': (ASGIHandler, False),
+    'asgi': (ASGIHandler, True),
+}
+
+
+def storefront_urlconf(async_storefront):
+    urlconf = types.ModuleType('shop_bench_urls')
+    urlconf.urlpatterns = [path('', include((get_urlpatterns(async_storefront), 'shop')))]
+    return urlconf
+
+
+def add_query_latency(ms):
+    '''
+    Delay every query by ms, like round trip to database server would.
+    '''
+    def delay(execute, sql, params, many, context):
+        time.sleep(ms / 1000)
+        return execute(sql, params, many, context)
+
+    def install(sender, connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(install, weak=False)
+    for connection in connections.all():
+        install(None, connection)
+
+
+class Command(BaseCommand):
+    help = ('Compare concurrent throughput of WSGI deployment, ASGI with sync views and ASGI with '
+            'async views. Applications are called in process, WSGI one from thread per shopper.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--requests', type=int, default=400, help='Requests per flow.')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--flows', nargs='+', choices=FLOWS, default=list(FLOWS))
+        parser.add_argument('--db-latency', type=float, default=0,
+                            help='Milliseconds added to every query, to simulate remote database.')
+        parser.add_argument('--deployments', nargs='+', choices=DEPLOYMENTS, default=list(DEPLOYMENTS))
+
+    async def run_async(self, flow, sessions, options):
+        # Give database work as many threads as WSGI server has.
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(options['concurrency']))
+        return await run_flow_async(flow, sessions, options['requests'])
+
+    def handle(self, *args, **options):
+        logging.getLogger('django.request').disabled = True
+        with bench_database(), override_settings(SHOP_QUERY_BUDGET_STRICT=False):
+            seed_catalog(options['products'])
+            if options['db_latency']:
+                add_query_latency(options['db_latency'])
+            self.stdout.write(f"{'deployment':<10} {'flow':<12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                              f"{'queries':>8} {'errors':>7}")
+            for name in options['deployments']:
+                handler_class, async_storefront = DEPLOYMENTS[name]
+                with override_settings(ROOT_URLCONF=storefront_urlconf(async_storefront)):
+                    flows = get_flows(options['products'])
+                    application = handler_class()
+                    for flow in options['flows']:
+                        cache.get_cache().clear()
+                        if handler_class is WSGIHandler:
+                            sessions = [WSGIAppSession(application) for _ in range(options['concurrency'])]
+                            result = run_flow(flows[flow], sessions, options['requests'])
+                        else:
+                            sessions = [ASGIAppSession(application) for _ in range(options['concurrency'])]
+                            result = asyncio.run(self.run_async(flows[flow], sessions, options))
+                        self.stdout.write(
+                            f"{name:<10} {flow:<12} {result['rps']:>8} {result['p50']:>8} {result['p95']:>8} "
+                            f"{result['queries']!s:>8} {result['errors']:>7}"
+                        )
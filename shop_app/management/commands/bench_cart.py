@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, connections
+from django.core.management.base import BaseCommand
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from shop_app.bench import bench_database, bench_client, seed_catalog
+
+
+BACKENDS = {
+    'session': 'shop_app.cart.SessionCartStore',
+    'cookie': 'shop_app.cart.SignedCookieCartStore',
+    'cache': 'shop_app.cart.CacheCartStore',
+}
+
+
+class Command(BaseCommand):
+    help = 'Compare cart backends throughput under concurrent cart updates.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=200, help='Cart updates per thread.')
+        parser.add_argument('--products', type=int, default=50)
+        parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+
+    def handle(self, *args, **options):
+        with bench_database():
+            seed_catalog(options['products'], categories=1)
+            urls = [reverse('shop:detail', args=[f'product-{i:07}']) for i in range(options['products'])]
+
+            def shopper(requests):
+                client = bench_client()
+                try:
+                    for i in range(requests):
+                        client.post(urls[i % len(urls)], {'quantity': i % 9 + 1})
+                finally:
+                    connections.close_all()
+
+            self.stdout.write(f"{'backend':>8} {'req/s':>8} {'queries/req':>12}")
+            for name in options['backends']:
+                with override_settings(SHOP_CART_BACKEND=BACKENDS[name]):
+                    client = bench_client()
+                    client.post(urls[0], {'quantity': 1})
+                    with CaptureQueriesContext(connection) as queries:
+                        client.post(urls[1], {'quantity': 1})
+
+                    start = time.perf_counter()
+                    with ThreadPoolExecutor(options['threads']) as pool:
+                        list(pool.map(shopper, [options['requests']] * options['threads']))
+                    elapsed = time.perf_counter() - start
+                    rps = options['threads'] * options['requests'] / elapsed
+                    self.stdout.write(f'{name:>8} {rps:>8.1f} {len(queries):>12}')
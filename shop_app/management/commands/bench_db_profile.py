@@ -0,0 +1,68 @@
+import contextlib
+import logging
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+from shop_app import cache
+from shop_app.bench import bench_database, seed_catalog
+from shop_app.loadtest import WSGIAppSession, get_flows, run_flow
+
+
+FLOWS = ('checkout', 'add_to_cart', 'detail')
+
+
+@contextlib.contextmanager
+def database_profile(name):
+    '''
+    Apply connection settings of database profile to bench database.
+    Engine and name are kept, so only SQLite profiles can be compared.
+    '''
+    profile = settings.DATABASE_PROFILES[name]
+    if profile['ENGINE'] != connection.settings_dict['ENGINE']:
+        raise CommandError(f'Profile {name} uses other database engine.')
+    keys = ('CONN_MAX_AGE', 'PRAGMAS')
+    old = {key: connection.settings_dict.get(key) for key in keys}
+    connections.close_all()
+    connection.settings_dict.update({'CONN_MAX_AGE': profile.get('CONN_MAX_AGE', 0),
+                                     'PRAGMAS': profile.get('PRAGMAS')})
+    try:
+        yield
+    finally:
+        connections.close_all()
+        connection.settings_dict.update(old)
+
+
+class Command(BaseCommand):
+    help = ('Compare database profiles under concurrent checkouts: throughput, latency and requests '
+            'failed on locked database. WSGI application is called in process from thread per shopper, '
+            'like threaded worker would.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', default=['sqlite', 'sqlite-wal'])
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=400, help='Requests per flow.')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--flows', nargs='+', choices=FLOWS, default=['checkout'])
+
+    def handle(self, *args, **options):
+        logging.getLogger('django.request').disabled = True
+        self.stdout.write(f"{'profile':<11} {'flow':<12} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                          f"{'p99 ms':>8} {'errors':>7}")
+        # Every profile gets fresh database, WAL mode stays in file once set.
+        for name in options['profiles']:
+            with bench_database(), database_profile(name), override_settings(SHOP_QUERY_BUDGET_STRICT=False):
+                seed_catalog(options['products'])
+                flows = get_flows(options['products'])
+                application = WSGIHandler()
+                for flow in options['flows']:
+                    cache.get_cache().clear()
+                    sessions = [WSGIAppSession(application) for _ in range(options['concurrency'])]
+                    result = run_flow(flows[flow], sessions, options['requests'])
+                    self.stdout.write(
+                        f"{name:<11} {flow:<12} {result['rps']:>8} {result['p50']:>8} {result['p95']:>8} "
+                        f"{result['p99']:>8} {result['errors']:>7}"
+                    )
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop_app import fulfilment
+from shop_app.bench import bench_database, seed_catalog, seed_orders
+from shop_app.models import Order
+
+
+class Command(BaseCommand):
+    help = ('Measure order fulfilment throughput as worker processes are added and check that '
+            'every order was processed exactly once.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=20)
+        parser.add_argument('--work-ms', type=float, default=5, help='Simulated handling time per order.')
+
+    def handle(self, *args, **options):
+        work = options['work_ms'] / 1000
+
+        def handle(order):
+            time.sleep(work)
+
+        with bench_database():
+            seed_catalog(100)
+            seed_orders(options['orders'])
+            mode = 'single writer' if fulfilment.single_writer() else 'skip locked'
+            self.stdout.write(f'{mode}, {options["orders"]} orders, {options["work_ms"]} ms each')
+            self.stdout.write(f"{'workers':>7} {'orders/s':>9} {'claim p50':>10} {'claim p95':>10} "
+                              f"{'retries':>8} {'duplicates':>11} {'missed':>7}")
+            for workers in options['workers']:
+                Order.objects.update(status=Order.Status.WAITING, claimed_by='', claimed_date=None,
+                                     fulfilled_date=None)
+                stats = fulfilment.run_pool(workers, batch_size=options['batch_size'], handle=handle)
+                total = fulfilment.summary(stats)
+                missed = Order.objects.exclude(status=Order.Status.DONE).count()
+                self.stdout.write(f"{workers:>7} {total['rate']:>9} {total['claim_p50']:>10} "
+                                  f"{total['claim_p95']:>10} {total['retries']:>8} {total['duplicates']:>11} "
+                                  f"{missed:>7}")
@@ -0,0 +1,48 @@
+import csv
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand
+
+from shop_app.bench import bench_database, describe
+from shop_app.catalog_io import FIELDS, CatalogImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Measure catalog import throughput for different batch sizes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 100, 500, 1000, 5000])
+        parser.add_argument('--categories', type=int, default=10)
+
+    def write_feed(self, path, rows, categories, price_shift=0):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for i in range(rows):
+                writer.writerow((f'product-{i:07}', f'Product {i:07}', 1 + (i + price_shift) % 1000, describe(i),
+                                 f'images/product-{i:07}.png', f'category-{i % categories:03}', 1))
+
+    def handle(self, *args, **options):
+        paths = []
+        for price_shift in (0, 1):
+            fd, path = tempfile.mkstemp(prefix='shop-feed-', suffix='.csv')
+            os.close(fd)
+            paths.append(path)
+            self.write_feed(path, options['rows'], options['categories'], price_shift)
+        try:
+            self.stdout.write(f"{'batch':>6} {'create rows/s':>14} {'update rows/s':>14}")
+            for batch_size in options['batch_sizes']:
+                rates = []
+                with bench_database():
+                    # First feed creates products, second one changes all prices.
+                    for path in paths:
+                        importer = CatalogImporter(batch_size)
+                        with open(path, newline='', encoding='utf-8') as f:
+                            seconds = importer.run(read_rows(f, 'csv'))
+                        rates.append(options['rows'] / seconds)
+                self.stdout.write(f'{batch_size:>6} {rates[0]:>14.0f} {rates[1]:>14.0f}')
+        finally:
+            for path in paths:
+                os.remove(path)
@@ -0,0 +1,30 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from shop_app.bench import bench_database, seed_orders
+from shop_app.reports import export_csv, filter_orders
+
+
+class Command(BaseCommand):
+    help = 'Measure time and peak memory of streaming order export.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                            help='Numbers of orders, e.g. 10000 100000 1000000.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'orders':>9} {'seconds':>8} {'rows/s':>8} {'peak KiB':>9} {'MiB out':>8}")
+        for size in options['sizes']:
+            with bench_database():
+                seed_orders(size, items_per_order=0)
+                tracemalloc.start()
+                start = time.perf_counter()
+                written = sum(len(line) for line in export_csv(filter_orders(), options['chunk_size']))
+                seconds = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                self.stdout.write(f'{size:>9} {seconds:>8.2f} {size / seconds:>8.0f} '
+                                  f'{peak / 1024:>9.0f} {written / 2 ** 20:>8.1f}')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from shop_app import cache
+from shop_app.bench import bench_database, bench_client, seed_catalog, throughput
+from shop_app.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Measure catalog pages throughput with and without page cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--requests', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with bench_database():
+            seed_catalog(options['products'])
+            urls = [reverse('shop:list'), reverse('shop:detail', args=['product-0000001'])]
+            urls += [f"{reverse('shop:list')}?category={pk}" for pk in Category.objects.values_list('pk', flat=True)]
+            client = bench_client()
+            requests = iter(range(10 ** 9))
+
+            def get():
+                client.get(urls[next(requests) % len(urls)])
+
+            for timeout in (0, 600):
+                with override_settings(SHOP_PAGE_CACHE_TIMEOUT=timeout):
+                    cache.get_cache().clear()
+                    rps = throughput(get, options['requests'])
+                    label = 'cached' if timeout else 'uncached'
+                    self.stdout.write(f'{label:>9}: {rps} req/s {cache.get_stats()}')
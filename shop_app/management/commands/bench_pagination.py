@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+
+from shop_app.bench import bench_database, seed_catalog, measure
+from shop_app.models import Product
+from shop_app.pagination import KeysetPaginator, encode_cursor
+
+
+class Command(BaseCommand):
+    help = 'Compare offset and keyset pagination of product list on deep pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=60006)
+        parser.add_argument('--per-page', type=int, default=6)
+        parser.add_argument('--pages', type=int, nargs='+', default=[1, 1000, 10000])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--category', action='store_true',
+                            help='Filter products by one category like ProductFilter does.')
+
+    def handle(self, *args, **options):
+        per_page = options['per_page']
+        ordering = ('name', 'id')
+        with bench_database():
+            cats = seed_catalog(options['products'])
+            queryset = Product.objects.all()
+            if options['category']:
+                queryset = queryset.filter(category__in=cats[:1])
+
+            self.stdout.write(f"{'page':>8} {'mode':>8} {'median ms':>10} {'best ms':>10} {'queries':>8}")
+            for number in options['pages']:
+                def offset_page():
+                    list(Paginator(queryset.order_by(*ordering), per_page).page(number))
+
+                cursor = None
+                if number > 1:
+                    anchor = queryset.order_by(*ordering)[(number - 1) * per_page - 1]
+                    cursor = encode_cursor([getattr(anchor, f) for f in ordering])
+
+                def keyset_page():
+                    list(KeysetPaginator(queryset, per_page, ordering).page(cursor))
+
+                for mode, func in (('offset', offset_page), ('keyset', keyset_page)):
+                    result = measure(func, options['repeat'])
+                    self.stdout.write(
+                        f"{number:>8} {mode:>8} {result['median_ms']:>10} "
+                        f"{result['best_ms']:>10} {result['queries']:>8}"
+                    )
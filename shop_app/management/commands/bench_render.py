@@ -0,0 +1,63 @@
+import copy
+import re
+import statistics
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from shop_app.bench import bench_client, bench_database, seed_catalog
+
+
+TIMING_RE = re.compile(r'(tpl|total);dur=([\d.]+)')
+# Profile: cached template loader, fragment cache timeout
+PROFILES = {
+    'baseline': (False, 0),
+    'cached-loader': (True, 0),
+    'fragments': (True, 600),
+}
+
+
+def templates_setting(cached):
+    templates = copy.deepcopy(settings.TEMPLATES)
+    loaders = settings.TEMPLATE_LOADERS
+    templates[0]['OPTIONS']['loaders'] = [('django.template.loaders.cached.Loader', loaders)] if cached else loaders
+    return templates
+
+
+class Command(BaseCommand):
+    help = ('Compare render time of storefront pages without template caching, with cached '
+            'template loader and with fragment caching on top. Page cache is off.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=200, help='Requests per page.')
+        parser.add_argument('--profiles', nargs='+', choices=PROFILES, default=list(PROFILES))
+
+    def handle(self, *args, **options):
+        with bench_database(), override_settings(SHOP_PAGE_CACHE_TIMEOUT=0, SHOP_QUERY_BUDGET_STRICT=False):
+            seed_catalog(options['products'])
+            client = bench_client()
+            for i in range(3):
+                client.post(reverse('shop:detail', args=[f'product-{i:07}']), {'quantity': 1})
+            pages = {
+                'list': reverse('shop:list'),
+                'detail': reverse('shop:detail', args=['product-0000010']),
+                'cart': reverse('shop:cart'),
+            }
+            self.stdout.write(f"{'profile':<14} {'page':<8} {'template ms':>12} {'total ms':>9}")
+            for name in options['profiles']:
+                cached, fragment_timeout = PROFILES[name]
+                with override_settings(TEMPLATES=templates_setting(cached),
+                                       SHOP_FRAGMENT_CACHE_TIMEOUT=fragment_timeout):
+                    caches['default'].clear()
+                    for page, url in pages.items():
+                        template_ms, total_ms = [], []
+                        for _ in range(options['requests']):
+                            timings = dict(TIMING_RE.findall(client.get(url)['Server-Timing']))
+                            template_ms.append(float(timings['tpl']))
+                            total_ms.append(float(timings['total']))
+                        self.stdout.write(f'{name:<14} {page:<8} {statistics.median(template_ms):>12.2f} '
+                                          f'{statistics.median(total_ms):>9.2f}')
@@ -0,0 +1,106 @@
+import collections
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+from shop_app.bench import bench_database, seed_catalog
+from shop_app.loadtest import WSGIAppSession, get_flows, run_flow
+from shop_app.management.commands.sync_replicas import copy_database
+
+
+FLOWS = ('list', 'filter', 'detail')
+
+
+class DatabaseServers:
+    '''
+    Make every database alias behave like server with limited number of
+    workers, each query holding one for service_ms. In process SQLite
+    shares one CPU with the application, this gives every replica
+    capacity of its own, like separate server would have.
+    '''
+
+    def __init__(self, workers, service_ms):
+        self.workers, self.service_ms = workers, service_ms
+        self.slots = collections.defaultdict(lambda: threading.BoundedSemaphore(self.workers))
+        self.queries = collections.Counter()
+        self.lock = threading.Lock()
+
+    def wrapper(self, alias):
+        def serve(execute, sql, params, many, context):
+            with self.lock:
+                self.queries[alias] += 1
+                slot = self.slots[alias]
+            with slot:
+                time.sleep(self.service_ms / 1000)
+                return execute(sql, params, many, context)
+        return serve
+
+    def install(self, sender, connection, **kwargs):
+        if not any(getattr(w, 'database_server', False) for w in connection.execute_wrappers):
+            serve = self.wrapper(connection.alias)
+            serve.database_server = True
+            connection.execute_wrappers.append(serve)
+
+
+class Command(BaseCommand):
+    help = ('Measure catalog read throughput as read replicas are added. Replicas are copies of '
+            'SQLite primary, every database is given capacity of simulated server.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--replicas', type=int, nargs='+', default=[0, 1, 2, 4])
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--requests', type=int, default=400, help='Requests per flow.')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--flows', nargs='+', choices=FLOWS, default=list(FLOWS))
+        parser.add_argument('--db-workers', type=int, default=1, help='Queries one database serves at once.')
+        parser.add_argument('--db-service-ms', type=float, default=10, help='Time one query takes.')
+
+    def handle(self, *args, **options):
+        logging.getLogger('django.request').disabled = True
+        servers = DatabaseServers(options['db_workers'], options['db_service_ms'])
+        aliases = [f'bench_replica{i}' for i in range(1, max(options['replicas']) + 1)]
+        paths = []
+        with bench_database():
+            seed_catalog(options['products'])
+            for alias in aliases:
+                fd, path = tempfile.mkstemp(prefix=f'shop-{alias}-', suffix='.sqlite3')
+                os.close(fd)
+                paths.append(path)
+                connections.databases[alias] = {**connection.settings_dict, 'NAME': path}
+                copy_database(connection, alias)
+            connection_created.connect(servers.install, weak=False)
+            connections.close_all()
+            try:
+                self.run(servers, aliases, options)
+            finally:
+                connection_created.disconnect(servers.install)
+                connections.close_all()
+                for alias, path in zip(aliases, paths):
+                    del connections.databases[alias]
+                    os.remove(path)
+
+    def run(self, servers, aliases, options):
+        self.stdout.write(f"{'replicas':>8} {'flow':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                          f"{'primary %':>10} {'errors':>7}")
+        for replicas in options['replicas']:
+            with override_settings(SHOP_DB_REPLICAS=aliases[:replicas], SHOP_PAGE_CACHE_TIMEOUT=0,
+                                   SHOP_QUERY_BUDGET_STRICT=False):
+                flows = get_flows(options['products'])
+                application = WSGIHandler()
+                for flow in options['flows']:
+                    servers.queries.clear()
+                    sessions = [WSGIAppSession(application) for _ in range(options['concurrency'])]
+                    result = run_flow(flows[flow], sessions, options['requests'])
+                    total = sum(servers.queries.values()) or 1
+                    self.stdout.write(
+                        f"{replicas:>8} {flow:<8} {result['rps']:>8} {result['p50']:>8} {result['p95']:>8} "
+                        f"{100 * servers.queries['default'] / total:>10.0f} {result['errors']:>7}"
+                    )
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from shop_app.bench import bench_database, seed_catalog, measure
+from shop_app.models import Product
+from shop_app.search import LikeSearchBackend, get_backend
+
+
+class Command(BaseCommand):
+    help = 'Compare full-text search with icontains scan on catalogs of different size.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000],
+                            help='Catalog sizes, e.g. 10000 100000 1000000.')
+        parser.add_argument('--queries', nargs='+', default=['0004242', 'silk lamp', 'teak bask', 'velvet', 'prod'])
+        parser.add_argument('--limit', type=int, default=20, help='Results fetched, like first page.')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        backends = [('fts', get_backend()), ('icontains', LikeSearchBackend())]
+        self.stdout.write(f"{'products':>9} {'query':>12} {'backend':>10} {'median ms':>10} {'matches':>8}")
+        for size in options['sizes']:
+            with bench_database():
+                start = time.perf_counter()
+                seed_catalog(size)
+                self.stdout.write(f'seeded and indexed {size} products in {time.perf_counter() - start:.1f}s')
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+                for query in options['queries']:
+                    for name, backend in backends:
+                        queryset = backend.search(Product.objects.all(), query)
+                        result = measure(lambda: list(queryset[:options['limit']]), options['repeat'])
+                        self.stdout.write(
+                            f"{size:>9} {query:>12} {name:>10} {result['median_ms']:>10} {queryset.count():>8}"
+                        )
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from shop_app.bench import bench_database, checkout_stress, seed_catalog
+from shop_app.models import Order, OrderItems, Product
+
+
+class Command(BaseCommand):
+    help = 'Check out one product from many threads until it sells out, report orders/s and oversell.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16, 32])
+        parser.add_argument('--stock', type=int, default=500)
+        parser.add_argument('--quantity', type=int, default=1, help='Units bought by one order.')
+
+    def handle(self, *args, **options):
+        with bench_database():
+            seed_catalog(1, categories=1)
+            product = Product.objects.get()
+            self.stdout.write(f"{'threads':>8} {'orders':>7} {'orders/s':>9} {'retries':>8} "
+                              f"{'sold':>6} {'left':>5} {'oversold':>9}")
+            for threads in options['threads']:
+                Order.objects.all().delete()
+                product.stock = options['stock']
+                product.save()
+                result = checkout_stress(product.slug, threads, options['quantity'])
+                product.refresh_from_db()
+                sold = sum(OrderItems.objects.values_list('item_quantity', flat=True))
+                oversold = sold + product.stock - options['stock']
+                self.stdout.write(
+                    f"{threads:>8} {result['orders']:>7} {result['orders'] / result['seconds']:>9.1f} "
+                    f"{result['retries']:>8} {sold:>6} {product.stock:>5} {oversold:>9}"
+                )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from shop_app.catalog_io import export_rows, write_rows
+
+
+class Command(BaseCommand):
+    help = 'Stream products to CSV or JSON lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help='Output file, stdout by default.')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help='Guessed from file extension by default.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        rows = export_rows(chunk_size=options['chunk_size'])
+        if path == '-':
+            write_rows(rows, self.stdout, fmt)
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                write_rows(rows, f, fmt)
@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from shop_app.catalog_io import CatalogImporter, read_rows
+from shop_app.management.commands.generate_thumbnails import generate_all
+from shop_app.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Upsert products by slug from CSV or JSON lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, "-" for stdin.')
+        parser.add_argument('--format', choices=('csv', 'jsonl'), help='Guessed from file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--thumbnails', action='store_true', help='Generate image derivatives after import.')
+        parser.add_argument('--workers', type=int, default=None, help='Processes generating thumbnails.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.json')) else 'csv')
+        importer = CatalogImporter(options['batch_size'])
+
+        def progress(rows, seconds):
+            if options['verbosity'] > 1:
+                self.stderr.write(f'{rows} rows, {rows / seconds:.0f} rows/s')
+
+        try:
+            if path == '-':
+                seconds = importer.run(read_rows(sys.stdin, fmt), progress)
+            else:
+                with open(path, newline='', encoding='utf-8') as f:
+                    seconds = importer.run(read_rows(f, fmt), progress)
+        except (KeyError, ValueError, ArithmeticError) as e:
+            raise CommandError(f'Bad row: {e!r}')
+
+        rows = importer.created + importer.updated + importer.unchanged
+        self.stdout.write(f'created {importer.created}, updated {importer.updated}, unchanged {importer.unchanged} '
+                          f'in {seconds:.1f}s ({rows / max(seconds, 1e-9):.0f} rows/s)')
+
+        if options['thumbnails']:
+            products = Product.objects.exclude(image='').filter(image_fingerprint='').only('pk', 'image')
+            result = generate_all(products, options['workers'])
+            self.stdout.write(f"generated derivatives of {result['count']} images in {result['seconds']:.1f}s")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from shop_app import cache
+
+
+class Command(BaseCommand):
+    help = 'Show hit, miss and eviction counters of catalog page cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset counters after printing.')
+
+    def handle(self, *args, **options):
+        stats = cache.get_stats()
+        lookups = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / lookups if lookups else 0
+        self.stdout.write(f"version:   {cache.get_catalog_version()}")
+        for stat in cache.STATS:
+            self.stdout.write(f"{stat + ':':<10} {stats[stat]}")
+        self.stdout.write(f"hit ratio: {ratio:.1%}")
+        if options['reset']:
+            cache.reset_stats()
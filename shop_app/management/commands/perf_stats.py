@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from shop_app.perf import HistogramStore
+
+
+class Command(BaseCommand):
+    help = 'Show p50/p95/p99 of request metrics recorded by PerformanceMiddleware.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', help='Only views whose URL name contains this.')
+        parser.add_argument('--reset', action='store_true', help='Reset histograms after printing.')
+
+    def handle(self, *args, **options):
+        store = HistogramStore()
+        self.stdout.write(f"{'view':<40} {'metric':<12} {'count':>7} {'p50':>10} {'p95':>10} {'p99':>10}")
+        for view, metric, count, values in store.summary():
+            if options['view'] and options['view'] not in view:
+                continue
+            self.stdout.write(f'{view:<40} {metric:<12} {count:>7} ' + ' '.join(f'{v:>10.2f}' for v in values))
+        if options['reset']:
+            store.reset()
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from shop_app import fulfilment
+
+
+class Command(BaseCommand):
+    help = ('Fulfil waiting orders with pool of worker processes. Each worker claims batches of '
+            'orders and passes every order to the fulfilment handler. Orders left unfinished by '
+            'failed workers are claimed again after lease. On SQLite workers claim one at a time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--handler', help='Dotted path of function called with every claimed order, '
+                                              'default SHOP_FULFILMENT_HANDLER.')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for waiting orders.')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls in loop mode.')
+        parser.add_argument('--lease', type=int, help='Seconds after which unfinished orders of other workers '
+                                                      'are claimed again, default SHOP_FULFILMENT_LEASE.')
+
+    def handle(self, *args, **options):
+        # Orders are marked done after handler returns, without one they
+        # would be marked done unfulfilled.
+        path = options['handler'] or getattr(settings, 'SHOP_FULFILMENT_HANDLER', None)
+        if not path:
+            raise CommandError('No fulfilment handler, pass --handler or set SHOP_FULFILMENT_HANDLER.')
+        try:
+            handle = import_string(path)
+        except ImportError as e:
+            raise CommandError(f'Can\'t import fulfilment handler: {e}')
+
+        if fulfilment.single_writer():
+            self.stdout.write('Database has no row locks, running in single writer mode.')
+        try:
+            stats = fulfilment.run_pool(options['workers'], batch_size=options['batch_size'], loop=options['loop'],
+                                        interval=options['interval'], handle=handle, lease=options['lease'])
+        except fulfilment.WorkerFailed as e:
+            raise CommandError(str(e))
+        for worker in stats:
+            self.stdout.write(f"{worker['worker']}: {len(worker['pks'])} orders in {worker['seconds']:.3f}s, "
+                              f"{worker['retries']} retries")
+        total = fulfilment.summary(stats)
+        self.stdout.write(f"{total['orders']} orders, {total['rate']} orders/s, claim p50 {total['claim_p50']} ms "
+                          f"p95 {total['claim_p95']} ms")
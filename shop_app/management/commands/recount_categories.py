@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from shop_app.counters import recount_categories
+
+
+class Command(BaseCommand):
+    help = 'Recalculate counters of available products in categories.'
+
+    def handle(self, *args, **options):
+        recount_categories()
+        self.stdout.write('Category counters recalculated.')
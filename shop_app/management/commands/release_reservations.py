@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from shop_app import inventory
+
+
+class Command(BaseCommand):
+    help = 'Return units held by expired cart reservations to stock.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping expired reservations.')
+        parser.add_argument('--interval', type=float, default=30, help='Seconds between sweeps in loop mode.')
+
+    def handle(self, *args, **options):
+        while True:
+            released = inventory.release_expired(options['batch_size'])
+            if released:
+                self.stdout.write(f'released {released} reservations')
+            if released < options['batch_size']:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
@@ -0,0 +1,44 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from shop_app import mail
+from shop_app.models import OutgoingEmail
+
+
+class Command(BaseCommand):
+    help = 'Send emails queued in outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=5)
+        parser.add_argument('--backoff', type=int, default=30,
+                            help='Seconds before first retry, doubled on every attempt.')
+        parser.add_argument('--loop', action='store_true', help='Keep polling outbox.')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds between polls in loop mode.')
+
+    def handle(self, *args, **options):
+        # One connection is opened for the whole run and reused by batches.
+        with get_connection() as connection:
+            while True:
+                start = time.perf_counter()
+                sent, failed = mail.send_queued_mail(options['batch_size'], options['max_attempts'],
+                                             options['backoff'], connection)
+                if sent:
+                    latency = [(e.sent_date - e.created_date).total_seconds() for e in sent]
+                    self.stdout.write(
+                        f'sent {len(sent)} in {time.perf_counter() - start:.3f}s, '
+                        f'drain latency avg {sum(latency) / len(latency):.3f}s max {max(latency):.3f}s, '
+                        f'queue depth {mail.queue_depth()}'
+                    )
+                given_up = [e for e in failed if e.status == OutgoingEmail.Status.FAILED]
+                if len(failed) > len(given_up):
+                    self.stderr.write(f'{len(failed) - len(given_up)} failed, will be retried')
+                if given_up:
+                    self.stderr.write(f'{len(given_up)} failed {options["max_attempts"]} times, given up')
+                if len(sent) + len(failed) < options['batch_size']:
+                    if not options['loop']:
+                        break
+                    time.sleep(options['interval'])
+        self.stdout.write(f'queue depth {mail.queue_depth()}')
@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from shop_app.routers import PRIMARY
+
+
+def copy_database(source, alias):
+    '''
+    Copy SQLite primary to replica database file with backup API,
+    consistent even while primary is written.
+    '''
+    connections[alias].close()
+    source.ensure_connection()
+    target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+    try:
+        source.connection.backup(target)
+    finally:
+        target.close()
+
+
+class Command(BaseCommand):
+    help = 'Copy SQLite primary to replica files, stand-in for replication in local setup.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep copying, simulates replication lag.')
+        parser.add_argument('--interval', type=float, default=2, help='Seconds between copies in loop mode.')
+
+    def handle(self, *args, **options):
+        primary = connections[PRIMARY]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Only SQLite replicas can be synced, use database replication otherwise.')
+        if not settings.SHOP_DB_REPLICAS:
+            raise CommandError('No replicas configured, set SHOP_SQLITE_REPLICAS.')
+        while True:
+            start = time.perf_counter()
+            for alias in settings.SHOP_DB_REPLICAS:
+                copy_database(primary, alias)
+            self.stdout.write(f'synced {len(settings.SHOP_DB_REPLICAS)} replicas '
+                              f'in {time.perf_counter() - start:.3f}s')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,138 @@
+import asyncio
+import time
+
+from django.conf import settings
+from django.middleware import security
+
+from . import perf
+from .cart import get_cart
+from .db import database_sync_to_async
+from .routers import Routing
+
+
+class AsyncCapableMiddleware:
+    '''
+    Base of middleware working both under WSGI and ASGI without being
+    adapted to sync mode. Subclasses implement __call__ and __acall__.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Makes handler treat the instance as coroutine function.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+
+class SecurityMiddleware(security.SecurityMiddleware):
+    '''
+    SecurityMiddleware of Django 3.1.0 doesn't run _async_check, so under
+    ASGI it calls async middleware below it as sync one. Fixed in 3.1.1,
+    settings use it only on older Django.
+    '''
+
+    def __init__(self, get_response=None):
+        super().__init__(get_response)
+        self._async_check()
+
+
+class CartMiddleware(AsyncCapableMiddleware):
+    '''
+    Attach cart to request and save it once after view is done.
+    Must go after SessionMiddleware.
+    '''
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        request.cart = get_cart(request)
+        response = self.get_response(request)
+        request.cart.save(response)
+        return response
+
+    async def __acall__(self, request):
+        request.cart = get_cart(request)
+        response = await self.get_response(request)
+        if request.cart.modified:
+            # Session backed cart may have to load session from database.
+            await database_sync_to_async(request.cart.save)(response)
+        return response
+
+
+class PerformanceMiddleware(AsyncCapableMiddleware):
+    '''
+    Record queries, database and template time and response size of
+    request, see perf module. Should go first, so queries made by other
+    middleware are counted too.
+    '''
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with perf.RequestStats().capture() as stats:
+            response = self.get_response(request)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        with perf.RequestStats().capture() as stats:
+            response = await self.get_response(request)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        total_ms = (time.perf_counter() - stats.start) * 1000
+        size = 0 if response.streaming else len(response.content)
+        response['Server-Timing'] = stats.server_timing(total_ms, size)
+
+        match = request.resolver_match
+        view = match.view_name if match else '-'
+        perf.recorder.record(view, {
+            'total_ms': total_ms, 'db_ms': stats.db_ms, 'template_ms': stats.template_ms,
+            'queries': stats.queries, 'bytes': size,
+        })
+        for sql, count in stats.duplicates.items():
+            if count >= settings.SHOP_PERF_REPEAT_THRESHOLD:
+                perf.logger.warning('%s repeated query %d times, possible N+1: %s', view, count, sql)
+        perf.check_budget(request, stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        stats = perf.current_stats.get()
+        if stats is not None:
+            stats.budget = perf.get_budget(request, view_func)
+
+
+class ReplicaRoutingMiddleware(AsyncCapableMiddleware):
+    '''
+    Let request read catalog from replicas, see routers module. Client
+    whose request wrote catalog gets cookie pinning it to primary for
+    SHOP_REPLICA_PIN_SECONDS. Cookie only makes reads go to primary, so
+    it isn't signed.
+    '''
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with self.get_routing(request).activate() as routing:
+            response = self.get_response(request)
+        return self.pin(routing, response)
+
+    async def __acall__(self, request):
+        with self.get_routing(request).activate() as routing:
+            response = await self.get_response(request)
+        return self.pin(routing, response)
+
+    def get_routing(self, request):
+        try:
+            pinned_until = float(request.COOKIES.get(settings.SHOP_REPLICA_PIN_COOKIE_NAME, 0))
+        except ValueError:
+            pinned_until = 0
+        return Routing(pinned_until)
+
+    def pin(self, routing, response):
+        if routing.wrote:
+            seconds = settings.SHOP_REPLICA_PIN_SECONDS
+            response.set_cookie(settings.SHOP_REPLICA_PIN_COOKIE_NAME, str(time.time() + seconds),
+                                max_age=seconds, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,30 @@
+# Generated by Django 3.1 on 2026-10-18 18:51
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_products(apps, schema_editor):
+    Category = apps.get_model('shop_app', 'Category')
+    Product = apps.get_model('shop_app', 'Product')
+    available = (
+        Product.objects.filter(category=models.OuterRef('pk'), available=True)
+        .order_by().values('category').annotate(count=models.Count('pk')).values('count')
+    )
+    Category.objects.update(product_count=Coalesce(models.Subquery(available), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop_app', '0005_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='product_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='available products'),
+        ),
+        migrations.RunPython(count_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE shop_app_product_fts USING fts5("
+            "name, description, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO shop_app_product_fts (rowid, name, description) "
+            "SELECT id, name, COALESCE(description, '') FROM shop_app_product"
+        )
+    elif vendor == 'postgresql':
+        # to_tsvector is IMMUTABLE only with explicit config, which must be
+        # the one PostgresSearchBackend.config, or the index isn't used.
+        schema_editor.execute(
+            "CREATE INDEX shop_app_product_search_idx ON shop_app_product USING GIN (("
+            "setweight(to_tsvector('simple'::regconfig, COALESCE(name, '')), 'A') || "
+            "setweight(to_tsvector('simple'::regconfig, COALESCE(description, '')), 'B')))"
+        )
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS shop_app_product_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS shop_app_product_search_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop_app', '0006_category_product_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
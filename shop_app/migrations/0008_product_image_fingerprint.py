@@ -0,0 +1,18 @@
+# Generated by Django 3.1 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop_app', '0007_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=16),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop_app', '0008_product_image_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_date'], name='shop_app_or_status_aebc46_idx'),
+        ),
+    ]
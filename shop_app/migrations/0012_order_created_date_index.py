@@ -0,0 +1,18 @@
+# Generated by Django 3.1 on 2026-10-18 19:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop_app', '0011_catalog_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='created_date',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.1 on 2026-10-18 19:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop_app', '0012_order_created_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='claimed_by',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64, verbose_name='claimed by'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='claimed_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='claimed'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='fulfilled_date',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='fulfilled'),
+        ),
+    ]
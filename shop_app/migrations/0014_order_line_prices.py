@@ -0,0 +1,34 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop_app', '0013_order_fulfilment'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='created_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='updated at'),
+            preserve_default=False,
+        ),
+        # Nullable until existing lines are backfilled by next migration.
+        migrations.AddField(
+            model_name='orderitems',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True, verbose_name='unit price'),
+        ),
+        migrations.AddField(
+            model_name='orderitems',
+            name='line_total',
+            field=models.DecimalField(decimal_places=2, max_digits=12, null=True, verbose_name='line total'),
+        ),
+    ]
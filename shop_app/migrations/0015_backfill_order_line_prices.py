@@ -0,0 +1,61 @@
+'''
+Copy current product prices to existing order lines and recompute totals
+of their orders. Prices paid for legacy lines were never stored, so
+current catalog price is the closest approximation there is. Totals of
+legacy orders were summed over lines of every order, so they are
+replaced by sums of their backfilled lines. Orders whose lines already
+carry prices keep their stored totals, unless they have none.
+
+Orders are processed in batches of BATCH_SIZE ids, each batch with its
+lines in transaction of its own, so the tables are never locked for long
+and interrupted migration resumes with orders still having lines
+without prices.
+'''
+from django.db import migrations, transaction
+from django.db.models import DecimalField, Exists, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+BATCH_SIZE = 5000
+
+
+def id_batches(queryset):
+    last = queryset.order_by('-pk').values_list('pk', flat=True).first() or 0
+    for start in range(0, last + 1, BATCH_SIZE):
+        yield queryset.filter(pk__gte=start, pk__lt=start + BATCH_SIZE)
+
+
+def backfill(apps, schema_editor):
+    using = schema_editor.connection.alias
+    Product = apps.get_model('shop_app', 'Product')
+    Order = apps.get_model('shop_app', 'Order')
+    OrderItems = apps.get_model('shop_app', 'OrderItems')
+    money = DecimalField(max_digits=12, decimal_places=2)
+    price = Subquery(Product.objects.filter(pk=OuterRef('item_id')).values('price')[:1])
+    line_total = ExpressionWrapper(price * F('item_quantity'), output_field=money)
+    total = Subquery(
+        OrderItems.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        .annotate(total=Sum('line_total')).values('total'),
+        output_field=money,
+    )
+    legacy_lines = OrderItems.objects.filter(order=OuterRef('pk'), unit_price__isnull=True)
+    for batch in id_batches(Order.objects.using(using)):
+        with transaction.atomic(using=using):
+            # Totals of orders with lines to backfill are dropped first,
+            # so they are recomputed below along with missing ones.
+            batch.filter(Exists(legacy_lines)).update(price=None)
+            OrderItems.objects.using(using).filter(order__in=batch.values('pk'), unit_price__isnull=True).update(
+                unit_price=price, line_total=line_total)
+            batch.filter(price__isnull=True).update(price=Coalesce(total, 0))
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('shop_app', '0014_order_line_prices'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
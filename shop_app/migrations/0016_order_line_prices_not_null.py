@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop_app', '0015_backfill_order_line_prices'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderitems',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=12, verbose_name='unit price'),
+        ),
+        migrations.AlterField(
+            model_name='orderitems',
+            name='line_total',
+            field=models.DecimalField(decimal_places=2, max_digits=12, verbose_name='line total'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.1 on 2026-10-18 20:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop_app', '0016_order_line_prices_not_null'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('first_name', models.CharField(max_length=254, verbose_name='first name')),
+                ('last_name', models.CharField(max_length=254, verbose_name='last name')),
+                ('email', models.EmailField(db_index=True, max_length=254, verbose_name='email')),
+                ('phone', models.CharField(max_length=12, verbose_name='phone')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=12, null=True, verbose_name='price')),
+                ('status', models.IntegerField(choices=[(0, 'waiting'), (1, 'processing'), (2, 'done'), (3, 'canceled')], verbose_name='status')),
+                ('comment', models.TextField(blank=True, null=True, verbose_name='comment')),
+                ('created_date', models.DateTimeField(db_index=True, verbose_name='created')),
+                ('updated_at', models.DateTimeField(verbose_name='updated at')),
+                ('claimed_by', models.CharField(blank=True, max_length=64, verbose_name='claimed by')),
+                ('claimed_date', models.DateTimeField(blank=True, null=True, verbose_name='claimed')),
+                ('fulfilled_date', models.DateTimeField(blank=True, null=True, verbose_name='fulfilled')),
+                ('archived_date', models.DateTimeField(auto_now_add=True, verbose_name='archived')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_name', models.CharField(max_length=254, verbose_name='product')),
+                ('item_quantity', models.PositiveIntegerField(verbose_name='quantity')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='unit price')),
+                ('line_total', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='line total')),
+                ('item', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='shop_app.product')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='shop_app.archivedorder')),
+            ],
+        ),
+    ]
@@ -1,10 +1,56 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.db.models.deletion import CASCADE
 from django.db.models.fields import CharField, DecimalField, TextField
 from django.db.models.fields.related import ForeignKey
+from django.db.models.functions import Now
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.utils.safestring import mark_safe
 
+from .images import derivative_url
+from .signals import catalog_changed
+
+
+class CatalogQuerySet(models.QuerySet):
+    '''
+    QuerySet for catalog models. Bulk operations don't send model
+    signals, so they announce changes with catalog_changed, and don't
+    apply auto_now, so they set updated_at themselves.
+    '''
+
+    def update(self, **kwargs):
+        kwargs.setdefault('updated_at', Now())
+        if not set(kwargs) & set(getattr(self.model, 'search_fields', ())):
+            pks = None
+            rows = super().update(**kwargs)
+        else:
+            # Update may change what queryset selects, so rows are picked
+            # before it and search index reindexes just them.
+            with transaction.atomic(using=self.db, savepoint=False):
+                pks = list(self.values_list('pk', flat=True))
+                rows = super().update(**kwargs)
+        if rows:
+            catalog_changed.send(sender=self.model, using=self.db, fields=set(kwargs), objs=None, pks=pks)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            catalog_changed.send(sender=self.model, using=self.db, fields=None, objs=objs, created=True)
+        return objs
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        # auto_now is applied by save() only.
+        now = timezone.now()
+        for obj in objs:
+            obj.updated_at = now
+        fields = {*fields, 'updated_at'}
+        rows = super().bulk_update(objs, fields, *args, **kwargs)
+        if objs:
+            catalog_changed.send(sender=self.model, using=self.db, fields=set(fields), objs=objs)
+        return rows
+
 
 class Category(models.Model):
     '''
@@ -12,6 +58,10 @@ class Category(models.Model):
     '''
     name = models.CharField(_("name"), max_length=254, db_index=True, unique=True)
     slug = models.SlugField(max_length=254, db_index=True, unique=True)
+    product_count = models.PositiveIntegerField(_("available products"), default=0, editable=False)
+    updated_at = models.DateTimeField(_("updated at"), auto_now=True)
+
+    objects = CatalogQuerySet.as_manager()
     
     class Meta:
         ordering = ['name']
@@ -36,19 +86,49 @@ class Product(models.Model):
     price = models.DecimalField(_("price"), max_digits=12, decimal_places=2)
     description = models.TextField(_("description"), blank=True, null=True)
     image = models.ImageField(_("image"), upload_to=image_upload_path)
+    image_fingerprint = models.CharField(max_length=16, blank=True, editable=False)
     category = models.ForeignKey("Category",on_delete=models.SET_NULL, null=True, related_name="products")
     available = models.BooleanField(_("available"), default=True)
+    stock = models.PositiveIntegerField(_("stock"), null=True, blank=True,
+                                        help_text=_("Units in stock, leave empty to not track stock."))
+    updated_at = models.DateTimeField(_("updated at"), auto_now=True, db_index=True)
+
+    objects = CatalogQuerySet.as_manager()
+
+    # Fields full-text search indexes, see shop_app.search.
+    search_fields = ('name', 'description')
     
     class Meta:
         ordering = ['name']
+        # Storefront filters and sorts, see shop_app.filters.SORTS.
+        indexes = [
+            models.Index(fields=['available', 'category', 'price']),
+            models.Index(fields=['available', 'name', 'id']),
+            models.Index(fields=['available', 'price', 'id']),
+            models.Index(fields=['available', 'id']),
+            models.Index(fields=['price', 'id']),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Product with tracked stock is available while it has some.
+        if self.stock is not None:
+            self.available = self.stock > 0
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'stock' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'available'}
+        # Category counters lock stored row in pre_save and adjust counts
+        # in post_save, both must run in the transaction of the write.
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
     def image_preview(self):
         image = self.image
         if image:
-            return mark_safe('<img src="{0}" width="50" height="50" />'.format(image.url))
+            return mark_safe('<img src="{0}" width="50" height="50" />'.format(derivative_url(self, 'thumb')))
         else:
             return '(No image)'
 
@@ -70,22 +150,138 @@ class Order(models.Model):
     last_name = models.CharField(_("last name"), max_length=254)
     email = models.EmailField(_("email"), max_length=254, db_index=True)
     phone = models.CharField(_("phone"), max_length=12, ) #TODO: add phone validator
+    # Sum of line totals, stored at checkout.
     price = models.DecimalField(_("price"), max_digits=12, decimal_places=2, null=True) 
     status = models.IntegerField(_("status"), choices=Status.choices, default=Status.WAITING)
     comment = models.TextField(_("comment"),blank=True,null=True)
-    created_date = models.DateTimeField(auto_now=True)
+    created_date = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(_("updated at"), auto_now=True)
+    claimed_by = models.CharField(_("claimed by"), max_length=64, blank=True, db_index=True, editable=False)
+    claimed_date = models.DateTimeField(_("claimed"), null=True, blank=True, editable=False)
+    fulfilled_date = models.DateTimeField(_("fulfilled"), null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'created_date'])]
 
     def calc_price(self):
-        # e = models.ExpressionWrapper(models.F('item_count') * models.F('item__price'), output_field=models.DecimalField(max_digits=10,decimal_places=2))
-        # return self.orderitems_set.annotate(price=e).aggregate(models.Sum('price'))['price__sum']
-        return sum( (i.item.price * i.item_quantity for i in self.items.through.objects.all()) )
+        '''
+        Return sum of order line totals computed by the database.
+        '''
+        return self.orderitems_set.aggregate(total=models.Sum('line_total'))['total'] or 0
 
 
 
 class OrderItems(models.Model):
+    '''
+    Order line. Price of product is copied to it when order is placed,
+    so order value doesn't change with catalog prices.
+    '''
     item = models.ForeignKey('Product', on_delete=CASCADE)
     order = models.ForeignKey('Order', on_delete=CASCADE)
     item_quantity = models.PositiveIntegerField(_('quantity'))
+    unit_price = models.DecimalField(_("unit price"), max_digits=12, decimal_places=2)
+    line_total = models.DecimalField(_("line total"), max_digits=12, decimal_places=2)
+
+    @classmethod
+    def for_product(cls, order, product, quantity):
+        '''
+        Line of quantity of product at its current price.
+        '''
+        return cls(order=order, item=product, item_quantity=quantity,
+                   unit_price=product.price, line_total=product.price * quantity)
+
+    def save(self, *args, **kwargs):
+        if self.unit_price is None:
+            self.unit_price = self.item.price
+        self.line_total = self.unit_price * self.item_quantity
+        super().save(*args, **kwargs)
 
     def image_preview(self):
-        return self.item.image_preview()
\ No newline at end of file
+        return self.item.image_preview()
+
+
+
+class ArchivedOrder(models.Model):
+    '''
+    Closed order moved out of Order table by archive_orders command.
+    Keeps its number, so it can be found by the number customer knows.
+    '''
+    id = models.IntegerField(primary_key=True)
+    first_name = models.CharField(_("first name"), max_length=254)
+    last_name = models.CharField(_("last name"), max_length=254)
+    email = models.EmailField(_("email"), max_length=254, db_index=True)
+    phone = models.CharField(_("phone"), max_length=12)
+    price = models.DecimalField(_("price"), max_digits=12, decimal_places=2, null=True)
+    status = models.IntegerField(_("status"), choices=Order.Status.choices)
+    comment = models.TextField(_("comment"), blank=True, null=True)
+    created_date = models.DateTimeField(_("created"), db_index=True)
+    updated_at = models.DateTimeField(_("updated at"))
+    claimed_by = models.CharField(_("claimed by"), max_length=64, blank=True)
+    claimed_date = models.DateTimeField(_("claimed"), null=True, blank=True)
+    fulfilled_date = models.DateTimeField(_("fulfilled"), null=True, blank=True)
+    archived_date = models.DateTimeField(_("archived"), auto_now_add=True)
+
+    def __str__(self):
+        return f'Order {self.pk}'
+
+
+
+class ArchivedOrderItem(models.Model):
+    '''
+    Line of archived order. Product name is copied with it, so line
+    stays readable when product is deleted from catalog.
+    '''
+    order = models.ForeignKey('ArchivedOrder', on_delete=CASCADE, related_name='items')
+    item = models.ForeignKey('Product', on_delete=models.SET_NULL, null=True, related_name='+')
+    item_name = models.CharField(_("product"), max_length=254)
+    item_quantity = models.PositiveIntegerField(_('quantity'))
+    unit_price = models.DecimalField(_("unit price"), max_digits=12, decimal_places=2)
+    line_total = models.DecimalField(_("line total"), max_digits=12, decimal_places=2)
+
+
+
+class StockReservation(models.Model):
+    '''
+    Units of product held for cart until expires_at. Held units are taken
+    out of Product.stock and returned when reservation expires.
+    '''
+    product = models.ForeignKey('Product', on_delete=CASCADE, related_name='reservations')
+    token = models.CharField(_("cart token"), max_length=64)
+    quantity = models.PositiveIntegerField(_("quantity"))
+    expires_at = models.DateTimeField(_("expires at"), db_index=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['token', 'product'], name='unique_cart_reservation')]
+
+
+
+class OutgoingEmail(models.Model):
+    '''
+    Email waiting in outbox to be sent by send_queued_mail command.
+    '''
+
+    class Status(models.IntegerChoices):
+        QUEUED = 0, _("queued")
+        SENT = 1, _("sent")
+        FAILED = 2, _("failed")
+
+    subject = models.CharField(_("subject"), max_length=254)
+    body = models.TextField(_("body"))
+    from_email = models.CharField(_("from email"), max_length=254)
+    recipients = models.TextField(_("recipients"))
+    status = models.IntegerField(_("status"), choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(_("attempts"), default=0)
+    last_error = models.TextField(_("last error"), blank=True)
+    created_date = models.DateTimeField(auto_now_add=True)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    sent_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt'])]
+
+    def __str__(self):
+        return self.subject
+
+    @property
+    def recipient_list(self):
+        return self.recipients.split(',')
@@ -0,0 +1,204 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def encode_cursor(values, reverse=False):
+    '''
+    Pack ordering values of a boundary row into opaque url-safe token.
+    '''
+    payload = json.dumps([int(reverse), list(values)], separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    '''
+    Unpack token made by encode_cursor, return (values, reverse).
+    '''
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        reverse, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor.')
+    if not isinstance(values, list):
+        raise InvalidCursor('Invalid cursor.')
+    return values, bool(reverse)
+
+
+class KeysetPage:
+    '''
+    Page of keyset paginator. Mimics django Page interface used in templates,
+    but knows nothing about total count or page numbers.
+    '''
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Keyset page of %s objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    '''
+    Cursor based paginator. Instead of OFFSET it seeks to the row after
+    the cursor using ordering fields, so every page costs one indexed
+    query and no COUNT(*). Last ordering field must be unique, fields
+    prefixed with '-' are descending. Queryset may be values() queryset
+    including ordering fields.
+    '''
+
+    def __init__(self, queryset, per_page, ordering=('name', 'id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = tuple(f.lstrip('-') for f in self.ordering)
+
+    def _lookup(self, i, reverse):
+        descending = self.ordering[i].startswith('-')
+        return 'lt' if reverse != descending else 'gt'
+
+    def _seek(self, values, reverse):
+        condition = Q()
+        for i, field in enumerate(self.fields):
+            step = Q(**{f'{field}__{self._lookup(i, reverse)}': values[i]})
+            for prev_field, prev_value in zip(self.fields[:i], values[:i]):
+                step &= Q(**{prev_field: prev_value})
+            condition |= step
+        # Redundant range on leading field lets database walk the index in
+        # order instead of expanding OR and sorting whole tail of the table.
+        first = self.fields[0]
+        return Q(**{f'{first}__{self._lookup(0, reverse)}e': values[0]}) & condition
+
+    def _clean(self, values):
+        '''
+        Convert cursor values to python values of ordering fields, so
+        crafted cursor can't reach the database with values of wrong type.
+        '''
+        if len(values) != len(self.fields):
+            raise InvalidCursor('Invalid cursor.')
+        cleaned = []
+        for name, value in zip(self.fields, values):
+            if value is None:
+                raise InvalidCursor('Invalid cursor.')
+            try:
+                field = self.queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # Annotation, compared as it is.
+                cleaned.append(value)
+                continue
+            try:
+                cleaned.append(field.to_python(value))
+            except (ValidationError, ValueError, TypeError):
+                raise InvalidCursor('Invalid cursor.')
+        return cleaned
+
+    def _cursor(self, obj, reverse=False):
+        if isinstance(obj, dict):
+            return encode_cursor([obj[f] for f in self.fields], reverse)
+        return encode_cursor([getattr(obj, f) for f in self.fields], reverse)
+
+    def page(self, cursor=None):
+        values, reverse = decode_cursor(cursor) if cursor else (None, False)
+        if values is not None:
+            values = self._clean(values)
+
+        order = [(f[1:] if f.startswith('-') else f'-{f}') if reverse else f for f in self.ordering]
+        queryset = self.queryset.order_by(*order)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        # Moving forward we know there is a next page if extra row came back,
+        # and a previous one if we started from cursor. Backward is mirrored.
+        has_next, has_previous = has_more, values is not None
+        if reverse:
+            has_next, has_previous = has_previous, has_next
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_next:
+                next_cursor = self._cursor(rows[-1])
+            if has_previous:
+                previous_cursor = self._cursor(rows[0], reverse=True)
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+
+
+def estimate_count(model, using='default'):
+    '''
+    Return number of rows in model's table from database statistics or
+    None if database has none. SQLite keeps them in sqlite_stat1 after
+    ANALYZE, PostgreSQL in pg_class after VACUUM or ANALYZE.
+    '''
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'sqlite':
+        sql, param = 'SELECT CAST(stat AS INTEGER) FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', table
+    elif connection.vendor == 'postgresql':
+        sql, param = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', connection.ops.quote_name(table)
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [param])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class EstimatedCountPaginator(Paginator):
+    '''
+    Paginator for admin changelists of large tables. Whole table is
+    counted from database statistics once it has more than
+    SHOP_ADMIN_COUNT_LIMIT rows, filtered rows are counted only up to
+    that limit, so COUNT(*) never walks millions of rows. Pages past the
+    limit of filtered list are not linked.
+    '''
+
+    @cached_property
+    def count(self):
+        limit = settings.SHOP_ADMIN_COUNT_LIMIT
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit].count()
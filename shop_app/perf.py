@@ -0,0 +1,277 @@
+'''
+Per-request performance instrumentation.
+
+PerformanceMiddleware records for every request number of queries, time
+spent in database, repeated query signatures (usual sign of N+1), template
+render time and response size. Values are exposed in Server-Timing header
+and aggregated into per-URL-name histograms. Histograms are merged in
+process and flushed to cache every SHOP_PERF_FLUSH_INTERVAL seconds, so
+recording doesn't cost cache round trip per request.
+
+Views may declare query budget with query_budget decorator or attribute,
+views of other apps (e.g. admin) through SHOP_QUERY_BUDGETS setting.
+'''
+import contextlib
+import contextvars
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('total_ms', 'db_ms', 'template_ms', 'queries', 'bytes')
+# Histogram bucket i holds values up to BASE * GROWTH ** i, ~19% wide.
+BASE = 0.01
+GROWTH = 2 ** 0.25
+BUCKETS = 128
+VIEWS_KEY = 'shop:perf:views'
+
+current_stats = contextvars.ContextVar('shop_request_stats', default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(queries):
+    '''
+    Declare maximum number of queries view may make.
+    '''
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
+
+
+def query_signature(sql):
+    '''
+    Normalize SQL so queries differing only in parameters match.
+    '''
+    sql = re.sub(r'\((?:%s, )*%s\)', '(...)', sql)
+    return ' '.join(sql.split())
+
+
+class RequestStats:
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.signatures = Counter()
+        self.budget = None
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - start) * 1000
+            self.queries += 1
+            self.signatures[query_signature(sql)] += 1
+
+    @contextlib.contextmanager
+    def capture(self):
+        '''
+        Collect stats of code in block, including code it runs in other
+        threads through sync_to_async, which copies context.
+        '''
+        for connection in connections.all():
+            instrument(connection)
+        token = current_stats.set(self)
+        try:
+            yield self
+        finally:
+            current_stats.reset(token)
+
+    @property
+    def duplicates(self):
+        return {sql: count for sql, count in self.signatures.items() if count > 1}
+
+    def server_timing(self, total_ms, size):
+        duplicates = sum(count - 1 for count in self.duplicates.values())
+        return ', '.join([
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries, {duplicates} duplicate"',
+            f'tpl;dur={self.template_ms:.1f}',
+            f'total;dur={total_ms:.1f};desc="{size} bytes"',
+        ])
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats.execute_wrapper(execute, sql, params, many, context)
+
+
+def instrument(connection):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    instrument(connection)
+
+
+class TimedTemplate(Template):
+    '''
+    Template adding its render time to stats of current request.
+    '''
+
+    def render(self, context=None, request=None):
+        stats = current_stats.get()
+        if stats is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_ms += (time.perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    '''
+    Django template backend that times top level template renders.
+    Included templates are counted in time of template including them.
+    '''
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def bucket(value):
+    if value <= BASE:
+        return 0
+    return min(BUCKETS - 1, math.ceil(math.log(value / BASE, GROWTH)))
+
+
+def bucket_bound(index):
+    return BASE * GROWTH ** index
+
+
+def percentile(histogram, p):
+    '''
+    Upper bound of bucket holding p-th percentile of histogram,
+    mapping of bucket index to count.
+    '''
+    total = sum(histogram.values())
+    if not total:
+        return None
+    rank, seen = p / 100 * total, 0
+    for index in sorted(histogram):
+        seen += histogram[index]
+        if seen >= rank:
+            return bucket_bound(index)
+
+
+class HistogramStore:
+    '''
+    Per view histograms of METRICS kept in cache, one counter per bucket.
+    '''
+
+    def __init__(self, alias=None):
+        self.cache = caches[alias or settings.SHOP_PERF_CACHE_ALIAS]
+
+    def key(self, view, metric, index):
+        return f'shop:perf:{view}:{metric}:{index}'
+
+    def add(self, histograms):
+        '''
+        Merge histograms, mapping of (view, metric) to {bucket: count}.
+        '''
+        views = set(self.views())
+        if not {view for view, metric in histograms} <= views:
+            views.update(view for view, metric in histograms)
+            self.cache.set(VIEWS_KEY, sorted(views), None)
+        for (view, metric), counts in histograms.items():
+            for index, count in counts.items():
+                key = self.key(view, metric, index)
+                try:
+                    self.cache.incr(key, count)
+                except ValueError:
+                    if not self.cache.add(key, count, None):
+                        self.cache.incr(key, count)
+
+    def views(self):
+        return self.cache.get(VIEWS_KEY, [])
+
+    def histogram(self, view, metric):
+        keys = {self.key(view, metric, index): index for index in range(BUCKETS)}
+        return {keys[key]: count for key, count in self.cache.get_many(keys).items()}
+
+    def summary(self, percentiles=(50, 95, 99)):
+        '''
+        Yield view, metric, number of requests and percentiles.
+        '''
+        for view in self.views():
+            for metric in METRICS:
+                histogram = self.histogram(view, metric)
+                if histogram:
+                    yield view, metric, sum(histogram.values()), [percentile(histogram, p) for p in percentiles]
+
+    def reset(self):
+        keys = [self.key(view, metric, index) for view in self.views() for metric in METRICS for index in range(BUCKETS)]
+        self.cache.delete_many(keys + [VIEWS_KEY])
+
+
+class Recorder:
+    '''
+    In-process buffer of histograms, flushed to HistogramStore.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(Counter)
+        self.last_flush = time.monotonic()
+
+    def record(self, view, values):
+        with self.lock:
+            for metric, value in values.items():
+                self.histograms[view, metric][bucket(value)] += 1
+        if time.monotonic() - self.last_flush >= settings.SHOP_PERF_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            histograms, self.histograms = self.histograms, defaultdict(Counter)
+            self.last_flush = time.monotonic()
+        if histograms:
+            HistogramStore().add(histograms)
+
+
+recorder = Recorder()
+
+
+def get_budget(request, view_func):
+    budgets = getattr(settings, 'SHOP_QUERY_BUDGETS', {})
+    match = request.resolver_match
+    if match and match.view_name in budgets:
+        return budgets[match.view_name]
+    view_class = getattr(view_func, 'view_class', None)
+    return getattr(view_func, 'query_budget', getattr(view_class, 'query_budget', None))
+
+
+def check_budget(request, stats):
+    if stats.budget is None or stats.queries <= stats.budget:
+        return
+    message = (f'{request.resolver_match.view_name} made {stats.queries} queries, '
+               f'budget is {stats.budget}: {dict(Counter(stats.signatures).most_common(3))}')
+    if settings.SHOP_QUERY_BUDGET_STRICT:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
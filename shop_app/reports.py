@@ -0,0 +1,182 @@
+'''
+Order reports aggregated by the database and streaming CSV export.
+
+All report queries filter by status and created_date range, which is
+served by composite (status, created_date) index on Order. Revenue comes
+from prices stored on orders and order lines at checkout, so it never
+joins Product and doesn't change with catalog prices.
+
+Closed orders moved to archive by archive_orders are still counted:
+report functions take archived orders selected by archived_orders along
+with live ones and add them up.
+'''
+import csv
+import datetime
+import itertools
+from collections import defaultdict
+
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .archive import CLOSED
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItems, Product
+
+
+EXPORT_FIELDS = ('id', 'created_date', 'status', 'email', 'first_name', 'last_name', 'phone', 'price')
+# Products looked up by pk at once
+LOOKUP_BATCH = 500
+
+
+def filter_orders(queryset=None, date_from=None, date_to=None, statuses=None):
+    '''
+    Orders created between date_from and date_to inclusive, with one of
+    statuses. Dates are converted to datetime range, so the index on
+    created_date is used instead of computing date of every row.
+    '''
+    queryset = queryset if queryset is not None else Order.objects.all()
+    # Without explicit statuses index is still used by IN over all of them.
+    queryset = queryset.filter(status__in=statuses or Order.Status.values)
+    if date_from:
+        queryset = queryset.filter(created_date__gte=start_of_day(date_from))
+    if date_to:
+        queryset = queryset.filter(created_date__lt=start_of_day(date_to + datetime.timedelta(days=1)))
+    return queryset
+
+
+def archived_orders(date_from=None, date_to=None, statuses=None):
+    '''
+    Archived orders selected like filter_orders selects live ones. Only
+    closed orders are archived, so other statuses select none.
+    '''
+    statuses = [status for status in (statuses or Order.Status.values) if status in CLOSED]
+    if not statuses:
+        return ArchivedOrder.objects.none()
+    return filter_orders(ArchivedOrder.objects.all(), date_from, date_to, statuses)
+
+
+def add(a, b):
+    '''
+    Add sums, either may be None for sum of no rows.
+    '''
+    if a is None or b is None:
+        return b if a is None else a
+    return a + b
+
+
+def start_of_day(date):
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time()))
+
+
+def summary(orders, archived=None):
+    result = orders.aggregate(orders=Count('pk'), revenue=Sum('price'))
+    if archived is not None:
+        other = archived.aggregate(orders=Count('pk'), revenue=Sum('price'))
+        result = {'orders': result['orders'] + other['orders'], 'revenue': add(result['revenue'], other['revenue'])}
+    return result
+
+
+def _by_day(orders):
+    return (
+        orders.annotate(day=TruncDate('created_date')).values('day')
+        .annotate(orders=Count('pk'), revenue=Sum('price')).order_by('day')
+    )
+
+
+def revenue_by_day(orders, archived=None):
+    if archived is None:
+        return _by_day(orders)
+    totals = {}
+    for row in itertools.chain(_by_day(archived), _by_day(orders)):
+        total = totals.setdefault(row['day'], {'day': row['day'], 'orders': 0, 'revenue': None})
+        total['orders'] += row['orders']
+        total['revenue'] = add(total['revenue'], row['revenue'])
+    return sorted(totals.values(), key=lambda row: row['day'])
+
+
+def _by_item(lines):
+    return lines.values('item_id').annotate(quantity=Sum('item_quantity'), revenue=Sum('line_total'))
+
+
+def revenue_by_item(orders, archived=None):
+    '''
+    Quantity and revenue of order lines grouped by product id. Lines of
+    archived orders are added up with live ones in python.
+    '''
+    rows = _by_item(OrderItems.objects.filter(order__in=orders.values('pk')))
+    if archived is None:
+        return rows
+    totals = defaultdict(lambda: {'quantity': 0, 'revenue': 0})
+    archived_rows = _by_item(ArchivedOrderItem.objects.filter(order__in=archived.values('pk')))
+    for row in itertools.chain(rows, archived_rows):
+        total = totals[row['item_id']]
+        total['quantity'] += row['quantity']
+        total['revenue'] += row['revenue']
+    return [{'item_id': item_id, **total} for item_id, total in totals.items()]
+
+
+def product_values(pks, field):
+    '''
+    Return {pk: value of field} of products, looked up in batches.
+    '''
+    pks, values = list(pks), {}
+    for start in range(0, len(pks), LOOKUP_BATCH):
+        values.update(Product.objects.filter(pk__in=pks[start:start + LOOKUP_BATCH]).values_list('pk', field))
+    return values
+
+
+def revenue_by_category(orders, archived=None):
+    '''
+    Lines are summed per product, categories of products sold are
+    looked up afterwards, so lines are not joined with catalog.
+    '''
+    rows = list(revenue_by_item(orders, archived))
+    categories = product_values((row['item_id'] for row in rows), 'category__name')
+    totals = defaultdict(lambda: {'quantity': 0, 'revenue': 0})
+    for row in rows:
+        total = totals[categories.get(row['item_id'])]
+        total['quantity'] += row['quantity']
+        total['revenue'] += row['revenue']
+    result = [{'category': category, **total} for category, total in totals.items()]
+    return sorted(result, key=lambda row: row['revenue'], reverse=True)
+
+
+def revenue_by_product(orders, limit=20, archived=None):
+    if archived is None:
+        rows = list(revenue_by_item(orders).order_by('-revenue')[:limit])
+    else:
+        rows = sorted(revenue_by_item(orders, archived), key=lambda row: row['revenue'], reverse=True)[:limit]
+    names = product_values((row['item_id'] for row in rows), 'name')
+    return [{'product': names.get(row['item_id']), 'quantity': row['quantity'], 'revenue': row['revenue']}
+            for row in rows]
+
+
+class Echo:
+    '''
+    File-like object that returns written value, lets csv.writer
+    produce lines for streaming response.
+    '''
+
+    def write(self, value):
+        return value
+
+
+def export_csv(orders, chunk_size=2000, archived=None):
+    '''
+    Yield CSV lines of orders, archived ones first. Rows are fetched in
+    chunks with server side cursor where supported, so memory use doesn't
+    grow with number of orders.
+    '''
+    writer = csv.writer(Echo())
+    statuses = dict(Order.Status.choices)
+    yield writer.writerow(EXPORT_FIELDS)
+    selections = [orders] if archived is None else [archived, orders]
+    rows = itertools.chain.from_iterable(
+        selection.order_by('pk').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+        for selection in selections
+    )
+    for row in rows:
+        row = list(row)
+        row[1] = row[1].isoformat()
+        row[2] = statuses[row[2]]
+        yield writer.writerow(row)
@@ -0,0 +1,79 @@
+'''
+Database routing between primary and read replicas.
+
+Requests read models listed in SHOP_REPLICA_MODELS from random replica of
+SHOP_DB_REPLICAS, everything else is read from and written to primary.
+Request that writes any of these models reads them from primary for the
+rest of request and ReplicaRoutingMiddleware pins its client to primary
+for SHOP_REPLICA_PIN_SECONDS, so shopper sees own changes despite
+replication lag. Code running outside requests (management commands,
+workers) and inside transactions always uses primary. Request remembers
+it read from replica, so cache.py doesn't store what it built from
+replica that may not have caught up with catalog change yet.
+'''
+import contextlib
+import contextvars
+import random
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+
+PRIMARY = 'default'
+
+current_routing = contextvars.ContextVar('shop_routing', default=None)
+
+
+class Routing:
+    '''
+    Routing state of one request. Client is pinned to primary until
+    pinned_until timestamp.
+    '''
+
+    def __init__(self, pinned_until=0):
+        self.pinned_until = pinned_until
+        self.wrote = False
+        self.read_replica = False
+
+    @property
+    def use_primary(self):
+        return self.wrote or self.pinned_until > time.time()
+
+    @contextlib.contextmanager
+    def activate(self):
+        token = current_routing.set(self)
+        try:
+            yield self
+        finally:
+            current_routing.reset(token)
+
+
+def replicated(model):
+    return model._meta.label_lower in getattr(settings, 'SHOP_REPLICA_MODELS', ())
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        routing = current_routing.get()
+        replicas = getattr(settings, 'SHOP_DB_REPLICAS', ())
+        if (routing is None or routing.use_primary or not replicas or not replicated(model)
+                or transaction.get_connection(PRIMARY).in_atomic_block):
+            return PRIMARY
+        routing.read_replica = True
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        routing = current_routing.get()
+        if routing is not None and replicated(model):
+            routing.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get schema along with data from primary.
+        return db not in getattr(settings, 'SHOP_DB_REPLICAS', ())
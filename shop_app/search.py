@@ -0,0 +1,176 @@
+'''
+Full-text product search over name and description.
+
+Backend is picked by database vendor: SQLite keeps FTS5 table updated by
+signal receivers below, PostgreSQL uses GIN index over search vector,
+other databases fall back to icontains scan.
+'''
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .models import Product
+from .signals import catalog_changed
+
+
+INDEXED_FIELDS = set(Product.search_fields)
+
+
+class BaseSearchBackend:
+    '''
+    Search backend interface. search returns queryset filtered by query
+    and ordered by relevance, index maintenance methods may do nothing
+    if database keeps index itself.
+    '''
+
+    def __init__(self, using='default'):
+        self.using = using
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def update(self, queryset):
+        '''
+        (Re)index products selected by queryset.
+        '''
+
+    def remove(self, pks):
+        '''
+        Drop products with given primary keys from index.
+        '''
+
+    def rebuild(self):
+        self.update(Product.objects.using(self.using).all())
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    '''
+    No index, scans table with icontains. Used as benchmark baseline
+    and on databases without supported full-text search.
+    '''
+
+    def search(self, queryset, query):
+        condition = Q()
+        for word in query.split():
+            condition &= Q(name__icontains=word) | Q(description__icontains=word)
+        return queryset.filter(condition)
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    '''
+    SQLite FTS5 inverted index in shop_app_product_fts table, rowid is
+    product id. Ranked by bm25 with name weighted over description.
+    '''
+    table = 'shop_app_product_fts'
+    rank = 'bm25(shop_app_product_fts, 10.0, 1.0)'
+
+    @staticmethod
+    def match_expression(query):
+        # Quote every word, so user input can't break FTS query syntax,
+        # and match it as prefix.
+        words = re.findall(r'\w+', query)
+        return ' '.join(f'"{word}"*' for word in words)
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        return queryset.extra(
+            select={'search_rank': self.rank},
+            tables=[self.table],
+            where=[f'{self.table}.rowid = {Product._meta.db_table}.id', f'{self.table} MATCH %s'],
+            params=[match],
+            order_by=['search_rank'],
+        )
+
+    def update(self, queryset):
+        sql, params = queryset.using(self.using).order_by().values('pk').query.sql_with_params()
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({sql})', params)
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, name, description) '
+                f'SELECT id, name, COALESCE(description, \'\') FROM {Product._meta.db_table} '
+                f'WHERE id IN ({sql})', params
+            )
+
+    def remove(self, pks):
+        placeholders = ', '.join(['%s'] * len(pks))
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid IN ({placeholders})', list(pks))
+
+    def rebuild(self):
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        super().rebuild()
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    '''
+    PostgreSQL full text search. Index is GIN expression index over the
+    same vector, so database keeps it current by itself. Vector must
+    compile to the indexed expression, config included.
+    '''
+    config = 'simple'
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        vector = (SearchVector('name', weight='A', config=self.config) +
+                  SearchVector('description', weight='B', config=self.config))
+        search_query = SearchQuery(query, search_type='websearch', config=self.config)
+        return (
+            queryset.annotate(search_vector=vector, search_rank=SearchRank(vector, search_query))
+            .filter(search_vector=search_query).order_by('-search_rank')
+        )
+
+
+BACKENDS = {
+    'sqlite': 'shop_app.search.SQLiteFTSBackend',
+    'postgresql': 'shop_app.search.PostgresSearchBackend',
+}
+
+
+def get_backend(using='default'):
+    path = getattr(settings, 'SHOP_SEARCH_BACKEND', None) or BACKENDS.get(
+        connections[using].vendor, 'shop_app.search.LikeSearchBackend')
+    return import_string(path)(using)
+
+
+def search_products(queryset, query):
+    '''
+    Filter queryset by full-text query and order it by relevance.
+    '''
+    return get_backend(queryset.db).search(queryset, query)
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, using=None, update_fields=None, **kwargs):
+    if not raw and (update_fields is None or INDEXED_FIELDS & set(update_fields)):
+        get_backend(using).update(sender.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, using=None, **kwargs):
+    get_backend(using).remove([instance.pk])
+
+
+@receiver(catalog_changed, sender=Product)
+def index_bulk_change(sender, using=None, fields=None, objs=None, pks=None, **kwargs):
+    if fields is not None and not INDEXED_FIELDS & fields:
+        return
+    backend = get_backend(using)
+    if objs is not None:
+        # Primary keys are not set by bulk_create on every backend, slug is unique.
+        lookup, keys = 'slug__in', [obj.slug for obj in objs]
+    elif pks is not None:
+        lookup, keys = 'pk__in', pks
+    else:
+        backend.rebuild()
+        return
+    for i in range(0, len(keys), 500):
+        backend.update(sender.objects.filter(**{lookup: keys[i:i + 500]}))
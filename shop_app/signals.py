@@ -0,0 +1,9 @@
+from django.dispatch import Signal
+
+
+# Sent by catalog querysets after bulk operations that bypass model
+# save/delete signals. Receives using, fields (changed field names,
+# None when unknown), objs (changed instances, None for update()), pks
+# (primary keys of rows update() changed, if it changed search fields)
+# and created (True if objs are new rows from bulk_create).
+catalog_changed = Signal()
@@ -0,0 +1,51 @@
+'''
+Static files storage writing precompressed copies of hashed files.
+'''
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def compressors():
+    yield 'gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield 'br', brotli.compress
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    '''
+    Manifest storage that also writes gzip and, if brotli package is
+    installed, brotli copy next to every hashed text file. Hashed names
+    never change content, so all of them can be served with far-future
+    expiry and web server picks precompressed copy by Accept-Encoding.
+    '''
+    compress_extensions = ('.css', '.js', '.svg', '.json', '.txt', '.xml', '.html', '.map')
+    min_compress_size = 256
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in self.hashed_files.values():
+            if name.endswith(self.compress_extensions):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as f:
+            data = f.read()
+        if len(data) < self.min_compress_size:
+            return
+        for extension, compress in compressors():
+            compressed = compress(data)
+            # Worthless copy would only cost disk and a lookup.
+            if len(compressed) < len(data) * 0.95:
+                path = f'{name}.{extension}'
+                if self.exists(path):
+                    self.delete(path)
+                self._save(path, ContentFile(compressed))
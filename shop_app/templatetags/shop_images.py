@@ -0,0 +1,44 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..images import derivative_url, image_formats, schedule_derivatives, srcset
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_url(product, size, fmt='jpeg'):
+    '''
+    Url of product image derivative, e.g. {% image_url product 'card' %}.
+    '''
+    return derivative_url(product, size, fmt)
+
+
+@register.simple_tag
+def image_srcset(product, size, fmt='jpeg'):
+    '''
+    srcset value with 1x and 2x derivatives of product image.
+    '''
+    return srcset(product, size, fmt)
+
+
+@register.simple_tag
+def product_picture(product, size, css_class=''):
+    '''
+    <picture> element with srcsets of every derivative format. While
+    derivatives are missing they are scheduled and original is shown.
+    '''
+    if not product.image:
+        return ''
+    if not product.image_fingerprint:
+        schedule_derivatives(product)
+        return format_html('<img src="{}" alt="{}" class="{}">', product.image.url, product.slug, css_class)
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}">',
+        ((fmt, srcset(product, size, fmt)) for fmt in image_formats() if fmt != 'jpeg'),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" alt="{}" class="{}" loading="lazy"></picture>',
+        sources, derivative_url(product, size), srcset(product, size), product.slug, css_class,
+    )
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    '''
+    Test runner making views fail when they exceed their query budget.
+    Page cache is local memory of the single test process, tests clear
+    it with default cache.
+    '''
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.SHOP_QUERY_BUDGET_STRICT = True
+        settings.SHOP_PAGE_CACHE_ALIAS = 'default'
+        settings.SILENCED_SYSTEM_CHECKS = [*settings.SILENCED_SYSTEM_CHECKS, 'shop_app.W001']
@@ -0,0 +1,110 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from shop_app.models import Category, Order, OrderItems, Product
+from shop_app.pagination import EstimatedCountPaginator
+from shop_app.tests.test_views import add_product
+
+
+def add_order(email='john@example.com', **kwargs):
+    return Order.objects.create(first_name='John', last_name='Smith', email=email, phone='123', **kwargs)
+
+
+class AdminTestCase(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+
+
+class OrderChangeViewTest(AdminTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name='Category', slug='category')
+        cls.products = [add_product(f'Product {i}', 1.50, category) for i in range(100)]
+
+    def change_view_queries(self, items):
+        order = add_order()
+        OrderItems.objects.bulk_create(OrderItems.for_product(order, p, 1) for p in self.products[:items])
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse('admin:shop_app_order_change', args=[order.pk]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'Product 99' if items == 100 else 'Product 0')
+        return len(queries)
+
+    def test_queries_do_not_grow_with_items(self):
+        self.assertEqual(self.change_view_queries(100), self.change_view_queries(1))
+
+    def test_items_are_not_rendered_as_catalog_select(self):
+        order = add_order()
+        OrderItems.objects.create(order=order, item=self.products[0], item_quantity=1)
+        resp = self.client.get(reverse('admin:shop_app_order_change', args=[order.pk]))
+        self.assertNotContains(resp, 'Product 50')
+
+
+class OrderChangeListTest(AdminTestCase):
+
+    def test_date_hierarchy_from_bounds(self):
+        for year in (2019, 2021):
+            order = add_order()
+            created = datetime.datetime(year, 5, 1, tzinfo=datetime.timezone.utc)
+            Order.objects.filter(pk=order.pk).update(created_date=created)
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(reverse('admin:shop_app_order_changelist'))
+        self.assertContains(resp, '?created_date__year=2020')
+        self.assertFalse(any('DISTINCT' in q['sql'] for q in queries))
+        resp = self.client.get(reverse('admin:shop_app_order_changelist'), {'created_date__year': 2021})
+        self.assertContains(resp, 'created_date__month=5')
+
+    def test_search_by_email_and_number(self):
+        first, second = add_order(), add_order('jane@example.com')
+        resp = self.client.get(reverse('admin:shop_app_order_changelist'), {'q': 'JANE@example.com'})
+        self.assertEqual(list(resp.context['cl'].result_list), [second])
+        resp = self.client.get(reverse('admin:shop_app_order_changelist'), {'q': str(first.pk)})
+        self.assertEqual(list(resp.context['cl'].result_list), [first])
+
+    @override_settings(SHOP_ADMIN_SEARCH_DAYS=30)
+    def test_name_search_is_limited_to_recent_orders(self):
+        recent, old = add_order(), add_order()
+        Order.objects.filter(pk=old.pk).update(created_date=timezone.now() - datetime.timedelta(days=31))
+        resp = self.client.get(reverse('admin:shop_app_order_changelist'), {'q': 'smith'})
+        self.assertEqual(list(resp.context['cl'].result_list), [recent])
+
+
+class ProductChangeListTest(AdminTestCase):
+
+    def test_category_is_selected_with_products(self):
+        category = Category.objects.create(name='Category', slug='category')
+        for i in range(10):
+            add_product(f'Product {i}', 1.50, category)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('admin:shop_app_product_changelist'))
+        self.assertFalse(any('FROM "shop_app_category" WHERE "shop_app_category"."id" =' in q['sql'] for q in queries))
+
+
+class EstimatedCountPaginatorTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            add_product(f'Product {i}', 1.50)
+
+    @override_settings(SHOP_ADMIN_COUNT_LIMIT=3)
+    def test_filtered_count_is_capped(self):
+        paginator = EstimatedCountPaginator(Product.objects.filter(price__gt=1), 2)
+        self.assertEqual(paginator.count, 3)
+
+    @override_settings(SHOP_ADMIN_COUNT_LIMIT=3)
+    def test_table_count_from_statistics(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(EstimatedCountPaginator(Product.objects.all(), 2).count, 5)
+
+    def test_small_table_is_counted_exactly(self):
+        self.assertEqual(EstimatedCountPaginator(Product.objects.all(), 2).count, 5)
@@ -0,0 +1,115 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from shop_app.models import Category
+from shop_app.tests.test_views import add_product
+
+
+class ProductListAPITest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Category', slug='category')
+        for i in range(5):
+            add_product(f'Product {i}', 1.50, cls.category if i % 2 else None)
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **params):
+        resp = self.client.get(reverse('shop:api-products'), params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    def test_walk_pages_by_cursor(self):
+        data = self.get(limit=2)
+        names = [p['name'] for p in data['results']]
+        while data['next']:
+            data = self.get(limit=2, cursor=data['next'])
+            names += [p['name'] for p in data['results']]
+        self.assertEqual(names, [f'Product {i}' for i in range(5)])
+
+    def test_default_fields(self):
+        product = self.get(limit=2)['results'][1]
+        self.assertEqual(product, {
+            'id': product['id'], 'slug': 'product-1', 'name': 'Product 1', 'price': '1.50',
+            'image': '/media/media/image.png', 'category': 'category', 'available': True,
+        })
+
+    def test_sparse_fields_select_only_them(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get(fields='slug,price')
+        self.assertEqual(data['results'][0], {'slug': 'product-0', 'price': '1.50'})
+        self.assertNotIn('description', queries[-1]['sql'])
+        self.assertNotIn('JOIN', queries[-1]['sql'])
+
+    def test_unknown_field(self):
+        resp = self.client.get(reverse('shop:api-products'), {'fields': 'slug,secret'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('secret', resp.json()['error'])
+
+    def test_category_filter(self):
+        data = self.get(category=self.category.pk, fields='name')
+        self.assertEqual(data['results'], [{'name': 'Product 1'}, {'name': 'Product 3'}])
+
+    def test_invalid_filter_and_cursor(self):
+        resp = self.client.get(reverse('shop:api-products'), {'category': 999})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('category', resp.json()['error'])
+        resp = self.client.get(reverse('shop:api-products'), {'cursor': 'garbage'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_search_pages_by_offset(self):
+        first = self.get(q='product', limit=3, fields='name')
+        second = self.get(q='product', limit=3, fields='name', cursor=first['next'])
+        self.assertEqual(len(first['results']) + len(second['results']), 5)
+        self.assertIsNone(second['next'])
+
+    def test_conditional_get(self):
+        resp = self.client.get(reverse('shop:api-products'))
+        with self.assertNumQueries(0):
+            resp = self.client.get(reverse('shop:api-products'), HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
+
+    def test_post_not_allowed(self):
+        self.assertEqual(self.client.post(reverse('shop:api-products')).status_code, 405)
+
+
+class ProductAPITest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(3):
+            add_product(f'Product {i}', 2)
+
+    def test_detail(self):
+        with self.assertNumQueries(1):
+            resp = self.client.get(reverse('shop:api-product', args=['product-1']))
+        self.assertEqual(resp.json()['description'], 'Description')
+        resp = self.client.get(reverse('shop:api-product', args=['product-1']), {'fields': 'name'})
+        self.assertEqual(resp.json(), {'name': 'Product 1'})
+
+    def test_detail_not_found(self):
+        self.assertEqual(self.client.get(reverse('shop:api-product', args=['missing'])).status_code, 404)
+
+    def test_batch_in_one_query(self):
+        with self.assertNumQueries(1):
+            resp = self.client.get(reverse('shop:api-product-batch'),
+                                   {'slugs': 'product-2,missing', 'slug': 'product-0', 'fields': 'name'})
+        self.assertEqual(resp.json(), {
+            'results': [{'name': 'Product 0'}, {'name': 'Product 2'}],
+            'missing': ['missing'],
+        })
+
+    @override_settings(SHOP_API_BATCH_LIMIT=2)
+    def test_batch_limit(self):
+        resp = self.client.get(reverse('shop:api-product-batch'), {'slugs': 'a,b,c'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_categories(self):
+        Category.objects.create(name='Category', slug='category')
+        resp = self.client.get(reverse('shop:api-categories'), {'fields': 'slug'})
+        self.assertEqual(resp.json(), {'results': [{'slug': 'category'}]})
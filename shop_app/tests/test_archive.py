@@ -0,0 +1,70 @@
+import datetime
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from shop_app import archive
+from shop_app.models import ArchivedOrder, ArchivedOrderItem, Category, Order, OrderItems
+from shop_app.tests.test_admin import AdminTestCase, add_order
+from shop_app.tests.test_views import add_product
+
+
+Status = Order.Status
+
+
+def add_old_order(status, days=400, email='john@example.com'):
+    order = add_order(email, status=status)
+    Order.objects.filter(pk=order.pk).update(created_date=timezone.now() - datetime.timedelta(days=days))
+    return order
+
+
+class ArchiveOrdersTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = add_product('Product', 2.50, Category.objects.create(name='Category', slug='category'))
+
+    def test_only_old_closed_orders_are_moved(self):
+        done = add_old_order(Status.DONE)
+        OrderItems.objects.create(order=done, item=self.product, item_quantity=2)
+        canceled = add_old_order(Status.CANCELED)
+        waiting = add_old_order(Status.WAITING)
+        recent = add_order(status=Status.DONE)
+        self.assertEqual(archive.archive_orders(archive.cutoff(365)), 2)
+        self.assertEqual(set(Order.objects.values_list('pk', flat=True)), {waiting.pk, recent.pk})
+        self.assertEqual(set(ArchivedOrder.objects.values_list('pk', flat=True)), {done.pk, canceled.pk})
+        self.assertFalse(OrderItems.objects.exists())
+        line = ArchivedOrderItem.objects.get()
+        self.assertEqual((line.order_id, line.item_name, line.line_total), (done.pk, 'Product', 5))
+
+    def test_batches_resume(self):
+        orders = [add_old_order(Status.DONE, days=400 + i) for i in range(5)]
+        self.assertEqual(archive.archive_orders(archive.cutoff(365), batch_size=2, limit=3), 3)
+        # Oldest go first.
+        self.assertEqual(set(ArchivedOrder.objects.values_list('pk', flat=True)), {o.pk for o in orders[2:]})
+        self.assertEqual(archive.archive_orders(archive.cutoff(365), batch_size=2), 2)
+        self.assertFalse(Order.objects.exists())
+
+    def test_command(self):
+        add_old_order(Status.DONE)
+        out = StringIO()
+        call_command('archive_orders', days=365, pause=0, stdout=out)
+        self.assertIn('1 orders archived', out.getvalue())
+        self.assertEqual(ArchivedOrder.objects.count(), 1)
+
+
+class ArchivedOrderAdminTest(AdminTestCase):
+
+    def test_searched_on_demand(self):
+        order = add_old_order(Status.DONE, email='jane@example.com')
+        archive.archive_orders(archive.cutoff(365))
+        url = reverse('admin:shop_app_archivedorder_changelist')
+        self.assertEqual(list(self.client.get(url).context['cl'].result_list), [])
+        for term in ('jane@example.com', 'smith'):
+            resp = self.client.get(url, {'q': term})
+            self.assertEqual(len(resp.context['cl'].result_list), 1)
+        resp = self.client.get(reverse('admin:shop_app_archivedorder_change', args=[order.pk]))
+        self.assertContains(resp, 'jane@example.com')
@@ -0,0 +1,49 @@
+import types
+
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.test import TransactionTestCase, override_settings
+from django.urls import include, path, reverse
+
+from shop_app.loadtest import ASGIAppSession, CHECKOUT_DATA
+from shop_app.models import Order
+from shop_app.tests.test_views import add_product
+from shop_app.urls import get_urlpatterns
+
+
+async_urlconf = types.ModuleType('async_urlconf')
+async_urlconf.urlpatterns = [path('', include((get_urlpatterns(async_storefront=True), 'shop')))]
+
+
+@override_settings(ROOT_URLCONF=async_urlconf, ALLOWED_HOSTS=['localhost'])
+class AsyncStorefrontTest(TransactionTestCase):
+    '''
+    Async views run database work in other threads, so data must be
+    committed for them to see it. AsyncClient of Django 3.1.0 sends no
+    POST body, so requests go to ASGI handler through load test session.
+    '''
+
+    def setUp(self):
+        cache.clear()
+        self.product = add_product('Apple', 2)
+        self.session = ASGIAppSession(ASGIHandler())
+
+    def request(self, method, path, data=None):
+        return async_to_sync(self.session.request)(method, path, data)
+
+    def test_views_run_in_async_chain(self):
+        status, timing = self.request('GET', reverse('shop:list'))
+        self.assertEqual(status, 200)
+        # Queries made in worker threads are counted for the request.
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries')
+        self.assertEqual(self.request('GET', reverse('shop:detail', args=[self.product.slug]))[0], 200)
+        self.assertEqual(self.request('GET', reverse('shop:detail', args=['missing']))[0], 404)
+
+    def test_cart_and_checkout(self):
+        self.assertEqual(self.request('POST', reverse('shop:detail', args=[self.product.slug]), {'quantity': 3})[0], 302)
+        self.assertEqual(self.request('GET', reverse('shop:cart'))[0], 200)
+        self.assertEqual(self.request('POST', reverse('shop:order'), CHECKOUT_DATA)[0], 302)
+        self.assertEqual(Order.objects.get().price, 6)
+        # Cart was cleared, so order page redirects back to it.
+        self.assertEqual(self.request('GET', reverse('shop:order'))[0], 302)
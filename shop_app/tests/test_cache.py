@@ -0,0 +1,124 @@
+from django.contrib import messages
+from django.core.cache import cache as default_cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from shop_app import cache
+from shop_app.models import Category, Product
+from shop_app.tests.test_views import add_product
+
+
+class CatalogVersionTest(TestCase):
+
+    def setUp(self):
+        default_cache.clear()
+        self.category = Category.objects.create(name='Category', slug='category')
+        self.product = add_product('Product 1', 1.50, self.category)
+
+    def assertBumped(self, func):
+        version = cache.get_catalog_version()
+        func()
+        self.assertGreater(cache.get_catalog_version(), version)
+
+    def test_product_save(self):
+        self.product.price = 3
+        self.assertBumped(self.product.save)
+
+    def test_product_delete(self):
+        self.assertBumped(self.product.delete)
+
+    def test_category_save(self):
+        self.category.name = 'Renamed'
+        self.assertBumped(self.category.save)
+
+    def test_queryset_update(self):
+        self.assertBumped(lambda: Product.objects.update(price=5))
+
+    def test_bulk_create_and_update(self):
+        self.assertBumped(lambda: Category.objects.bulk_create([Category(name='New', slug='new')]))
+        self.product.price = 7
+        self.assertBumped(lambda: Product.objects.bulk_update([self.product], ['price']))
+
+    def test_lost_version_does_not_go_back(self):
+        version = cache.get_catalog_version()
+        default_cache.delete(cache.VERSION_KEY)
+        self.assertGreater(cache.get_catalog_version(), version)
+
+
+
+class CachedPageTest(TestCase):
+
+    def setUp(self):
+        default_cache.clear()
+        self.product = add_product('Product 1', 1.50)
+
+    def test_second_request_is_served_from_cache(self):
+        self.client.get(reverse('shop:list'))
+        with self.assertNumQueries(0):
+            resp = self.client.get(reverse('shop:list'))
+        self.assertContains(resp, 'Product 1')
+        self.assertEqual(cache.get_stats(), {'hits': 2, 'misses': 2, 'evictions': 0})
+
+    def test_querystring_is_part_of_key(self):
+        self.client.get(reverse('shop:list'))
+        resp = self.client.get(reverse('shop:list'), {'category': ''})
+        self.assertIsNotNone(resp.context)
+
+    def test_stale_page_is_not_served_after_edit(self):
+        self.client.get(reverse('shop:list'))
+        Product.objects.filter(pk=self.product.pk).update(price='42.00')
+        resp = self.client.get(reverse('shop:list'))
+        self.assertContains(resp, '42.00')
+        self.assertEqual(cache.get_stats()['evictions'], 2)
+
+    def test_cart_count_is_part_of_key(self):
+        self.client.get(reverse('shop:list'))
+        session = self.client.session
+        session['cart'] = {'product-1': 1}
+        session.save()
+        resp = self.client.get(reverse('shop:list'))
+        self.assertContains(resp, 'You have 1 item')
+
+    def test_pending_messages_bypass_cache(self):
+        self.client.get(reverse('shop:list'))
+        self.client.post(reverse('shop:detail', args=['product-1']), {'quantity': 1})
+        resp = self.client.get(reverse('shop:list'))
+        self.assertEqual([str(m) for m in resp.context['messages']], ['Added to cart.'])
+
+    def test_detail_product_is_cached(self):
+        self.client.get(reverse('shop:detail', args=['product-1']))
+        with self.assertNumQueries(0):
+            resp = self.client.get(reverse('shop:detail', args=['product-1']))
+        self.assertEqual(resp.context['product'], self.product)
+
+
+@override_settings(SHOP_PAGE_CACHE_TIMEOUT=0)
+class FragmentCacheTest(TestCase):
+
+    def setUp(self):
+        default_cache.clear()
+        self.product = add_product('Product 1', 1.50)
+
+    def test_product_card_is_cached_until_catalog_changes(self):
+        self.client.get(reverse('shop:list'))
+        # Bypasses signals, so catalog version stays the same.
+        Product._base_manager.filter(pk=self.product.pk).update(price=9)
+        self.assertContains(self.client.get(reverse('shop:list')), 'Price: 1.50')
+        cache.bump_catalog_version()
+        self.assertContains(self.client.get(reverse('shop:list')), 'Price: 9.00')
+
+    def test_cart_widget_varies_on_cart_count(self):
+        self.assertContains(self.client.get(reverse('shop:list')), 'Your cart is empty.')
+        self.client.post(reverse('shop:detail', args=['product-1']), {'quantity': 1})
+        self.assertContains(self.client.get(reverse('shop:list')), 'You have 1 item in')
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+
+    @override_settings(DEBUG=False, SHOP_PAGE_CACHE_ALIAS='default')
+    def test_local_memory_cache_is_reported(self):
+        self.assertEqual([e.id for e in cache.check_shared_cache(None)], ['shop_app.W001'])
+
+    @override_settings(DEBUG=False, SHOP_PAGE_CACHE_ALIAS='pages')
+    def test_shared_cache(self):
+        self.assertEqual(cache.check_shared_cache(None), [])
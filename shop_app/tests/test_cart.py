@@ -0,0 +1,92 @@
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from shop_app.cart import BaseCartStore, Cart, SignedCookieCartStore
+from shop_app.tests.test_views import add_product
+
+
+class MemoryCartStore(BaseCartStore):
+
+    def __init__(self, items=None):
+        self.data = dict(items or {})
+        self.saves = 0
+
+    def load(self):
+        return dict(self.data)
+
+    def save(self, items, response):
+        self.data = dict(items)
+        self.saves += 1
+
+
+
+class CartTest(SimpleTestCase):
+
+    def test_mutations_are_saved_once(self):
+        store = MemoryCartStore({'a': 1})
+        cart = Cart(store)
+        cart.add('b', 2)
+        cart.update({'c': 3, 'a': 5})
+        cart.remove('b')
+        cart.save(HttpResponse())
+        cart.save(HttpResponse())
+        self.assertEqual(store.data, {'a': 5, 'c': 3})
+        self.assertEqual(store.saves, 1)
+
+    def test_unchanged_cart_is_not_saved(self):
+        store = MemoryCartStore({'a': 1})
+        cart = Cart(store)
+        self.assertEqual(len(cart), 1)
+        self.assertIn('a', cart)
+        cart.save(HttpResponse())
+        self.assertEqual(store.saves, 0)
+
+    def test_compact_cookie_encoding(self):
+        items = {'product-1': 3, 'other-product': 12}
+        value = SignedCookieCartStore.encode(items)
+        self.assertEqual(value, 'product-1:3,other-product:12')
+        self.assertEqual(SignedCookieCartStore.decode(value), items)
+        self.assertEqual(SignedCookieCartStore.decode('bad,x:y,ok:1'), {'ok': 1})
+
+
+
+class CartBackendsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        add_product('Product 1', 1.50)
+        add_product('Product 2', 2.50)
+
+    def add_and_show(self):
+        self.client.post(reverse('shop:detail', args=['product-1']), {'quantity': 3})
+        self.client.post(reverse('shop:detail', args=['product-2']), {'quantity': 1})
+        self.client.post(reverse('shop:delete', args=['product-2']))
+        return self.client.get(reverse('shop:cart'))
+
+    def test_session_backend(self):
+        response = self.add_and_show()
+        self.assertEqual([p.slug for p in response.context['objects_list']], ['product-1'])
+        self.assertEqual(self.client.session['cart'], {'product-1': 3})
+
+    @override_settings(SHOP_CART_BACKEND='shop_app.cart.SignedCookieCartStore')
+    def test_signed_cookie_backend(self):
+        response = self.add_and_show()
+        self.assertEqual([p.slug for p in response.context['objects_list']], ['product-1'])
+        self.assertFalse(Session.objects.exists())
+
+    @override_settings(SHOP_CART_BACKEND='shop_app.cart.SignedCookieCartStore')
+    def test_tampered_cookie_is_ignored(self):
+        self.client.cookies['cart'] = 'product-1:3'
+        response = self.client.get(reverse('shop:cart'))
+        self.assertFalse(response.context['objects_list'])
+
+    @override_settings(SHOP_CART_BACKEND='shop_app.cart.CacheCartStore')
+    def test_cache_backend(self):
+        response = self.add_and_show()
+        self.assertEqual([p.slug for p in response.context['objects_list']], ['product-1'])
+        cart_id = self.client.cookies['cart'].value
+        self.assertEqual(cache.get(f'shop:cart:{cart_id}'), {'product-1': 3})
+        self.assertFalse(Session.objects.exists())
@@ -0,0 +1,103 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from shop_app.catalog_io import CatalogImporter, export_rows, read_rows, write_rows
+from shop_app.models import Category, Product
+from shop_app.search import search_products
+
+
+CSV_FEED = '''slug,name,price,description,image,category,available
+apple,Red apple,2.50,Sweet,images/apple.png,fruits,1
+pear,Green pear,3,,,fruits,0
+carrot,Carrot,1,,,vegetables,yes
+'''
+
+
+def import_csv(text, batch_size=2):
+    importer = CatalogImporter(batch_size)
+    importer.run(read_rows(io.StringIO(text), 'csv'))
+    return importer
+
+
+class CatalogImportTest(TestCase):
+
+    def test_creates_products_and_categories(self):
+        importer = import_csv(CSV_FEED)
+        self.assertEqual(importer.created, 3)
+        apple = Product.objects.get(slug='apple')
+        self.assertEqual(str(apple.price), '2.50')
+        self.assertEqual(apple.category.slug, 'fruits')
+        self.assertFalse(Product.objects.get(slug='pear').available)
+        self.assertEqual(dict(Category.objects.values_list('slug', 'product_count')),
+                         {'fruits': 1, 'vegetables': 1})
+        self.assertEqual(search_products(Product.objects.all(), 'carrot').get().slug, 'carrot')
+
+    def test_upserts_only_changed_columns(self):
+        import_csv(CSV_FEED)
+        Product.objects.filter(slug='apple').update(image_fingerprint='abc')
+        importer = import_csv('slug,name,price,available\napple,Red apple,2.50,1\npear,Green pear,4,1\nplum,Plum,5,1\n')
+        self.assertEqual((importer.created, importer.updated, importer.unchanged), (1, 1, 1))
+        pear = Product.objects.get(slug='pear')
+        self.assertEqual((str(pear.price), pear.available, pear.name), ('4.00', True, 'Green pear'))
+        self.assertEqual(Product.objects.get(slug='apple').image_fingerprint, 'abc')
+        self.assertEqual(Category.objects.get(slug='fruits').product_count, 2)
+
+    def test_exported_catalog_imports_unchanged(self):
+        import_csv(CSV_FEED)
+        self.assertIsNone(Product.objects.get(slug='pear').description)
+        file = io.StringIO()
+        write_rows(export_rows(), file, 'csv')
+        importer = import_csv(file.getvalue())
+        self.assertEqual((importer.created, importer.updated, importer.unchanged), (0, 0, 3))
+
+    def test_stock_sets_available(self):
+        import_csv(CSV_FEED)
+        import_csv('slug,stock\napple,0\npear,7\n')
+        self.assertEqual(list(Product.objects.filter(slug__in=['apple', 'pear']).values_list('stock', 'available')),
+                         [(7, True), (0, False)])
+        self.assertEqual(Category.objects.get(slug='fruits').product_count, 1)
+
+    def test_changed_image_resets_fingerprint(self):
+        import_csv(CSV_FEED)
+        Product.objects.filter(slug='apple').update(image_fingerprint='abc')
+        import_csv('slug,image\napple,images/new-apple.png\n')
+        self.assertEqual(Product.objects.get(slug='apple').image_fingerprint, '')
+
+    def test_batch_queries(self):
+        import_csv(CSV_FEED)
+        feed = 'slug,name,price\n' + ''.join(f'new-{i},New {i},{i}\n' for i in range(50))
+        # categories, existing rows, insert, counter recount and search index
+        with self.assertNumQueries(8):
+            import_csv(feed, batch_size=100)
+
+
+class CatalogCommandTest(TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def test_export_import_round_trip(self):
+        import_csv(CSV_FEED)
+        exported = list(export_rows())
+        for fmt in ('csv', 'jsonl'):
+            path = os.path.join(self.dir.name, f'catalog.{fmt}')
+            call_command('export_products', path)
+            Product.objects.all().delete()
+            out = io.StringIO()
+            call_command('import_products', path, stdout=out)
+            self.assertIn('created 3', out.getvalue())
+            self.assertEqual(list(export_rows()), exported)
+
+    def test_export_jsonl_to_stdout(self):
+        import_csv(CSV_FEED)
+        out = io.StringIO()
+        call_command('export_products', format='jsonl', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([row['slug'] for row in rows], ['apple', 'pear', 'carrot'])
+        self.assertEqual(rows[0]['price'], '2.50')
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from shop_app.models import Category, Product
+from shop_app.tests.test_views import add_product
+
+
+class ConditionalListTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Category', slug='category')
+        self.product = add_product('Product 1', 1.50, self.category)
+        self.url = reverse('shop:list')
+
+    def test_repeat_visit_gets_304(self):
+        resp = self.client.get(self.url)
+        self.assertTrue(resp.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
+
+    @override_settings(SHOP_PAGE_CACHE_TIMEOUT=0)
+    def test_304_without_cache_costs_one_query(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.url)['Last-Modified']
+        resp = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_product_edit_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.product.price = 3
+        self.product.save()
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_product_delete_changes_etag(self):
+        add_product('Product 2', 2.50, self.category)
+        etag = self.client.get(self.url)['ETag']
+        self.product.delete()
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_filter_has_own_etag(self):
+        add_product('Product 2', 2.50)
+        etag = self.client.get(self.url)['ETag']
+        resp = self.client.get(self.url, {'category': self.category.pk}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_cart_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        session = self.client.session
+        session['cart'] = {'product-1': 1}
+        session.save()
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, 'You have 1 item')
+        self.assertFalse(resp.has_header('Last-Modified'))
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
+
+
+class ConditionalDetailTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.product = add_product('Product 1', 1.50)
+        self.url = reverse('shop:detail', args=[self.product.slug])
+
+    def test_repeat_visit_gets_304(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+    def test_stock_change_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        Product.objects.filter(pk=self.product.pk).update(available=False)
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(resp, 'Out of stock')
+
+    def test_flash_message_is_not_hidden_by_304(self):
+        etag = self.client.get(self.url)['ETag']
+        resp = self.client.post(self.url, {'quantity': 1})
+        resp = self.client.get(resp.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(resp, 'Added to cart.')
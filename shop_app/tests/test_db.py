@@ -0,0 +1,33 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+
+class PragmasTest(SimpleTestCase):
+
+    def connect(self, **settings_dict):
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        wrapper = DatabaseWrapper({**connection.settings_dict, 'NAME': path, **settings_dict}, alias='pragmas')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied_on_connect(self):
+        wrapper = self.connect(PRAGMAS=settings.SQLITE_WAL_PRAGMAS)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+
+    def test_no_pragmas_by_default(self):
+        wrapper = self.connect(PRAGMAS=None)
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'delete')
@@ -0,0 +1,149 @@
+import itertools
+import re
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase
+from django.urls import reverse
+
+from shop_app.filters import SORTS, ProductFilter
+from shop_app.models import Category, Product
+from shop_app.pagination import KeysetPaginator, encode_cursor
+from shop_app.tests.test_views import add_product
+
+
+class ProductFilterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Category', slug='category')
+        for i, price in enumerate((5, 15, 25, 35)):
+            add_product(f'Product {i}', price, cls.category)
+        Product.objects.filter(name='Product 3').update(available=False)
+
+    def setUp(self):
+        cache.clear()
+
+    def names(self, **params):
+        resp = self.client.get(reverse('shop:list'), params)
+        return [p.name for p in resp.context['product_list']]
+
+    def test_products_out_of_stock_are_listed_on_demand(self):
+        self.assertEqual(self.names(), ['Product 0', 'Product 1', 'Product 2'])
+        self.assertEqual(self.names(availability='all'), ['Product 0', 'Product 1', 'Product 2', 'Product 3'])
+
+    def test_price_range(self):
+        self.assertEqual(self.names(min_price=10, max_price=25, availability='all'), ['Product 1', 'Product 2'])
+
+    def test_sort_pages_by_cursor(self):
+        add_product('Product 4', 45, self.category)
+        resp = self.client.get(reverse('shop:list'), {'sort': '-price', 'availability': 'all'})
+        self.assertEqual([p.price for p in resp.context['product_list']], [45, 35, 25, 15, 5])
+        for i in range(5, 9):
+            add_product(f'Product {i}', 1, self.category)
+        resp = self.client.get(reverse('shop:list'), {'sort': 'newest'})
+        page = resp.context['page_obj']
+        resp = self.client.get(reverse('shop:list'), {'sort': 'newest', 'cursor': page.next_cursor})
+        self.assertEqual([p.name for p in resp.context['product_list']], ['Product 1', 'Product 0'])
+
+    def test_api_follows_sort(self):
+        resp = self.client.get(reverse('shop:api-products'), {'sort': 'price', 'fields': 'name', 'limit': 2})
+        self.assertEqual([p['name'] for p in resp.json()['results']], ['Product 0', 'Product 1'])
+        resp = self.client.get(reverse('shop:api-products'), {'sort': 'price', 'fields': 'name',
+                                                               'cursor': resp.json()['next']})
+        self.assertEqual([p['name'] for p in resp.json()['results']], ['Product 2'])
+
+    def test_category_facets_follow_selection(self):
+        tools = Category.objects.create(name='Tools', slug='tools')
+        add_product('Hammer', 30, tools)
+        facets = ProductFilter(QueryDict(f'category={tools.pk}'), queryset=Product.objects.all()).category_facets()
+        self.assertEqual([(f['name'], f['count'], f['selected']) for f in facets],
+                         [('Category', 3, False), ('Tools', 1, True)])
+        data = QueryDict('min_price=10&max_price=30&availability=all')
+        facets = ProductFilter(data, queryset=Product.objects.all()).category_facets()
+        self.assertEqual([(f['name'], f['count']) for f in facets], [('Category', 2), ('Tools', 1)])
+        resp = self.client.get(reverse('shop:list'), {'min_price': 20})
+        self.assertContains(resp, 'Category (1)')
+        self.assertContains(resp, 'Tools (1)')
+        resp = self.client.get(reverse('shop:list'), {'availability': 'all', 'q': 'product'})
+        self.assertContains(resp, 'Category (4)')
+
+    def test_sort_cursor_of_wrong_type(self):
+        params = {'sort': 'price', 'cursor': encode_cursor(['abc', 1])}
+        self.assertEqual(self.client.get(reverse('shop:list'), params).status_code, 404)
+        self.assertEqual(self.client.get(reverse('shop:api-products'), params).status_code, 400)
+
+
+# Statistics of 1M products in 100 categories with 1000 distinct prices,
+# half of them available, by indexed columns.
+PRODUCT_STATS = {
+    ('available', 'category_id', 'price'): '1000000 500000 5000 5',
+    ('available', 'name', 'id'): '1000000 500000 1 1',
+    ('available', 'price', 'id'): '1000000 500000 500 1',
+    ('available', 'id'): '1000000 500000 1',
+    ('price', 'id'): '1000000 1000 1',
+    ('category_id',): '1000000 10000',
+    ('name',): '1000000 1',
+    ('slug',): '1000000 1',
+    ('updated_at',): '1000000 1',
+}
+
+
+class ProductFilterPlanTest(TestCase):
+    '''
+    Query plans of product list pages, with table statistics of
+    1M products loaded into the planner.
+    '''
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = [Category.objects.create(name=f'Category {i}', slug=f'category-{i}', product_count=1)
+                          for i in range(2)]
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute("DELETE FROM sqlite_stat1 WHERE tbl = 'shop_app_product'")
+            cursor.execute("INSERT INTO sqlite_stat1 VALUES ('shop_app_product', NULL, '1000000')")
+            for index in connection.introspection.get_constraints(cursor, 'shop_app_product').values():
+                if index['index']:
+                    cursor.execute("INSERT INTO sqlite_stat1 SELECT 'shop_app_product', name, %s FROM sqlite_master "
+                                   "WHERE type = 'index' AND tbl_name = 'shop_app_product' AND sql LIKE %s",
+                                   [PRODUCT_STATS[tuple(index['columns'])], '%(' + ', '.join(
+                                       f'"{column}"' for column in index['columns']) + ')'])
+            # Planner rereads statistics.
+            cursor.execute('ANALYZE sqlite_master')
+
+    def assertIndexed(self, queryset):
+        '''
+        Products are searched by index. Table or index is scanned only
+        when nothing filters it, in ORDER BY order up to LIMIT.
+        '''
+        plan = queryset.explain()
+        for line in plan.splitlines():
+            if not re.search(r'(SCAN|SEARCH) (TABLE )?shop_app_product\b', line):
+                continue
+            if queryset.query.where:
+                self.assertIn('SEARCH', line, plan)
+            else:
+                self.assertNotIn('TEMP B-TREE', plan, plan)
+
+    def test_every_filter_and_sort_uses_index(self):
+        combinations = itertools.product(('in_stock', 'all'), (0, 1, 2), (False, True), SORTS, (False, True))
+        for availability, categories, price, sort, seek in combinations:
+            data = QueryDict(mutable=True)
+            data.update({'availability': availability, 'sort': sort})
+            data.setlist('category', [c.pk for c in self.categories[:categories]])
+            if price:
+                data.update({'min_price': '10', 'max_price': '20'})
+            filterset = ProductFilter(data, queryset=Product.objects.all())
+            self.assertTrue(filterset.is_valid(), filterset.errors)
+            paginator = KeysetPaginator(filterset.qs, 6, filterset.get_ordering())
+            queryset = filterset.qs.order_by(*paginator.ordering)
+            if seek:
+                values = {'name': 'M', 'price': Decimal('15'), 'id': 500000}
+                queryset = queryset.filter(paginator._seek([values[f] for f in paginator.fields], False))
+            with self.subTest(availability=availability, categories=categories, price=price, sort=sort, seek=seek):
+                self.assertIndexed(queryset[:7])
@@ -0,0 +1,166 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+from django.urls import reverse
+
+from shop_app import fulfilment
+from shop_app.models import Order
+
+
+Status = Order.Status
+
+
+def add_orders(number, status=Status.WAITING):
+    return [Order.objects.create(first_name='Bob', last_name='Bobston', email=f'bob{i}@mail.com', phone='123',
+                                 status=status) for i in range(number)]
+
+
+class TransitionTest(TestCase):
+
+    def test_only_allowed_moves_are_applied(self):
+        add_orders(2)
+        add_orders(1, Status.DONE)
+        self.assertEqual(fulfilment.transition(Order.objects.all(), Status.PROCESSING), 2)
+        self.assertEqual(fulfilment.transition(Order.objects.all(), Status.WAITING), 0)
+        self.assertEqual(fulfilment.transition(Order.objects.all(), Status.CANCELED), 2)
+        self.assertEqual(Order.objects.filter(status=Status.DONE).count(), 1)
+
+
+class WorkerTest(TestCase):
+
+    def test_claim_oldest_batch(self):
+        orders = add_orders(5)
+        claimed = fulfilment.claim_orders('worker-1', 3)
+        self.assertEqual(sorted(o.pk for o in claimed), sorted(o.pk for o in orders[:3]))
+        self.assertEqual(fulfilment.claim_orders('worker-2', 3)[0].claimed_by, 'worker-2')
+        self.assertEqual(fulfilment.claim_orders('worker-3', 3), [])
+
+    def test_complete_only_own_orders(self):
+        add_orders(2)
+        mine = fulfilment.claim_orders('worker-1', 1)
+        theirs = fulfilment.claim_orders('worker-2', 1)
+        self.assertEqual(fulfilment.complete_orders('worker-1', mine + theirs), 1)
+        self.assertIsNotNone(Order.objects.get(pk=mine[0].pk).fulfilled_date)
+        self.assertEqual(Order.objects.get(pk=theirs[0].pk).status, Status.PROCESSING)
+
+    def test_run_worker(self):
+        add_orders(7)
+        handled = []
+        stats = fulfilment.run_worker('worker-1', batch_size=3, handle=handled.append)
+        self.assertEqual(len(stats['pks']), 7)
+        self.assertEqual(len(handled), 7)
+        self.assertEqual(len(stats['claim_ms']), 4)
+        self.assertFalse(Order.objects.exclude(status=Status.DONE).exists())
+
+    def test_failed_batch_is_completed_by_next_run(self):
+        add_orders(4)
+
+        def fail_third(order):
+            if len(handled) == 2:
+                raise RuntimeError('handler failed')
+            handled.append(order.pk)
+
+        handled = []
+        with self.assertRaises(RuntimeError):
+            fulfilment.run_worker('worker:1', batch_size=4, handle=fail_third)
+        self.assertEqual(Order.objects.filter(status=Status.DONE).count(), 2)
+        self.assertEqual(fulfilment.run_worker('worker:2', lease=60)['pks'], [])
+        stats = fulfilment.run_worker('worker:2', lease=0, handle=handled.append)
+        self.assertEqual(len(stats['pks']), 2)
+        self.assertEqual(len(set(handled)), 4)
+        self.assertFalse(Order.objects.exclude(status=Status.DONE).exists())
+
+    def test_staff_claims_are_not_reclaimed(self):
+        add_orders(1, Status.PROCESSING)
+        Order.objects.update(claimed_by='admin', claimed_date=timezone.now())
+        self.assertEqual(fulfilment.claim_orders('worker:1', 10, lease=0), [])
+
+
+class RetryLockedTest(SimpleTestCase):
+
+    def failing(self, message, times):
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) <= times:
+                raise OperationalError(message)
+            return 'done'
+        return func, calls
+
+    def test_lock_is_retried(self):
+        stats = {'retries': 0}
+        func, calls = self.failing('database is locked', 2)
+        self.assertEqual(fulfilment.retry_locked(func, stats), 'done')
+        self.assertEqual(stats['retries'], 2)
+
+    def test_other_errors_are_raised(self):
+        func, calls = self.failing('no such table: shop_app_order', 1)
+        with self.assertRaises(OperationalError):
+            fulfilment.retry_locked(func, {'retries': 0})
+        self.assertEqual(len(calls), 1)
+
+    def test_retries_are_limited(self):
+        func, calls = self.failing('database is locked', 10)
+        with self.assertRaises(OperationalError):
+            fulfilment.retry_locked(func, {'retries': 0}, limit=3)
+        self.assertEqual(len(calls), 4)
+
+
+class ProcessOrdersCommandTest(SimpleTestCase):
+
+    def test_handler_is_required(self):
+        with self.assertRaisesMessage(CommandError, 'No fulfilment handler'):
+            call_command('process_orders')
+        with self.assertRaisesMessage(CommandError, 'Can\'t import'):
+            call_command('process_orders', handler='shop_app.missing.handle')
+
+
+class PoolTest(SimpleTestCase):
+
+    def test_failed_worker_is_reported(self):
+        with self.assertRaisesMessage(fulfilment.WorkerFailed, 'ConnectionDoesNotExist'):
+            fulfilment.run_pool(2, using='missing')
+
+
+class ConcurrentFulfilmentTest(TransactionTestCase):
+
+    def test_every_order_is_processed_exactly_once(self):
+        orders = add_orders(300)
+        with ThreadPoolExecutor(8) as pool:
+            stats = list(pool.map(lambda n: fulfilment.run_worker(f'worker-{n}', batch_size=7), range(8)))
+        total = fulfilment.summary(stats)
+        self.assertEqual(total['orders'], 300)
+        self.assertEqual(total['duplicates'], 0)
+        self.assertEqual(Order.objects.filter(status=Status.DONE).count(), 300)
+        processed = {pk: worker['worker'] for worker in stats for pk in worker['pks']}
+        claimed = dict(Order.objects.values_list('pk', 'claimed_by'))
+        self.assertEqual(processed, claimed)
+        self.assertEqual(set(processed), {o.pk for o in orders})
+
+
+class OrderActionsTest(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+
+    def test_close_skips_orders_not_in_processing(self):
+        waiting, processing = add_orders(1)[0], add_orders(1, Status.PROCESSING)[0]
+        resp = self.client.post(reverse('admin:shop_app_order_changelist'), {
+            'action': 'close_order', '_selected_action': [waiting.pk, processing.pk],
+        }, follow=True)
+        self.assertContains(resp, '1 orders can&#x27;t move to done')
+        self.assertEqual(Order.objects.get(pk=waiting.pk).status, Status.WAITING)
+        self.assertEqual(Order.objects.get(pk=processing.pk).status, Status.DONE)
+
+    def test_process_claims_for_user(self):
+        order = add_orders(1)[0]
+        self.client.post(reverse('admin:shop_app_order_changelist'), {
+            'action': 'process_order', '_selected_action': [order.pk],
+        })
+        self.assertEqual(Order.objects.get(pk=order.pk).claimed_by, 'admin')
+        self.assertEqual(fulfilment.claim_orders('worker-1', 10), [])
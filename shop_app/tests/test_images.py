@@ -0,0 +1,67 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from shop_app import images
+from shop_app.models import Product
+
+
+def png(color='red', size=(1000, 800)):
+    data = BytesIO()
+    Image.new('RGBA', size, color).save(data, 'PNG')
+    return SimpleUploadedFile('upload.png', data.getvalue(), content_type='image/png')
+
+
+class ImageDerivativesTest(TestCase):
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        override = override_settings(MEDIA_ROOT=self.media, SHOP_IMAGE_WORKERS=0)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(shutil.rmtree, self.media)
+        self.product = Product.objects.create(name='Lamp', slug='lamp', price=1, image=png())
+
+    def render(self, source):
+        return Template('{% load shop_images %}' + source).render(Context({'product': self.product}))
+
+    def test_fallback_to_original(self):
+        self.assertEqual(images.derivative_url(self.product, 'card'), '/media/images/lamp.png')
+        self.assertEqual(self.render("{% product_picture product 'card' %}"),
+                         '<img src="/media/images/lamp.png" alt="lamp" class="">')
+
+    def test_generate(self):
+        fingerprint = images.generate_derivatives(self.product)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_fingerprint, fingerprint)
+        url = images.derivative_url(self.product, 'card', density=2)
+        self.assertEqual(url, f'/media/thumbs/lamp/card-2x.{fingerprint}.jpeg')
+        with Image.open(self.media + url[len('/media'):]) as image:
+            self.assertEqual(image.size, (572, 458))
+        self.assertIn('card-1x', self.render("{% image_srcset product 'card' %}"))
+        self.assertIn('<picture>', self.render("{% product_picture product 'card' %}"))
+
+    def test_new_upload_resets_fingerprint(self):
+        images.generate_derivatives(self.product)
+        self.product.image = png('blue')
+        self.product.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.image_fingerprint, '')
+
+    def test_template_schedules_missing(self):
+        self.render("{% product_picture product 'card' %}")
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.image_fingerprint)
+
+    def test_backfill_command(self):
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIn('generated derivatives of 1 images', out.getvalue())
+        self.product.refresh_from_db()
+        self.assertTrue(self.product.image_fingerprint)
@@ -0,0 +1,162 @@
+import datetime
+import io
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from shop_app import inventory
+from shop_app.bench import CHECKOUT_DATA, checkout_stress
+from shop_app.models import Category, Order, OrderItems, Product, StockReservation
+
+
+def add_product(name, stock, category=None):
+    return Product.objects.create(name=name, slug=name.lower().replace(' ', '-'), price=2,
+                                  image='/media/image.png', category=category, stock=stock)
+
+
+class StockTest(TestCase):
+
+    def setUp(self):
+        self.category = Category.objects.create(name='Lamps', slug='lamps')
+        self.product = add_product('Lamp', 3, self.category)
+
+    def count(self):
+        return Category.objects.get().product_count
+
+    def test_available_is_derived_from_stock(self):
+        self.product.stock = 0
+        self.product.save(update_fields=['stock'])
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.available)
+        self.assertEqual(self.count(), 0)
+
+    def test_untracked_product_keeps_available(self):
+        product = add_product('Rug', None)
+        inventory.take_stock(product, 100)
+        product.refresh_from_db()
+        self.assertTrue(product.available)
+        self.assertIsNone(product.stock)
+
+    def test_take_stock_sells_out(self):
+        with self.assertNumQueries(1):
+            inventory.take_stock(self.product, 2)
+        inventory.take_stock(self.product, 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+        self.assertFalse(self.product.available)
+        self.assertEqual(self.count(), 0)
+        with self.assertRaises(inventory.OutOfStock):
+            inventory.take_stock(self.product, 1)
+
+    def test_take_more_than_stock(self):
+        with self.assertRaises(inventory.OutOfStock):
+            inventory.take_stock(self.product, 4)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+
+    def test_return_stock_makes_product_available(self):
+        inventory.take_stock(self.product, 3)
+        inventory.return_stock(self.product, 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 2)
+        self.assertTrue(self.product.available)
+        self.assertEqual(self.count(), 1)
+
+
+class CheckoutStockTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.product = add_product('Lamp', 2)
+
+    def test_checkout_takes_stock(self):
+        self.client.post(reverse('shop:detail', args=['lamp']), {'quantity': 2})
+        response = self.client.post(reverse('shop:order'), CHECKOUT_DATA)
+        self.assertRedirects(response, reverse('shop:order-created'))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+        self.assertFalse(self.product.available)
+
+    def test_checkout_without_stock_is_rejected(self):
+        self.client.post(reverse('shop:detail', args=['lamp']), {'quantity': 3})
+        response = self.client.post(reverse('shop:order'), CHECKOUT_DATA)
+        self.assertRedirects(response, reverse('shop:cart'))
+        self.assertFalse(Order.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 2)
+
+    def test_sold_out_product_cant_be_added(self):
+        inventory.take_stock(self.product, 2)
+        self.client.post(reverse('shop:detail', args=['lamp']), {'quantity': 1})
+        self.assertFalse(self.client.session.get('cart'))
+
+
+@override_settings(SHOP_RESERVATION_TIMEOUT=600, SHOP_QUERY_BUDGETS=settings.RESERVATION_QUERY_BUDGETS)
+class ReservationTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.product = add_product('Lamp', 5)
+
+    def stock(self):
+        self.product.refresh_from_db()
+        return self.product.stock
+
+    def test_cart_holds_units(self):
+        self.client.post(reverse('shop:detail', args=['lamp']), {'quantity': 3})
+        self.assertEqual(self.stock(), 2)
+        self.client.post(reverse('shop:detail', args=['lamp']), {'quantity': 1})
+        self.assertEqual(self.stock(), 4)
+        self.assertEqual(StockReservation.objects.get().quantity, 1)
+
+    def test_reservation_over_stock_is_rejected(self):
+        self.client.post(reverse('shop:detail', args=['lamp']), {'quantity': 6})
+        self.assertEqual(self.stock(), 5)
+        self.assertFalse(self.client.session.get('cart'))
+
+    def test_checkout_claims_reservation(self):
+        self.client.post(reverse('shop:detail', args=['lamp']), {'quantity': 3})
+        self.client.post(reverse('shop:order'), CHECKOUT_DATA)
+        self.assertEqual(self.stock(), 2)
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(OrderItems.objects.get().item_quantity, 3)
+
+    def test_remove_from_cart_releases_units(self):
+        self.client.post(reverse('shop:detail', args=['lamp']), {'quantity': 3})
+        self.client.post(reverse('shop:delete', args=['lamp']))
+        self.assertEqual(self.stock(), 5)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_expired_reservations_are_released(self):
+        self.client.post(reverse('shop:detail', args=['lamp']), {'quantity': 5})
+        self.assertFalse(Product.objects.get().available)
+        StockReservation.objects.update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        out = io.StringIO()
+        call_command('release_reservations', stdout=out)
+        self.assertEqual(out.getvalue(), 'released 1 reservations\n')
+        self.assertEqual(self.stock(), 5)
+        self.assertTrue(Product.objects.get().available)
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_checkout_after_expiry_takes_stock_again(self):
+        self.client.post(reverse('shop:detail', args=['lamp']), {'quantity': 2})
+        StockReservation.objects.update(expires_at=timezone.now() - datetime.timedelta(seconds=1))
+        inventory.release_expired()
+        self.client.post(reverse('shop:order'), CHECKOUT_DATA)
+        self.assertEqual(self.stock(), 3)
+
+
+class ConcurrentCheckoutTest(TransactionTestCase):
+
+    def test_hot_product_is_not_oversold(self):
+        product = add_product('Lamp', 20)
+        result = checkout_stress(product.slug, threads=8)
+        product.refresh_from_db()
+        self.assertEqual(result['orders'], 20)
+        self.assertEqual(result['rejected'], 8)
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(sum(OrderItems.objects.values_list('item_quantity', flat=True)), 20)
@@ -0,0 +1,50 @@
+import io
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from shop_app.bench import percentiles, seed_catalog, seed_orders
+from shop_app.loadtest import ClientSession, get_flows, run_flow
+from shop_app.management.commands.bench import Command
+from shop_app.models import Order, OrderItems
+
+
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class LoadTestFlowsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(30, categories=3)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_flows_run_without_errors(self):
+        flows = get_flows(30)
+        for name, flow in flows.items():
+            result = run_flow(flow, [ClientSession()], 4)
+            self.assertEqual((result['requests'], result['errors']), (4, 0), name)
+            self.assertIsNotNone(result['queries'], name)
+        self.assertEqual(Order.objects.count(), 4)
+
+    def test_seed_orders(self):
+        seed_orders(10, items_per_order=2, days=10)
+        self.assertEqual(Order.objects.count(), 10)
+        self.assertEqual(OrderItems.objects.count(), 20)
+        first, last = Order.objects.order_by('pk')[::9]
+        self.assertAlmostEqual((last.created_date - first.created_date).days, -9, delta=1)
+
+    def test_percentiles(self):
+        self.assertEqual(percentiles(list(range(101))), {'p50': 50, 'p95': 95, 'p99': 99})
+        self.assertEqual(percentiles([]), {'p50': 0, 'p95': 0, 'p99': 0})
+
+
+class CompareTest(TestCase):
+
+    def test_regressions(self):
+        command = Command(stdout=io.StringIO())
+        baseline = {'client': {'list': {'rps': 100, 'p95': 10, 'queries': 2}}}
+        same = {'client': {'list': {'rps': 90, 'p95': 11, 'queries': 2.5}}}
+        worse = {'client': {'list': {'rps': 50, 'p95': 20, 'queries': 3}}}
+        self.assertEqual(command.compare(baseline, same, 0.2), 0)
+        self.assertEqual(command.compare(baseline, worse, 0.2), 3)
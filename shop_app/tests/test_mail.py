@@ -0,0 +1,108 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail as django_mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from shop_app import mail
+from shop_app.models import OutgoingEmail
+from shop_app.tests import test_views
+
+
+class FailingBackend(BaseEmailBackend):
+
+    def send_messages(self, messages):
+        raise ConnectionRefusedError('SMTP is down')
+
+
+class RecordingBackend(BaseEmailBackend):
+    in_transaction = []
+
+    def send_messages(self, messages):
+        self.in_transaction.append(connection.in_atomic_block)
+        return len(messages)
+
+
+
+class OutboxTest(TestCase):
+
+    def test_checkout_only_queues_mail(self):
+        test_views.fill_cart_with_items(self.client.session)
+        self.client.post(reverse('shop:order'), data=test_views.OrderViewTest.order_data)
+        self.assertEqual(len(django_mail.outbox), 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.recipient_list, ['admin@example.com'])
+        self.assertEqual(mail.queue_depth(), 1)
+
+    def test_send_batch(self):
+        for i in range(3):
+            mail.queue_mail(f'Subject {i}', 'Body', 'admin@example.com', ['a@example.com', 'b@example.com'])
+        sent, failed = mail.send_queued_mail(batch_size=2)
+        self.assertEqual((len(sent), len(failed)), (2, 0))
+        self.assertEqual(len(django_mail.outbox), 2)
+        self.assertEqual(django_mail.outbox[0].to, ['a@example.com', 'b@example.com'])
+        self.assertEqual(mail.queue_depth(), 1)
+
+    def test_not_due_email_is_skipped(self):
+        email = mail.queue_mail('Subject', 'Body', 'admin@example.com', ['a@example.com'])
+        OutgoingEmail.objects.filter(pk=email.pk).update(next_attempt=timezone.now() + timedelta(minutes=1))
+        self.assertEqual(mail.send_queued_mail(), ([], []))
+
+    @override_settings(EMAIL_BACKEND='shop_app.tests.test_mail.FailingBackend')
+    def test_retry_with_backoff(self):
+        mail.queue_mail('Subject', 'Body', 'admin@example.com', ['a@example.com'])
+        before = timezone.now()
+        mail.send_queued_mail(backoff=10, max_attempts=3)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.Status.QUEUED)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn('SMTP is down', email.last_error)
+        self.assertGreaterEqual(email.next_attempt, before + timedelta(seconds=10))
+
+        OutgoingEmail.objects.update(next_attempt=before)
+        mail.send_queued_mail(backoff=10, max_attempts=3)
+        email.refresh_from_db()
+        self.assertGreaterEqual(email.next_attempt, before + timedelta(seconds=20))
+
+    @override_settings(EMAIL_BACKEND='shop_app.tests.test_mail.FailingBackend')
+    def test_give_up_after_max_attempts(self):
+        mail.queue_mail('Subject', 'Body', 'admin@example.com', ['a@example.com'])
+        mail.send_queued_mail(max_attempts=1)
+        self.assertEqual(OutgoingEmail.objects.get().status, OutgoingEmail.Status.FAILED)
+
+    @override_settings(EMAIL_BACKEND='shop_app.tests.test_mail.FailingBackend')
+    def test_command_reports_given_up_emails(self):
+        mail.queue_mail('Subject', 'Body', 'admin@example.com', ['a@example.com'])
+        err = StringIO()
+        call_command('send_queued_mail', max_attempts=1, stdout=StringIO(), stderr=err)
+        self.assertEqual(err.getvalue(), '1 failed 1 times, given up\n')
+
+    def test_claimed_email_is_skipped_by_other_sender(self):
+        mail.queue_mail('Subject', 'Body', 'admin@example.com', ['a@example.com'])
+        self.assertEqual(len(mail.claim_batch(10, 60, timezone.now())), 1)
+        self.assertEqual(mail.send_queued_mail(), ([], []))
+
+    def test_command_drains_queue(self):
+        for i in range(5):
+            mail.queue_mail(f'Subject {i}', 'Body', 'admin@example.com', ['a@example.com'])
+        out = StringIO()
+        call_command('send_queued_mail', batch_size=2, stdout=out)
+        self.assertEqual(len(django_mail.outbox), 5)
+        self.assertIn('drain latency', out.getvalue())
+        self.assertTrue(out.getvalue().endswith('queue depth 0\n'))
+
+
+class OutboxTransactionTest(TransactionTestCase):
+
+    @override_settings(EMAIL_BACKEND='shop_app.tests.test_mail.RecordingBackend')
+    def test_mail_is_sent_outside_transaction(self):
+        RecordingBackend.in_transaction = []
+        mail.queue_mail('Subject', 'Body', 'admin@example.com', ['a@example.com'])
+        sent, failed = mail.send_queued_mail()
+        self.assertEqual(RecordingBackend.in_transaction, [False])
+        self.assertEqual(OutgoingEmail.objects.get().status, OutgoingEmail.Status.SENT)
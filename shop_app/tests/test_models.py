@@ -0,0 +1,156 @@
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models.signals import pre_save
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from shop_app import fulfilment
+from shop_app.bench import CHECKOUT_DATA
+from shop_app.models import Category, Order, OrderItems, Product
+from shop_app.tests.test_views import add_product
+
+
+def add_order(**kwargs):
+    return Order.objects.create(first_name='Bob', last_name='Bobston',
+                email='bob@mail.com', phone='380959484855', **kwargs)
+
+
+class OrderCalcPriceTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cheap = add_product('Cheap', 1.50)
+        cls.expensive = add_product('Expensive', 100)
+
+    def test_price_of_empty_order(self):
+        self.assertEqual(add_order().calc_price(), 0)
+
+    def test_price_counts_only_own_items(self):
+        other = add_order()
+        OrderItems.objects.create(order=other, item=self.expensive, item_quantity=5)
+        order = add_order()
+        OrderItems.objects.create(order=order, item=self.cheap, item_quantity=3)
+        OrderItems.objects.create(order=order, item=self.expensive, item_quantity=1)
+        self.assertEqual(order.calc_price(), Decimal('104.50'))
+
+    def test_price_in_single_query(self):
+        order = add_order()
+        OrderItems.objects.create(order=order, item=self.cheap, item_quantity=3)
+        with self.assertNumQueries(1):
+            order.calc_price()
+
+
+class OrderSnapshotTest(TestCase):
+
+    def setUp(self):
+        self.product = add_product('Lamp', Decimal('12.50'))
+
+    def test_checkout_stores_prices(self):
+        session = self.client.session
+        session['cart'] = {'lamp': 2}
+        session.save()
+        self.client.post(reverse('shop:order'), CHECKOUT_DATA)
+        Product.objects.filter(pk=self.product.pk).update(price='99.00')
+        order = Order.objects.get()
+        line = order.orderitems_set.get()
+        self.assertEqual((line.unit_price, line.line_total), (Decimal('12.50'), Decimal('25.00')))
+        self.assertEqual(order.price, Decimal('25.00'))
+        self.assertEqual(order.calc_price(), Decimal('25.00'))
+
+    def test_line_total_follows_quantity(self):
+        line = OrderItems.objects.create(order=add_order(), item=self.product, item_quantity=1)
+        Product.objects.filter(pk=self.product.pk).update(price='99.00')
+        line.item_quantity = 3
+        line.save()
+        self.assertEqual(line.line_total, Decimal('37.50'))
+
+    def test_status_change_keeps_created_date(self):
+        order = add_order()
+        fulfilment.transition(Order.objects.filter(pk=order.pk), Order.Status.PROCESSING)
+        order.comment = 'Call first'
+        order.save()
+        changed = Order.objects.get(pk=order.pk)
+        self.assertEqual(changed.created_date, order.created_date)
+        self.assertGreater(changed.updated_at, order.created_date)
+
+
+
+class CategoryCounterTest(TestCase):
+
+    def setUp(self):
+        self.first = Category.objects.create(name='First', slug='first')
+        self.second = Category.objects.create(name='Second', slug='second')
+        self.product = add_product('Product', 1.50, self.first)
+
+    def assertCounts(self, first, second):
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.product_count, self.second.product_count), (first, second))
+
+    def test_create(self):
+        add_product('Other', 1.50, self.first)
+        self.assertCounts(2, 0)
+
+    def test_move_to_other_category(self):
+        self.product.category = self.second
+        self.product.save()
+        self.assertCounts(0, 1)
+
+    def test_stale_instance_is_counted_by_stored_state(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        self.product.category = self.second
+        self.product.save()
+        stale.category = self.second
+        stale.save()
+        self.assertCounts(0, 1)
+
+    def test_unavailable_is_not_counted(self):
+        self.product.available = False
+        self.product.save()
+        self.assertCounts(0, 0)
+        self.product.available = True
+        self.product.save()
+        self.assertCounts(1, 0)
+
+    def test_price_change_keeps_count(self):
+        self.product.price = 10
+        self.product.save()
+        self.assertCounts(1, 0)
+
+    def test_delete(self):
+        self.product.delete()
+        self.assertCounts(0, 0)
+
+    def test_bulk_update(self):
+        add_product('Other', 1.50, self.first)
+        Product.objects.filter(name='Other').update(category=self.second)
+        self.assertCounts(1, 1)
+        Product.objects.update(available=False)
+        self.assertCounts(0, 0)
+
+    def test_bulk_create(self):
+        Product.objects.bulk_create([Product(name='Bulk', slug='bulk', price=1, category=self.second)])
+        self.assertCounts(1, 1)
+
+    def test_sidebar_hides_empty_categories(self):
+        response = self.client.get('/')
+        self.assertContains(response, 'First (1)')
+        self.assertNotContains(response, 'Second')
+
+
+class CategoryCounterLockTest(TransactionTestCase):
+
+    def test_stored_row_is_read_in_transaction_of_save(self):
+        product = add_product('Product', 1.50)
+        atomic = []
+
+        def receiver(sender, **kwargs):
+            atomic.append(connection.in_atomic_block)
+
+        pre_save.connect(receiver, sender=Product)
+        try:
+            product.save()
+        finally:
+            pre_save.disconnect(receiver, sender=Product)
+        self.assertEqual(atomic, [True])
@@ -0,0 +1,123 @@
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.core.cache import cache
+from django.urls import reverse
+
+from shop_app.models import Category, Product
+from shop_app.pagination import KeysetPaginator, InvalidCursor, decode_cursor, encode_cursor
+from shop_app.tests.test_views import add_product
+
+
+class CursorTest(TestCase):
+
+    def test_cursor_roundtrip(self):
+        token = encode_cursor(['Product 1', 12], reverse=True)
+        self.assertEqual(decode_cursor(token), (['Product 1', 12], True))
+
+    def test_garbage_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('not a cursor')
+
+
+
+class KeysetPaginatorTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Category', slug='category')
+        for i in range(13):
+            add_product(f'Product {i:02}', 1.50, cls.category if i % 2 else None)
+
+    def paginator(self, queryset=None):
+        return KeysetPaginator(queryset or Product.objects.all(), 6)
+
+    def test_walk_forward_and_back(self):
+        paginator = self.paginator()
+        pages = [paginator.page()]
+        while pages[-1].has_next():
+            pages.append(paginator.page(pages[-1].next_cursor))
+        names = [p.name for page in pages for p in page]
+        self.assertEqual(names, [f'Product {i:02}' for i in range(13)])
+        self.assertEqual([len(page) for page in pages], [6, 6, 1])
+        self.assertFalse(pages[0].has_previous())
+
+        previous = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual(list(previous), list(pages[1]))
+        self.assertTrue(previous.has_next())
+        self.assertTrue(previous.has_previous())
+        first = paginator.page(previous.previous_cursor)
+        self.assertEqual(list(first), list(pages[0]))
+        self.assertFalse(first.has_previous())
+
+    def test_filtered_queryset(self):
+        paginator = self.paginator(Product.objects.filter(category=self.category))
+        page = paginator.page()
+        self.assertEqual(len(page), 6)
+        self.assertTrue(all(p.category == self.category for p in page))
+        self.assertFalse(page.has_next())
+
+    def test_descending_ordering(self):
+        paginator = KeysetPaginator(Product.objects.all(), 6, ordering=('-id',))
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        pks = [p.pk for p in first] + [p.pk for p in second]
+        self.assertEqual(pks, sorted(Product.objects.values_list('pk', flat=True), reverse=True)[:12])
+        self.assertEqual(list(paginator.page(second.previous_cursor)), list(first))
+
+    def test_cursor_values_are_validated(self):
+        paginator = self.paginator()
+        for values in (['M', 'zz'], ['M', None], ['M']):
+            with self.assertRaises(InvalidCursor):
+                paginator.page(encode_cursor(values))
+
+    def test_no_count_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(self.paginator().page())
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'])
+
+
+
+class ProductListKeysetTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Category', slug='category')
+        for i in range(13):
+            add_product(f'Product {i:02}', 1.50, cls.category if i < 8 else None)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_next_page_by_cursor(self):
+        resp = self.client.get(reverse('shop:list'))
+        page = resp.context['page_obj']
+        resp = self.client.get(reverse('shop:list'), {'cursor': page.next_cursor})
+        self.assertEqual([p.name for p in resp.context['product_list']],
+                         [f'Product {i:02}' for i in range(6, 12)])
+
+    def test_cursor_keeps_category_filter(self):
+        resp = self.client.get(reverse('shop:list'), {'category': self.category.pk})
+        page = resp.context['page_obj']
+        self.assertEqual(resp.context['query_params'], f'category={self.category.pk}')
+        resp = self.client.get(reverse('shop:list'),
+                               {'category': self.category.pk, 'cursor': page.next_cursor})
+        self.assertEqual([p.name for p in resp.context['product_list']],
+                         ['Product 06', 'Product 07'])
+
+    def test_renders_only_page_rows(self):
+        resp = self.client.get(reverse('shop:list'))
+        self.assertContains(resp, 'Product 05')
+        self.assertNotContains(resp, 'Product 06')
+
+    def test_invalid_cursor(self):
+        resp = self.client.get(reverse('shop:list'), {'cursor': 'bad'})
+        self.assertEqual(resp.status_code, 404)
+
+    def test_cursor_value_of_wrong_type(self):
+        cursor = encode_cursor(['M', 'zz'])
+        resp = self.client.get(reverse('shop:list'), {'cursor': cursor})
+        self.assertEqual(resp.status_code, 404)
+        resp = self.client.get(reverse('shop:api-products'), {'cursor': cursor})
+        self.assertEqual(resp.status_code, 400)
@@ -0,0 +1,70 @@
+import io
+import logging
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from shop_app import perf
+from shop_app.models import Category
+from shop_app.tests.test_views import add_product
+
+
+@override_settings(SHOP_PERF_CACHE_ALIAS='default', SHOP_PERF_FLUSH_INTERVAL=0)
+class PerformanceMiddlewareTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.product = add_product('Apple', 2)
+
+    def test_server_timing_header(self):
+        resp = self.client.get(reverse('shop:detail', args=[self.product.slug]))
+        timing = resp['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries, 0 duplicate"')
+        self.assertRegex(timing, r'tpl;dur=[\d.]+')
+        self.assertIn(f'desc="{len(resp.content)} bytes"', timing)
+
+    def test_histograms_and_command(self):
+        for _ in range(3):
+            self.client.get(reverse('shop:cart'))
+        store = perf.HistogramStore()
+        self.assertIn('shop:cart', store.views())
+        self.assertEqual(sum(store.histogram('shop:cart', 'queries').values()), 3)
+        out = io.StringIO()
+        call_command('perf_stats', view='shop:cart', reset=True, stdout=out)
+        self.assertRegex(out.getvalue(), r'shop:cart\s+total_ms\s+3 ')
+        self.assertEqual(store.views(), [])
+
+    def test_budget_exceeded(self):
+        url = reverse('shop:detail', args=[self.product.slug])
+        with override_settings(SHOP_QUERY_BUDGETS={'shop:detail': 0}):
+            with self.assertRaises(perf.QueryBudgetExceeded):
+                self.client.get(url)
+            cache.clear()
+            with override_settings(SHOP_QUERY_BUDGET_STRICT=False), self.assertLogs('shop_app.perf', 'WARNING'):
+                self.client.get(url)
+
+    def test_repeated_queries(self):
+        for i in range(5):
+            Category.objects.create(name=f'C{i}', slug=f'c{i}')
+        with perf.RequestStats().capture() as stats:
+            for category in Category.objects.all():
+                list(category.products.all())
+        self.assertEqual(stats.queries, 6)
+        self.assertEqual(list(stats.duplicates.values()), [5])
+
+
+class HistogramTest(TestCase):
+
+    def test_percentiles(self):
+        histogram = {perf.bucket(value): 0 for value in range(1, 101)}
+        for value in range(1, 101):
+            histogram[perf.bucket(value)] += 1
+        self.assertAlmostEqual(perf.percentile(histogram, 50), 50, delta=50 * 0.2)
+        self.assertAlmostEqual(perf.percentile(histogram, 99), 99, delta=99 * 0.2)
+        self.assertIsNone(perf.percentile({}, 50))
+
+    def test_query_signature(self):
+        self.assertEqual(perf.query_signature('SELECT 1 WHERE id IN (%s, %s, %s)'),
+                         perf.query_signature('SELECT 1 WHERE  id IN (%s)'))
@@ -0,0 +1,134 @@
+import datetime
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from shop_app import archive, reports
+from shop_app.models import Category, Order, OrderItems, Product
+from shop_app.tests.test_models import add_order
+from shop_app.tests.test_views import add_product
+
+
+def add_dated_order(day, items, status=Order.Status.WAITING):
+    order = add_order(status=status)
+    OrderItems.objects.bulk_create(OrderItems.for_product(order, item, q) for item, q in items)
+    order.price = order.calc_price()
+    order.save()
+    created = timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)))
+    Order.objects.filter(pk=order.pk).update(created_date=created)
+    return order
+
+
+class OrderReportTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        fruits = Category.objects.create(name='Fruits', slug='fruits')
+        tools = Category.objects.create(name='Tools', slug='tools')
+        cls.apple = add_product('Apple', 2, fruits)
+        cls.hammer = add_product('Hammer', 10, tools)
+        cls.day = datetime.date(2020, 11, 2)
+        next_day = cls.day + datetime.timedelta(days=1)
+        add_dated_order(cls.day, [(cls.apple, 3)])
+        add_dated_order(cls.day, [(cls.apple, 1), (cls.hammer, 1)], Order.Status.DONE)
+        add_dated_order(next_day, [(cls.hammer, 2)])
+        add_dated_order(next_day, [(cls.hammer, 5)], Order.Status.CANCELED)
+
+    def test_filter_by_dates_and_status(self):
+        self.assertEqual(reports.filter_orders().count(), 4)
+        self.assertEqual(reports.filter_orders(date_from=self.day, date_to=self.day).count(), 2)
+        statuses = [Order.Status.WAITING, Order.Status.DONE]
+        self.assertEqual(reports.summary(reports.filter_orders(statuses=statuses)),
+                         {'orders': 3, 'revenue': Decimal('38')})
+
+    def test_aggregates(self):
+        orders = reports.filter_orders(statuses=[Order.Status.WAITING, Order.Status.DONE])
+        self.assertEqual(
+            [(row['day'], row['orders'], row['revenue']) for row in reports.revenue_by_day(orders)],
+            [(self.day, 2, Decimal('18')), (self.day + datetime.timedelta(days=1), 1, Decimal('20'))],
+        )
+        self.assertEqual(list(reports.revenue_by_category(orders)), [
+            {'category': 'Tools', 'quantity': 3, 'revenue': Decimal('30')},
+            {'category': 'Fruits', 'quantity': 4, 'revenue': Decimal('8')},
+        ])
+        self.assertEqual(reports.revenue_by_product(orders, limit=1)[0]['product'], 'Hammer')
+
+    def test_revenue_does_not_follow_catalog_prices(self):
+        orders = reports.filter_orders(statuses=[Order.Status.WAITING, Order.Status.DONE])
+        Product.objects.update(price=100)
+        self.assertEqual(reports.summary(orders)['revenue'], Decimal('38'))
+        self.assertEqual(reports.revenue_by_product(orders)[0], {'product': 'Hammer', 'quantity': 3,
+                                                                  'revenue': Decimal('30')})
+
+    def test_report_uses_status_date_index(self):
+        sql, params = reports.filter_orders(date_from=self.day).query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        self.assertIn('shop_app_or_status_aebc46_idx', plan)
+
+    def test_export_csv(self):
+        lines = list(reports.export_csv(reports.filter_orders(date_from=self.day, date_to=self.day)))
+        self.assertEqual(lines[0], 'id,created_date,status,email,first_name,last_name,phone,price\r\n')
+        self.assertEqual(len(lines), 3)
+        self.assertIn(',done,', lines[2])
+
+
+    def test_archived_orders_are_counted(self):
+        def report():
+            orders, archived = reports.filter_orders(), reports.archived_orders()
+            return (reports.summary(orders, archived),
+                    [dict(row) for row in reports.revenue_by_day(orders, archived)],
+                    reports.revenue_by_category(orders, archived),
+                    reports.revenue_by_product(orders, archived=archived),
+                    sorted(reports.export_csv(orders, archived=archived)))
+
+        before = report()
+        self.assertEqual(archive.archive_orders(before=timezone.now()), 2)
+        self.assertEqual(report(), before)
+        self.assertEqual(before[0], {'orders': 4, 'revenue': Decimal('88')})
+        self.assertFalse(reports.archived_orders(statuses=[Order.Status.WAITING]).exists())
+
+
+class OrderReportAdminTest(TestCase):
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        add_dated_order(datetime.date(2020, 11, 2), [(add_product('Apple', 2), 3)])
+
+    def test_report_view(self):
+        resp = self.client.get(reverse('admin:shop_app_order_report'), {'date_from': '2020-11-01'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['summary'], {'orders': 1, 'revenue': Decimal('6')})
+
+    def test_report_view_counts_archived_orders(self):
+        add_dated_order(datetime.date(2020, 11, 3), [(add_product('Pear', 5), 1)], Order.Status.DONE)
+        archive.archive_orders(before=timezone.now())
+        resp = self.client.get(reverse('admin:shop_app_order_report'), {'date_from': '2020-11-01'})
+        self.assertEqual(resp.context['summary'], {'orders': 2, 'revenue': Decimal('11')})
+        resp = self.client.get(reverse('admin:shop_app_order_export'))
+        self.assertEqual(len(b''.join(resp.streaming_content).splitlines()), 3)
+
+    def test_changelist_links_report(self):
+        resp = self.client.get(reverse('admin:shop_app_order_changelist'))
+        self.assertContains(resp, reverse('admin:shop_app_order_report'))
+
+    def test_invalid_range_selects_nothing(self):
+        resp = self.client.get(reverse('admin:shop_app_order_report'),
+                               {'date_from': '2020-11-03', 'date_to': '2020-11-01'})
+        self.assertEqual(resp.context['summary']['orders'], 0)
+
+    def test_export_is_streamed(self):
+        resp = self.client.get(reverse('admin:shop_app_order_export'), {'status': Order.Status.WAITING})
+        self.assertTrue(resp.streaming)
+        self.assertEqual(resp['Content-Type'], 'text/csv')
+        self.assertEqual(len(b''.join(resp.streaming_content).splitlines()), 2)
+
+    def test_requires_staff(self):
+        self.client.logout()
+        resp = self.client.get(reverse('admin:shop_app_order_export'))
+        self.assertEqual(resp.status_code, 302)
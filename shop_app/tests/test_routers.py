@@ -0,0 +1,83 @@
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from shop_app import cache as page_cache
+from shop_app.bench import CHECKOUT_DATA
+from shop_app.models import Order, Product
+from shop_app.routers import PrimaryReplicaRouter, Routing
+
+
+@override_settings(SHOP_DB_REPLICAS=['replica1', 'replica2'])
+class RouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_requests_read_catalog_from_replicas(self):
+        with Routing().activate():
+            self.assertIn(self.router.db_for_read(Product), ['replica1', 'replica2'])
+            self.assertEqual(self.router.db_for_read(Order), 'default')
+
+    def test_outside_request_reads_from_primary(self):
+        self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_write_switches_request_to_primary(self):
+        with Routing().activate() as routing:
+            self.router.db_for_write(Order)
+            self.assertFalse(routing.wrote)
+            self.assertEqual(self.router.db_for_write(Product), 'default')
+            self.assertTrue(routing.wrote)
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+
+    def test_pinned_client_reads_from_primary(self):
+        with Routing(pinned_until=time.time() + 5).activate():
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+        with Routing(pinned_until=time.time() - 1).activate():
+            self.assertNotEqual(self.router.db_for_read(Product), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'shop_app'))
+        self.assertTrue(self.router.allow_migrate('default', 'shop_app'))
+
+
+@override_settings(SHOP_DB_REPLICAS=['replica1'])
+class ReplicaCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        page_cache.bump_catalog_version()
+
+    def test_replica_read_after_change_is_not_cached(self):
+        with Routing().activate():
+            PrimaryReplicaRouter().db_for_read(Product)
+            self.assertEqual(page_cache.get_or_set('key', lambda: 'stale'), 'stale')
+            self.assertEqual(page_cache.get_or_set('key', lambda: 'fresh'), 'fresh')
+
+    def test_primary_read_is_cached(self):
+        with Routing(pinned_until=time.time() + 5).activate():
+            PrimaryReplicaRouter().db_for_read(Product)
+            page_cache.get_or_set('key', lambda: 'fresh')
+            self.assertEqual(page_cache.get_or_set('key', lambda: 'other'), 'fresh')
+
+    @override_settings(SHOP_REPLICA_PIN_SECONDS=0)
+    def test_replica_read_is_cached_after_lag(self):
+        with Routing().activate():
+            PrimaryReplicaRouter().db_for_read(Product)
+            page_cache.get_or_set('key', lambda: 'fresh')
+            self.assertEqual(page_cache.get_or_set('key', lambda: 'other'), 'fresh')
+
+
+class PinCookieTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        Product.objects.create(name='Lamp', slug='lamp', price=2, image='/media/image.png', stock=5)
+
+    def test_checkout_taking_stock_pins_client(self):
+        response = self.client.post(reverse('shop:detail', args=['lamp']), {'quantity': 1})
+        self.assertNotIn('primary_pin', response.cookies)
+        response = self.client.post(reverse('shop:order'), CHECKOUT_DATA)
+        self.assertGreater(float(response.cookies['primary_pin'].value), time.time())
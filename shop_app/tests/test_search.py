@@ -0,0 +1,70 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from shop_app.models import Category, Product
+from shop_app.search import SQLiteFTSBackend, LikeSearchBackend, search_products
+from shop_app.tests.test_views import add_product
+
+
+def names(queryset):
+    return [p.name for p in queryset]
+
+
+class SearchTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.apple = add_product('Red apple', 2)
+        self.pear = add_product('Green pear', 3)
+        self.pear.description = 'Tastes like apple'
+        self.pear.save()
+
+    def test_ranked_by_name_first(self):
+        self.assertEqual(names(search_products(Product.objects.all(), 'apple')), ['Red apple', 'Green pear'])
+
+    def test_prefix_and_all_words(self):
+        self.assertEqual(names(search_products(Product.objects.all(), 'gre tast')), ['Green pear'])
+
+    def test_syntax_in_query_is_escaped(self):
+        self.assertEqual(names(search_products(Product.objects.all(), 'apple"(')), ['Red apple', 'Green pear'])
+        self.assertEqual(names(search_products(Product.objects.all(), '"')), [])
+
+    def test_index_follows_save_and_delete(self):
+        self.apple.name = 'Yellow banana'
+        self.apple.save()
+        self.assertEqual(names(search_products(Product.objects.all(), 'banana')), ['Yellow banana'])
+        self.apple.delete()
+        self.assertEqual(names(search_products(Product.objects.all(), 'banana')), [])
+
+    def test_index_follows_bulk_changes(self):
+        Product.objects.bulk_create([Product(name='Plum', slug='plum', price=1, description='Blue')])
+        self.assertEqual(names(search_products(Product.objects.all(), 'blue')), ['Plum'])
+        Product.objects.filter(slug='plum').update(description='Violet')
+        self.assertEqual(names(search_products(Product.objects.all(), 'violet')), ['Plum'])
+
+    def test_bulk_update_reindexes_only_updated_rows(self):
+        with mock.patch.object(SQLiteFTSBackend, 'rebuild', side_effect=AssertionError):
+            Product.objects.filter(name='Red apple').update(name='Red plum')
+        self.assertEqual(names(search_products(Product.objects.all(), 'plum')), ['Red plum'])
+        self.assertEqual(names(search_products(Product.objects.all(), 'apple')), ['Green pear'])
+
+    def test_same_results_as_like_backend(self):
+        fts = search_products(Product.objects.all(), 'pear')
+        like = LikeSearchBackend().search(Product.objects.all(), 'pear')
+        self.assertEqual(set(fts), set(like))
+
+    def test_rebuild(self):
+        SQLiteFTSBackend().rebuild()
+        self.assertEqual(names(search_products(Product.objects.all(), 'apple')), ['Red apple', 'Green pear'])
+
+    def test_combined_with_category_filter(self):
+        response = self.client.get(reverse('shop:list'), {'q': 'apple'})
+        self.assertEqual(names(response.context['product_list']), ['Red apple', 'Green pear'])
+        fruit = Category.objects.create(name='Fruit', slug='fruit')
+        self.pear.category = fruit
+        self.pear.save()
+        response = self.client.get(reverse('shop:list'), {'q': 'apple', 'category': fruit.pk})
+        self.assertEqual(names(response.context['product_list']), ['Green pear'])
@@ -0,0 +1,34 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+
+class CompressedManifestStorageTest(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(
+            STATIC_ROOT=self.root, INSTALLED_APPS=['django.contrib.staticfiles'],
+            STATICFILES_STORAGE='shop_app.storage.CompressedManifestStaticFilesStorage',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    def test_hashed_files_get_gzip_copy(self):
+        name = staticfiles_storage.stored_name('css/base.css')
+        self.assertNotEqual(name, 'css/base.css')
+        with open(os.path.join(self.root, name), 'rb') as f:
+            content = f.read()
+        with gzip.open(os.path.join(self.root, name + '.gz')) as f:
+            self.assertEqual(f.read(), content)
+
+    def test_original_names_are_not_compressed(self):
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'css', 'base.css.gz')))
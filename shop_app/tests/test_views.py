@@ -9,8 +9,12 @@ from shop_app import views
 
 # Create your tests here.
 
-from shop_app.models import Category, Product
+from shop_app.models import Category, Order, Product
 from django.urls import reverse
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from decimal import Decimal
 
 
 def add_product(name : str, price : float, category : Category = None):
@@ -27,6 +31,9 @@ class ProductListViewTest(TestCase):
         for i in range(num_products):
             add_product(f'Product {i}', 1.50)
 
+    def setUp(self):
+        cache.clear()
+
     def test_view_url_exists_at_desired_location(self): 
         resp = self.client.get('/products/') 
         self.assertEqual(resp.status_code, 200)  
@@ -85,11 +92,11 @@ class ProductDetailView(TestCase):
  
 
 
-def fill_cart_with_items(session):
+def fill_cart_with_items(session, prefix='Product '):
     session['cart'] = dict()
     cart = session['cart']
     for i in range(3):
-        obj = add_product(f'Product {i}', 1.50)
+        obj = add_product(f'{prefix}{i}', 1.50)
         cart[obj.slug] = 3
     session.save()
 
@@ -106,16 +113,53 @@ class CartViewTest(TestCase):
         self.assertQuerysetEqual(response.context['objects_list'], 
                                     ['<Product: Product 0>','<Product: Product 1>','<Product: Product 2>'])
 
+    def test_cart_view_total_price(self):
+        fill_cart_with_items(self.client.session)
+        response = self.client.get(reverse('shop:cart'))
+        self.assertEqual(response.context['total_price'], Decimal('13.50'))
+        self.assertEqual(response.context['objects_list'][0].line_total, Decimal('4.50'))
+
+    def test_cart_view_single_product_query(self):
+        fill_cart_with_items(self.client.session)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('shop:cart'))
+        product_queries = [q for q in queries if 'shop_app_product' in q['sql']]
+        self.assertEqual(len(product_queries), 1)
+
+    def test_delete_item_that_not_exist(self):
+        response = self.client.get(reverse('shop:delete', args=['product-0']))
+        self.assertEqual(response.status_code, 404)
+
 
 
 class OrderViewTest(TestCase):
 
+    order_data = {
+        'first_name' : 'Bob',
+        'last_name' : 'Bobston',
+        'email' : 'bob@mail.com',
+        'phone' : '380959484855',
+        'comment' : 'Some text.',
+    }
+
     def test_order_view(self):
         fill_cart_with_items(self.client.session)
         response = self.client.get(reverse('shop:order'))
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'order.html')
 
+    def test_order_view_single_product_query(self):
+        fill_cart_with_items(self.client.session)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('shop:order'))
+        product_queries = [q for q in queries if 'shop_app_product' in q['sql']]
+        self.assertEqual(len(product_queries), 1)
+        self.assertEqual(response.context['total_price'], Decimal('13.50'))
+
+    def test_order_view_empty_cart(self):
+        response = self.client.get(reverse('shop:order'))
+        self.assertRedirects(response, reverse('shop:cart'))
+
     def test_order_view_create_order_correct_data(self):
         fill_cart_with_items(self.client.session)
         response = self.client.post(reverse('shop:order'), data={
@@ -132,5 +176,33 @@ class OrderViewTest(TestCase):
         response = self.client.post(reverse('shop:order'), data={})
         self.assertTrue(response.context['order_form'].errors)
 
+    def test_order_view_saves_items_and_price(self):
+        fill_cart_with_items(self.client.session)
+        self.client.post(reverse('shop:order'), data=self.order_data)
+        order = Order.objects.get()
+        self.assertEqual(order.orderitems_set.count(), 3)
+        self.assertEqual(order.price, Decimal('13.50'))
 
-
+    def test_order_with_deleted_product_is_rejected(self):
+        fill_cart_with_items(self.client.session)
+        Product.objects.get(name='Product 0').delete()
+        response = self.client.post(reverse('shop:order'), data=self.order_data)
+        self.assertRedirects(response, reverse('shop:cart'))
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(set(self.client.session['cart']), {'product-1', 'product-2'})
+        Product.objects.all().delete()
+        self.client.post(reverse('shop:order'), data=self.order_data)
+        self.assertFalse(Order.objects.exists())
+
+    def test_checkout_queries_dont_depend_on_order_history(self):
+        def checkout():
+            fill_cart_with_items(self.client.session, prefix=f'Product {Order.objects.count()}-')
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(reverse('shop:order'), data=self.order_data)
+            return len(queries)
+
+        first = checkout()
+        for _ in range(5):
+            checkout()
+        self.assertEqual(checkout(), first)
+        self.assertEqual(Order.objects.last().price, Decimal('13.50'))
@@ -1,13 +1,34 @@
+from django.conf import settings
 from django.urls import path
 from django.views.generic import TemplateView
-from . import views
+from . import api, async_views, views
 
 app_name = 'shop'
-urlpatterns = [
-    path('', views.ProductListView.as_view(), name='list'),
-    path('product/<slug:slug>', views.product_detail_view, name='detail'),
-    path('cart/', views.cart_view, name='cart'),
-    path('cart/delete/<slug:slug>', views.delete_item_view, name='delete'),
-    path('order/', views.order_view, name='order'),
-    path('order/created/', TemplateView.as_view(template_name='order-created.html'), name='order-created'),
-]
\ No newline at end of file
+
+
+def get_urlpatterns(async_storefront=False):
+    '''
+    Return shop routes, with async variants of storefront views
+    if async_storefront is set.
+    '''
+    if async_storefront:
+        list_view, detail_view = async_views.product_list_view, async_views.product_detail_view
+        cart_view, order_view = async_views.cart_view, async_views.order_view
+    else:
+        list_view, detail_view = views.ProductListView.as_view(), views.product_detail_view
+        cart_view, order_view = views.cart_view, views.order_view
+    return [
+        path('', list_view, name='list'),
+        path('product/<slug:slug>', detail_view, name='detail'),
+        path('cart/', cart_view, name='cart'),
+        path('cart/delete/<slug:slug>', views.delete_item_view, name='delete'),
+        path('order/', order_view, name='order'),
+        path('order/created/', TemplateView.as_view(template_name='order-created.html'), name='order-created'),
+        path('api/products/', api.product_list, name='api-products'),
+        path('api/products/batch', api.product_batch, name='api-product-batch'),
+        path('api/product/<slug:slug>', api.product_detail, name='api-product'),
+        path('api/categories/', api.category_list, name='api-categories'),
+    ]
+
+
+urlpatterns = get_urlpatterns(settings.SHOP_ASYNC_VIEWS)
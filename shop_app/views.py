@@ -1,44 +1,114 @@
 from decimal import Context
+from functools import partial
 from itertools import product
-from django.http import request
+from django.conf import settings
+from django.http import request, Http404
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views import generic
 
 from django.contrib import messages
-from django.core.mail import send_mail, BadHeaderError
+from django.utils.translation import gettext as _
 
 from django_filters.views import FilterView
 
 from .models import Product, Category 
 from .forms import OrderForm, AddToCartForm
 from .filters import ProductFilter
+from .checkout import MissingProducts, place_order
+from . import inventory
+from .pagination import KeysetPaginator, InvalidCursor
+from .perf import query_budget
+from . import cache
+from .conditional import conditional_page, list_validators, product_validators
 
 
 class ProductListView(FilterView):
     '''
-    List view for products with filter by category.
+    List view for products with filters by category, availability and
+    price and choice of sort.
     '''
     model = Product
     filterset_class = ProductFilter
     paginate_by = 6
     template_name = 'products-list.html'
+    # Narrowed selection adds grouped query for category facet counts.
+    query_budget = 6
+
+    def get(self, request, *args, **kwargs):
+        cart_count = count_cart_items(request)
+        render = partial(cache.cached_page, request, 'list', partial(super().get, request, *args, **kwargs),
+                         cart_count)
+        return conditional_page(request, self.get_validators, render, cart_count)
+
+    def get_validators(self):
+        '''
+        Validators for conditional GET, computed from filtered queryset
+        without rendering and cached for current catalog version.
+        '''
+        key = cache.page_cache_key(self.request, 'list-validators')
+        return cache.get_or_set(key, self.compute_validators)
+
+    def compute_validators(self):
+        '''
+        Invalid filter gets no validators.
+        '''
+        filterset = self.get_filterset(self.get_filterset_class())
+        if filterset.is_bound and not filterset.is_valid() and self.get_strict():
+            return None
+        return list_validators(filterset.qs)
+
+    def get_filterset(self, filterset_class):
+        # Built once for validators and page, its validation queries categories.
+        if getattr(self, 'filterset', None) is None:
+            self.filterset = super().get_filterset(filterset_class)
+        return self.filterset
+
+    def get_pagination_mode(self):
+        '''
+        Return 'keyset' for cursor pagination or 'offset' for page numbers.
+        Search results are ordered by relevance, which is no key to seek
+        by, so they are always paged by offset.
+        '''
+        if self.request.GET.get('q'):
+            return 'offset'
+        return getattr(settings, 'SHOP_PAGINATION_MODE', 'offset')
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.get_pagination_mode() != 'keyset':
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(queryset, page_size, ordering=self.filterset.get_ordering())
+        try:
+            page = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor as e:
+            raise Http404(_('Invalid page: %(message)s') % {'message': str(e)})
+        return (paginator, page, page.object_list, page.has_other_pages())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["cart_items"] = count_cart_items(self.request)
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        query.pop('cursor', None)
+        context["query_params"] = query.urlencode()
         return context
     
 
 
-def add_to_cart(request, slug, quantity):
+def add_to_cart(request, product, quantity):
     '''
-    Add item to session based cart. If item already in cart
+    Add item to cart. If item already in cart
     change the amount of items to quantity value.
-    '''
-    # product = Product.objects.get(slug=slug)
-    cart = request.session.setdefault('cart', dict())
-    cart[slug] = quantity
-    request.session.modified = True
+    With reservations enabled units are held for the cart.
+    '''
+    if not product.available:
+        messages.add_message(request, messages.WARNING, 'Out of stock.')
+        return
+    if inventory.reservations_enabled():
+        try:
+            inventory.reserve(request.cart.token, product, quantity)
+        except inventory.OutOfStock:
+            messages.add_message(request, messages.WARNING, 'Not enough items in stock.')
+            return
+    request.cart.add(product.slug, quantity)
     messages.add_message(request, messages.SUCCESS, 'Added to cart.')
 
 
@@ -47,11 +117,14 @@ def remove_from_cart(request, slug):
     Remove item from cart.
     '''
     try:
-        del request.session['cart'][slug]
-        request.session.modified = True
+        request.cart.remove(slug)
     except KeyError:
         messages.add_message(request, messages.WARNING, 'Something go wrong.')
     else:
+        if inventory.reservations_enabled():
+            product = Product.objects.only('pk', 'category_id').filter(slug=slug).first()
+            if product is not None:
+                inventory.release(request.cart.token, product)
         messages.add_message(request, messages.SUCCESS, 'Removed from cart.')
 
 
@@ -59,52 +132,54 @@ def get_cart_items(request):
     '''
     Return items in cart, if cart is empty return None
     '''
-    return request.session.get('cart', None)
+    return request.cart.items or None
 
 
 def count_cart_items(request):
     '''
     Return count of unique products in cart.
     '''
-    items = get_cart_items(request)
-    return len(items) if items else 0
+    return len(request.cart)
 
 
+@query_budget(5)
 def product_detail_view(request, slug):
     '''
     Product detail view. Show product image,
     name, description text, and form to add it to cart.
     '''
-    product = get_object_or_404(Product, slug=slug)
-    form = None
+    product = cache.get_or_set(f'shop:product:{slug}', Product.objects.filter(slug=slug).first)
+    if product is None:
+        raise Http404(_('No product matches the given query.'))
     if request.method == 'GET':
         form = AddToCartForm(initial={'quantity':request.GET.get('quantity', 1)})
-    elif request.method == 'POST':
+        context = {'product':product, 'form':form}
+        return conditional_page(request, partial(product_validators, product),
+                                partial(render, request, 'product-detail.html', context),
+                                count_cart_items(request))
+    form = None
+    if request.method == 'POST':
         form = AddToCartForm(request.POST)
         if form.is_valid():
-            add_to_cart(request, slug, form.cleaned_data['quantity']) #TODO: передавать в посте сколько предметов нужно добавить
+            add_to_cart(request, product, form.cleaned_data['quantity']) #TODO: передавать в посте сколько предметов нужно добавить
             return redirect('shop:detail', slug=slug)
         messages.add_message(request, messages.WARNING, 'Something go wrong.')
 
-    context = {'product':product, 'form':form, 'cart_items':count_cart_items(request)}
+    context = {'product':product, 'form':form}
     return render(request, 'product-detail.html', context)
 
 
+@query_budget(2)
 def cart_view(request):
     '''
     View for rendering cart.
     '''
-    items = None
-    cart = request.session.get('cart',[])
-    items = Product.objects.filter(slug__in=cart)
-    price = 0.0
-    for i in items:
-        i.item_count = cart[i.slug]
-        price = i.price * i.item_count 
-    context = {'objects_list':items, 'total_price':price, 'cart_items':count_cart_items(request)}
+    items, total_price = request.cart.resolve()
+    context = {'objects_list':items, 'total_price':total_price}
     return render(request, 'cart.html', context)
 
 
+@query_budget(4)
 def delete_item_view(request, slug):
     '''
     View to confirm that you want to remove current item
@@ -115,43 +190,39 @@ def delete_item_view(request, slug):
         remove_from_cart(request, slug)
         return redirect('shop:cart')
     else:
-        object = Product.objects.get(slug=slug)
+        object = get_object_or_404(Product.objects.only('slug', 'name'), slug=slug)
 
     context = {'item':object}
     return render(request, 'remove-item.html', context)
 
 
 
+@query_budget(13)
 def order_view(request):
-    cart = request.session.get('cart', None)
+    cart = request.cart
     if not cart:
         messages.add_message(request, messages.ERROR, 'Problems with cart.')
-        redirect('shop:cart')
-    items = Product.objects.filter(slug__in=cart)
+        return redirect('shop:cart')
 
     if request.method == 'POST':
         order_form = OrderForm(data=request.POST)
         if order_form.is_valid():
-            order = order_form.save()
-            for i in items:
-                order.items.add(i, through_defaults={'item_quantity':cart[i.slug]})
-            order.price = order.calc_price()
-            order.save()
-            del request.session['cart']
-            request.session.modified = True
             try:
-                send_mail('New order', f'There is new order, order_id:{order.id}', 'admin@example.com', ['admin@example.com'])
-                messages.add_message(request, messages.SUCCESS, 'Message sent')
-            except BadHeaderError:
-                messages.add_message(request, messages.ERROR, 'Message not sent')
+                place_order(order_form, cart)
+            except inventory.OutOfStock as e:
+                messages.add_message(request, messages.ERROR, f'Not enough {e.product.name} in stock.')
+                return redirect('shop:cart')
+            except MissingProducts as e:
+                for slug in e.slugs:
+                    cart.remove(slug)
+                messages.add_message(request, messages.ERROR, 'Some products are no longer available '
+                                                              'and were removed from cart.')
+                return redirect('shop:cart')
+            cart.clear()
             return redirect('shop:order-created')
     else:
         order_form = OrderForm()
-    
-    total_price = 0
-    for i in items:
-        i.item_count = cart[i.slug]
-        total_price += i.price * i.item_count 
 
-    context = {'order_form':order_form, 'total_price':total_price, 'cart_items':count_cart_items(request)}
+    total_price = cart.resolve()[1]
+    context = {'order_form':order_form, 'total_price':total_price}
     return render(request, 'order.html', context)